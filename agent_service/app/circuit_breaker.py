@@ -0,0 +1,97 @@
+import logging
+import os
+import time
+from .metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric encoding of the state for the gauge
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to a remote dependency.
+
+    Closed: calls go through; consecutive failures (errors, or calls slower
+    than `slow_call_seconds`) are counted. Open: after `failure_threshold`
+    of them, calls are short-circuited for `reset_timeout` seconds so callers
+    fall back immediately instead of waiting on a dead service. Half-open:
+    afterwards, up to `half_open_max_calls` probe calls are let through; a
+    successful probe closes the breaker, a failed one opens it again.
+
+    Used from a single event loop, so no locking is needed.
+    """
+    def __init__(self, name: str, failure_threshold: int = None, slow_call_seconds: float = None,
+                 reset_timeout: float = None, half_open_max_calls: int = None):
+        """
+        Args:
+            name (str): Dependency name, used as the metrics label.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            slow_call_seconds (float): Successful calls slower than this count as failures.
+            reset_timeout (float): Seconds the breaker stays open before probing.
+            half_open_max_calls (int): Concurrent probe calls allowed while half-open.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.slow_call_seconds = slow_call_seconds or float(os.getenv("BREAKER_SLOW_CALL_MS", "2000")) / 1000
+        self.reset_timeout = reset_timeout or float(os.getenv("BREAKER_RESET_SECONDS", "10"))
+        self.half_open_max_calls = half_open_max_calls or int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+
+        self.state = CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+        self._probes = 0
+        BREAKER_STATE.labels(dependency=name).set(_STATE_VALUES[CLOSED])
+
+    def allow(self) -> bool:
+        """
+        Returns True if a call may be attempted now.
+
+        Every allowed call must be followed by `record_success` or `record_failure`.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._changed_at < self.reset_timeout:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                # A probe that never reported back (e.g. cancelled) must not block recovery
+                if time.monotonic() - self._changed_at < self.reset_timeout:
+                    return False
+                self._probes = 0
+                self._changed_at = time.monotonic()
+            self._probes += 1
+        return True
+
+    def record_success(self, elapsed: float):
+        """Records a completed call; slow calls count as failures."""
+        if elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+        self._failures = 0
+
+    def record_failure(self):
+        """Records a failed call and opens the breaker when the threshold is reached."""
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._failures += 1
+        if self.state == CLOSED and self._failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def _transition(self, state: str):
+        BREAKER_TRANSITIONS.labels(dependency=self.name, from_state=self.state, to_state=state).inc()
+        BREAKER_STATE.labels(dependency=self.name).set(_STATE_VALUES[state])
+        logger.log(logging.WARNING if state == OPEN else logging.INFO,
+                   "Circuit breaker '%s': %s -> %s", self.name, self.state, state)
+        self.state = state
+        self._failures = 0
+        self._probes = 0
+        self._changed_at = time.monotonic()
@@ -1,10 +1,27 @@
-import os
-import requests
 import asyncio
+import logging
+import os
+import time
+from typing import Union
 from google.adk.agents.llm_agent import Agent
-from google.adk.runners import InMemoryRunner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.memory import InMemoryMemoryService
+from google.adk.models import BaseLlm, LLMRegistry
+from google.adk.runners import Runner
 from google.genai import types 
-from .tools import WalletTools, DATABASE_USER
+from opentelemetry.context import Context
+from .tools import WalletTools
+from .store import DEMO_ACCOUNTS
+from .guardrail_client import GuardrailClient
+from .circuit_breaker import CircuitBreaker
+from .fallback_masker import FallbackMasker
+from .metrics import CHAT_ERRORS, GUARDRAIL_CALLS, GUARDRAIL_LATENCY
+from .tracing import TRACER
+from .sessions import SessionPool
+from .history import BoundedSessionService, HistoryPolicy, LlmSummarizer
+
+logger = logging.getLogger(__name__)
 
 class DomiAgent:
     """
@@ -19,17 +36,31 @@ class DomiAgent:
     and restored securely when specific tools are executed.
     """
 
-    def __init__(self):
-        """Initializes the Agent, Tools, and ADK Runner configuration."""
+    def __init__(self, model: Union[str, BaseLlm] = None):
+        """
+        Initializes the Agent, Tools, and ADK Runner configuration.
+
+        Args:
+            model: Gemini model name or an ADK `BaseLlm` instance (e.g. a local
+                fake LLM for tests and benchmarks). Defaults to AGENT_MODEL.
+        """
         self.api_key = os.getenv("GOOGLE_API_KEY")
-        self.guardrail_url = os.getenv("GUARDRAIL_SERVICE_URL", "http://guardrail-service:80/clean")
+        # Pooled async client; opened/closed by the FastAPI lifecycle hooks
+        self.guardrail = GuardrailClient()
+        # Stops calling a failing/slow guardrail and masks in-process (regex only) instead
+        self.guardrail_breaker = CircuitBreaker("guardrail")
+        self.fallback_masker = FallbackMasker()
+        # full: inline vault + debug blobs in every reply; lean: vault stays in the
+        # Guardrail Service and only a reference travels through the agent
+        self.response_mode = os.getenv("AGENT_RESPONSE_MODE", "full")
 
         if not self.api_key:
-            print("WARNING: GOOGLE_API_KEY not found.")
+            logger.warning("GOOGLE_API_KEY not found")
 
         # 1. Initialize Tools
         # Tools are defined here to be passed to the LLM for function calling capability.
-        self.tools_instance = WalletTools()
+        # Tools resolve vault references through the Guardrail Service on demand
+        self.tools_instance = WalletTools(resolver=self.guardrail.resolve)
         self.my_tools = [
             self.tools_instance.ganti_password,
             self.tools_instance.request_kartu_fisik,
@@ -52,135 +83,240 @@ class DomiAgent:
         """
 
         # Initialize the Google ADK Agent with the specified Gemini model
+        self.model = model or os.getenv("AGENT_MODEL", "gemini-2.5-flash")
         self.adk_agent = Agent(
-            model='gemini-2.5-flash',
+            model=self.model,
             name='domi_agent',
             instruction=self.system_prompt,
             tools=self.my_tools
         )
 
         # 3. Setup Execution Runner
-        # InMemoryRunner maintains the conversation state/history.
+        # The in-memory session service maintains the conversation state/history,
+        # bounded by the history policy (sliding window + summary + memory cap).
         self.app_name = "infomedia_wallet_app" 
-        self.runner = InMemoryRunner(
+        self.runner = Runner(
             agent=self.adk_agent,
-            app_name=self.app_name
+            app_name=self.app_name,
+            session_service=BoundedSessionService(HistoryPolicy(summarizer=self._build_summarizer())),
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService()
         )
         
         # Session Configuration
-        self.session_id = "global_session_v1"
-        self.user_id = "user_demo" 
-        self.session_ready = False
+        # One ADK session per conversation, issued by the server and evicted when idle
+        self.sessions = SessionPool(self.runner.session_service, self.app_name)
 
-    async def ensure_session(self):
-        """
-        Ensures a session exists in the ADK Runner.
-        
-        This is required before sending messages. It handles the creation
-        of a new session and gracefully catches errors if the session
-        already exists (common in persistent environments).
-        """
-        if not self.session_ready:
-            try:
-                await self.runner.session_service.create_session(
-                    app_name=self.app_name, 
-                    session_id=self.session_id,
-                    user_id=self.user_id
-                )
-                print(f"✅ Session Created: {self.session_id}")
-            except Exception as e:
-                error_msg = str(e)
-                if "already exists" in error_msg.lower():
-                    print(f"ℹ️ Session already exists: {self.session_id}")
-                else:
-                    print(f"⚠️ Session creation WARNING: {error_msg}")
-            
-            self.session_ready = True
+    def _build_summarizer(self):
+        """Selects the history summarizer (HISTORY_SUMMARIZER=extractive|llm)."""
+        if os.getenv("HISTORY_SUMMARIZER", "extractive") != "llm":
+            return None
+        llm = self.model if isinstance(self.model, BaseLlm) else LLMRegistry.new_llm(self.model)
+        return LlmSummarizer(llm)
 
-    def call_guardrail(self, text: str):
+    async def call_guardrail(self, text: str, response_mode: str = "full"):
         """
         Sends raw text to the external Guardrail Service for PII masking.
 
         Args:
             text (str): The raw user input containing potential PII.
+            response_mode (str): 'full' (inline vault) or 'lean' (vault reference).
+
+        Calls go through a circuit breaker. When the call fails, or the breaker is
+        open because recent calls failed or were too slow, the text is masked
+        in-process by the regex-only `FallbackMasker` instead: structured PII is
+        still masked, names and addresses are not. Raw text never reaches the LLM.
 
         Returns:
-            dict: Response containing 'cleaned_text' and 'vault' (PII mapping).
-                  Returns a fallback dict if the service is unreachable.
+            dict: Response containing 'cleaned_text' and 'vault' (PII mapping) or 'vault_ref'.
+                  Fallback responses carry an inline vault and 'degraded': True.
         """
-        try:
-            response = requests.post(self.guardrail_url, json={"text": text}, timeout=10)
-            if response.status_code == 200:
-                return response.json()
-            return {"cleaned_text": text, "vault": {}, "entities": [], "performance": {}}
-        except Exception:
-            # Fail-safe: Return original text if guardrail is down (Log this in production)
-            return {"cleaned_text": text, "vault": {}, "entities": [], "performance": {}}
-
-    async def chat(self, user_message: str):
+        with TRACER.span("agent.guardrail", attributes={"text.chars": len(text)}) as span:
+            span.set_attribute("breaker.state", self.guardrail_breaker.state)
+            if self.guardrail_breaker.allow():
+                start = time.perf_counter()
+                try:
+                    result = await self.guardrail.clean(text, response_mode=response_mode)
+                except Exception as e:
+                    self.guardrail_breaker.record_failure()
+                    GUARDRAIL_CALLS.labels(result="error").inc()
+                    span.set_attribute("guardrail.error", type(e).__name__)
+                    logger.warning("Guardrail call failed (%s), masking with regex fallback", type(e).__name__)
+                else:
+                    elapsed = time.perf_counter() - start
+                    self.guardrail_breaker.record_success(elapsed)
+                    GUARDRAIL_CALLS.labels(result="slow" if elapsed > self.guardrail_breaker.slow_call_seconds else "ok").inc()
+                    GUARDRAIL_LATENCY.labels(path="guardrail").observe(elapsed)
+                    span.set_attribute("path", "guardrail")
+                    return result
+            else:
+                GUARDRAIL_CALLS.labels(result="short_circuit").inc()
+
+            start = time.perf_counter()
+            result = self.fallback_masker.clean(text)
+            GUARDRAIL_LATENCY.labels(path="fallback").observe(time.perf_counter() - start)
+            span.set_attribute("path", "fallback")
+            return result
+
+    async def chat(self, user_message: str, user_id: str, session_id: str, response_mode: str = None,
+                   trace_parent: Context = None):
         """
         Main pipeline for processing user messages.
 
+        Runs `chat_stream` to completion and returns its final result.
+
+        Args:
+            user_message (str): The raw user input.
+            user_id (str): Identifier of the user owning the conversation.
+            session_id (str): Identifier of the conversation.
+            response_mode (str): 'full' or 'lean' (default AGENT_RESPONSE_MODE).
+            trace_parent (Context): Caller's trace context (from the `traceparent` header).
+
+        Returns:
+            dict: 'reply' text and 'debug_info' for the frontend dashboard.
+        """
+        result = None
+        # Consumed to the end so the stream (and its trace span) closes before returning
+        async for event in self.chat_stream(user_message, user_id, session_id, streaming=False,
+                                            response_mode=response_mode, trace_parent=trace_parent):
+            if event["event"] == "done":
+                result = event["data"]
+        return result
+
+    async def chat_stream(self, user_message: str, user_id: str, session_id: str, streaming: bool = True,
+                          response_mode: str = None, trace_parent: Context = None):
+        """
+        Streaming pipeline for processing user messages.
+
         Flow:
         1. Sanitize input via Guardrail (PII Masking).
         2. Inject PII context (Vault) into Tools for execution.
-        3. Send sanitized text to LLM (Gemini) via ADK.
-        4. Return response and debug information.
+        3. Send sanitized text to LLM (Gemini) via ADK, yielding events as they arrive.
+        4. Yield the final response and debug information.
+
+        Yields:
+            dict: {"event": name, "data": payload} where name is one of
+                  'token' (text chunk), 'tool_start' / 'tool_end' (tool name only,
+                  never arguments or results), or 'done' (final reply + debug info).
+
+        In 'lean' response mode the vault never leaves the Guardrail Service (tools
+        resolve tags through `vault_ref`) and 'done' carries no PII or debug blobs.
+
+        Closing the generator (e.g. when the client disconnects) cancels the ADK run.
+
+        The turn is traced as an 'agent.chat' span (child of `trace_parent` if
+        given) with child spans for the guardrail call, every ADK event (time
+        spent waiting for it: LLM turn or tool round-trip) and every tool call.
         """
+        response_mode = response_mode or self.response_mode
+        with TRACER.span("agent.chat", parent=trace_parent, kind="server",
+                         attributes={"response_mode": response_mode, "streaming": streaming}) as chat_span:
+            turn = self._chat_turn(user_message, user_id, session_id, streaming, response_mode, chat_span)
+            try:
+                async for event in turn:
+                    yield event
+                    if event["event"] == "done":
+                        break
+            finally:
+                # Propagates cancellation into the ADK run when this generator is closed early
+                await turn.aclose()
+
+    async def _chat_turn(self, user_message: str, user_id: str, session_id: str, streaming: bool,
+                         response_mode: str, chat_span):
+        """Body of `chat_stream`, running inside its trace span."""
+
         # 1. Guardrail Process
         # Masks sensitive data (e.g., NIK -> [REDACTED_NIK])
-        guard_data = self.call_guardrail(user_message)
+        guard_data = await self.call_guardrail(user_message, response_mode)
         cleaned_text = guard_data.get("cleaned_text", user_message)
-        session_vault = guard_data.get("vault", {})
-
-        # 2. Inject Context
-        # securely passes the real data (vault) to the tools class
-        # so functionality works without the LLM seeing the real data.
-        self.tools_instance.set_context(session_vault)
+        session_vault = guard_data.get("vault") or {}
+        vault_ref = guard_data.get("vault_ref")
+        chat_span.set_attribute("degraded", bool(guard_data.get("degraded")))
+        chat_span.set_attribute("guardrail.tier", guard_data.get("tier") or "")
 
         # 3. ADK Execution
+        # Turns run on the caller's own session; other conversations run concurrently.
         reply_text = ""
+        # Text already sent as partial chunks for the current model response
+        streamed_text = ""
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
         try:
-            await self.ensure_session()
-            
             # Wrap the sanitized text in the ADK compatible content type
             msg_content = types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=cleaned_text)]
             )
 
-            # [DEBUG] Log execution start
-            print(f"🚀 Running Agent... Session: {self.session_id}, App: {self.app_name}")
-
-            # Run the agent asynchronously and collect the response stream
-            async for event in self.runner.run_async(
-                session_id=self.session_id,
-                user_id=self.user_id,
-                new_message=msg_content
-            ):
-                if event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if part.text:
-                            reply_text += part.text
+            # 2. Inject Context (inside the session's turn)
+            # securely passes the real data (vault) to the tools for this request only,
+            # so functionality works without the LLM seeing the real data.
+            async with self.sessions.session(user_id, session_id):
+                with self.tools_instance.use_context(session_vault, vault_ref):
+                    logger.debug("Running agent turn (session %s, app %s)", session_id, self.app_name)
+
+                    # Run the agent asynchronously and forward the response stream
+                    waiting_since = time.time_ns()
+                    async for event in self.runner.run_async(
+                        session_id=session_id,
+                        user_id=user_id,
+                        new_message=msg_content,
+                        run_config=run_config
+                    ):
+                        calls = event.get_function_calls()
+                        responses = event.get_function_responses()
+                        # One span per event, covering the time since the previous one
+                        # (LLM turn or tool round-trip)
+                        TRACER.start_span("agent.adk_event", start_ns=waiting_since, attributes={
+                            "author": event.author or "",
+                            "partial": bool(event.partial),
+                            "function_calls": len(calls),
+                            "function_responses": len(responses)
+                        }).end()
+                        waiting_since = time.time_ns()
+
+                        for call in calls:
+                            yield {"event": "tool_start", "data": {"name": call.name}}
+                        for response in responses:
+                            yield {"event": "tool_end", "data": {"name": response.name}}
+
+                        if not (event.content and event.content.parts):
+                            continue
+                        text = "".join(part.text for part in event.content.parts if part.text)
+                        if event.partial:
+                            streamed_text += text
+                            reply_text += text
+                            yield {"event": "token", "data": {"text": text}}
+                        elif streamed_text:
+                            # Final aggregate of chunks that were already streamed
+                            streamed_text = ""
+                        elif text:
+                            reply_text += text
+                            yield {"event": "token", "data": {"text": text}}
             
             if not reply_text:
                 reply_text = "Maaf, tidak ada respon dari Agent (Empty Response)."
 
         except Exception as e:
             reply_text = f"Error ADK: {str(e)}"
-            import traceback
-            traceback.print_exc()
+            CHAT_ERRORS.labels(error=type(e).__name__).inc()
+            logger.exception("ADK run failed (session %s)", session_id)
 
         # 4. Return Data
         # Returns both the reply and debug info for the frontend dashboard
-        return {
-            "reply": reply_text,
-            "debug_info": {
+        if response_mode == "lean":
+            debug_info = {"final_clean": cleaned_text, "vault_ref": vault_ref, "tier": guard_data.get("tier")}
+            if guard_data.get("degraded"):
+                debug_info["degraded"] = True
+        else:
+            debug_info = {
                 "original": user_message,
                 "final_clean": cleaned_text,
                 "session_data": session_vault,
                 "entities": guard_data.get("entities", []),
                 "performance": guard_data.get("performance", {}),
-                "database": DATABASE_USER
+                "degraded": guard_data.get("degraded", False),
+                "tier": guard_data.get("tier"),
+                # Demo accounts only; the store may hold millions of synthetic users
+                "database": await asyncio.to_thread(self.tools_instance.store.get_many, DEMO_ACCOUNTS)
             }
-        }
\ No newline at end of file
+        yield {"event": "done", "data": {"reply": reply_text, "debug_info": debug_info}}
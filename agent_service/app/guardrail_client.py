@@ -0,0 +1,136 @@
+import asyncio
+import os
+import random
+import time
+import httpx
+from .tracing import TRACER, inject_traceparent
+
+# Client errors worth retrying (load shed by admission control); 5xx are always retried
+RETRYABLE_STATUS = {429}
+
+
+class GuardrailClient:
+    """
+    Non-blocking client for the Guardrail Service.
+
+    Holds one `httpx.AsyncClient` with a keep-alive connection pool for the whole
+    process lifetime, so calls never block the event loop and never pay for a
+    new TCP connection. Transient failures are retried with jittered exponential backoff.
+
+    A call has one deadline (`GUARDRAIL_DEADLINE_MS`) shared by all its attempts
+    and backoff sleeps. Every attempt tells the guardrail how much of it is left
+    (`X-Request-Timeout-Ms`), so work queued for an attempt that has already timed
+    out is dropped server-side. Read timeouts are not retried: the guardrail is
+    still busy with that request, and another attempt would only add to its queue.
+    The current trace context travels in the `traceparent` header.
+    With `GUARDRAIL_LATENCY_BUDGET_MS` set, `/clean` calls carry a latency budget.
+    """
+    def __init__(self, url: str = None):
+        self.url = url or os.getenv("GUARDRAIL_SERVICE_URL", "http://guardrail-service:80/clean")
+        self.resolve_url = os.getenv("GUARDRAIL_RESOLVE_URL") or self.url.rsplit("/clean", 1)[0] + "/vault/resolve"
+        self.connect_timeout = float(os.getenv("GUARDRAIL_CONNECT_TIMEOUT", "1.0"))
+        self.max_retries = int(os.getenv("GUARDRAIL_MAX_RETRIES", "2"))
+        self.backoff_base = float(os.getenv("GUARDRAIL_BACKOFF_BASE", "0.1"))
+        self.max_connections = int(os.getenv("GUARDRAIL_MAX_CONNECTIONS", "20"))
+        # Unset: always the full (NER) tier; set: the guardrail may downgrade to meet it
+        budget = os.getenv("GUARDRAIL_LATENCY_BUDGET_MS")
+        self.latency_budget_ms = float(budget) if budget else None
+        # Whole call, retries included; by default twice the latency budget (queueing, network, one retry)
+        deadline = os.getenv("GUARDRAIL_DEADLINE_MS")
+        if deadline:
+            self.deadline = float(deadline) / 1000
+        else:
+            self.deadline = 2 * self.latency_budget_ms / 1000 if self.latency_budget_ms else 5.0
+        self._client = None
+
+    async def start(self):
+        """Creates the pooled HTTP client. Called once on application startup."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.deadline, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+
+    async def close(self):
+        """Closes all pooled connections. Called once on application shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def clean(self, text: str, response_mode: str = "full") -> dict:
+        """
+        Sends raw text to the Guardrail Service for PII masking.
+
+        Args:
+            response_mode (str): 'full' returns the vault and entities inline;
+                'lean' returns only the cleaned text and a `vault_ref`.
+
+        Raises:
+            httpx.HTTPError: If the guardrail is still failing after all retries.
+        """
+        payload = {
+            "text": text,
+            "response_mode": response_mode,
+            "include_performance": response_mode == "full"
+        }
+        if self.latency_budget_ms is not None:
+            payload["latency_budget_ms"] = self.latency_budget_ms
+        return await self._post(self.url, payload)
+
+    async def resolve(self, vault_ref: str, tags: list) -> dict:
+        """
+        Fetches the original values of some tags of a server-side vault.
+
+        Returns:
+            dict: {tag: value} for the tags present in the vault.
+
+        Raises:
+            httpx.HTTPError: If the reference expired (404) or the guardrail is unreachable.
+        """
+        data = await self._post(self.resolve_url, {"vault_ref": vault_ref, "tags": list(tags)})
+        return data["values"]
+
+    async def _post(self, url: str, payload: dict) -> dict:
+        """
+        POSTs JSON to the guardrail and returns the decoded response.
+
+        Retries on connection errors, 429 and 5xx responses while the call's
+        deadline leaves room for another attempt; never on read timeouts.
+        """
+        if self._client is None:
+            await self.start()
+
+        deadline = time.monotonic() + self.deadline
+        with TRACER.span("agent.guardrail_http", kind="client", attributes={"url.path": httpx.URL(url).path}) as span:
+            headers = inject_traceparent({})
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                span.set_attribute("attempts", attempt + 1)
+                remaining = deadline - time.monotonic()
+                headers["X-Request-Timeout-Ms"] = str(int(remaining * 1000))
+                timeout = httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+                try:
+                    response = await self._client.post(url, json=payload, headers=headers, timeout=timeout)
+                    span.set_attribute("http.status_code", response.status_code)
+                    response.raise_for_status()
+                    return response.json()
+                except httpx.HTTPStatusError as e:
+                    # Other 4xx responses will not succeed on retry
+                    status = e.response.status_code
+                    if (status < 500 and status not in RETRYABLE_STATUS) or last_attempt:
+                        raise
+                    error = e
+                except httpx.TransportError as e:
+                    # Only a connect timeout means the request never reached the guardrail
+                    timed_out = isinstance(e, httpx.TimeoutException) and not isinstance(e, httpx.ConnectTimeout)
+                    if timed_out or last_attempt:
+                        raise
+                    error = e
+                # Full jitter: sleep a random time up to the exponential backoff ceiling
+                delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    raise error
+                await asyncio.sleep(delay)
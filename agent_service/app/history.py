@@ -0,0 +1,214 @@
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+from google.adk.events import Event
+from google.adk.models import BaseLlm, LlmRequest
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from .metrics import HISTORY_BYTES, HISTORY_COMPACTIONS, HISTORY_EVENTS, HISTORY_TOTAL_BYTES
+
+# Invocation id marking the synthetic event that carries the summary of compacted turns
+SUMMARY_INVOCATION_ID = "history-summary"
+SUMMARY_PREFIX = "Ringkasan percakapan sebelumnya:\n"
+
+logger = logging.getLogger(__name__)
+
+# Summarizer: (previous summary, contents being compacted) -> new summary
+Summarizer = Callable[[str, List[types.Content]], Awaitable[str]]
+
+
+def _content_size(event: Event) -> int:
+    """Approximate in-memory size of an event, measured on its serialized content."""
+    if event.content is None:
+        return 64
+    return len(event.content.model_dump_json(exclude_none=True)) + 64
+
+
+class ExtractiveSummarizer:
+    """
+    Summarizes old turns without calling a model.
+
+    Keeps a short excerpt of every user and agent message and the names of the
+    tools that were called, bounded to `max_chars` (most recent lines win).
+    """
+    def __init__(self, max_chars: int = None, excerpt_chars: int = 160):
+        self.max_chars = max_chars if max_chars is not None else int(os.getenv("HISTORY_SUMMARY_CHARS", "2000"))
+        self.excerpt_chars = excerpt_chars
+
+    async def __call__(self, previous: str, contents: List[types.Content]) -> str:
+        lines = previous.splitlines() if previous else []
+        for content in contents:
+            speaker = "User" if content.role == "user" else "Domi"
+            for part in content.parts or []:
+                if part.text:
+                    lines.append(f"{speaker}: {part.text.strip()[:self.excerpt_chars]}")
+                elif part.function_call:
+                    lines.append(f"Tool: {part.function_call.name}()")
+
+        # Keep the most recent lines that fit in the budget
+        kept, size = [], 0
+        for line in reversed(lines):
+            size += len(line) + 1
+            if size > self.max_chars:
+                break
+            kept.append(line)
+        return "\n".join(reversed(kept))
+
+
+class LlmSummarizer:
+    """
+    Summarizes old turns with an ADK model (Gemini, or a local fake LLM in tests/benchmarks).
+
+    Falls back to the extractive summary if the model returns nothing or fails.
+    """
+    def __init__(self, llm: BaseLlm, max_chars: int = None):
+        self.llm = llm
+        self.fallback = ExtractiveSummarizer(max_chars)
+
+    async def __call__(self, previous: str, contents: List[types.Content]) -> str:
+        transcript = await ExtractiveSummarizer(max_chars=8000)("", contents)
+        prompt = (
+            "Ringkas percakapan customer service berikut dalam maksimal 5 poin singkat. "
+            "Pertahankan tag [REDACTED_...] apa adanya.\n\n"
+            f"Ringkasan sebelumnya:\n{previous or '-'}\n\nPercakapan:\n{transcript}"
+        )
+        request = LlmRequest(
+            model=self.llm.model,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
+        )
+        summary = ""
+        try:
+            async for response in self.llm.generate_content_async(request):
+                if response.content and response.content.parts:
+                    summary += "".join(part.text or "" for part in response.content.parts)
+        except Exception as e:
+            # Only the type: the message may quote the (masked) conversation
+            logger.warning("History summarization failed (%s), using the extractive summary", type(e).__name__)
+        return summary.strip()[:self.fallback.max_chars] or await self.fallback(previous, contents)
+
+
+class HistoryPolicy:
+    """
+    Bounds a session's event history.
+
+    - Sliding window: only the last `max_turns` turns (at least the current one)
+      are kept verbatim.
+    - Compaction: older turns are folded into a single summary event at the start.
+    - Tool payloads: function responses older than `tool_payload_turns` turns are
+      replaced by a stub, since the model only needs them right after the call
+      (0 stubs them all).
+    - Memory cap: if the kept history is still larger than `max_bytes`, more turns
+      are compacted (the current turn is always kept).
+    """
+    def __init__(self, max_turns: int = None, tool_payload_turns: int = None, max_bytes: int = None,
+                 summarizer: Optional[Summarizer] = None):
+        self.max_turns = max_turns if max_turns is not None else int(os.getenv("HISTORY_MAX_TURNS", "6"))
+        self.tool_payload_turns = (tool_payload_turns if tool_payload_turns is not None
+                                   else int(os.getenv("HISTORY_TOOL_PAYLOAD_TURNS", "1")))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("HISTORY_MAX_BYTES", "262144"))
+        self.summarizer = summarizer or ExtractiveSummarizer()
+
+    async def compact(self, events: List[Event]) -> Tuple[List[Event], int]:
+        """
+        Applies the policy to a full event list.
+
+        Returns:
+            List[Event]: The bounded event list.
+            int: Its estimated size in bytes.
+        """
+        summary_text = ""
+        if events and events[0].invocation_id == SUMMARY_INVOCATION_ID:
+            summary_text = events[0].content.parts[0].text[len(SUMMARY_PREFIX):]
+            events = events[1:]
+
+        turn_starts = [i for i, event in enumerate(events) if event.author == "user"] or [0]
+
+        # 1. Sliding window over turns
+        keep_turns = min(max(self.max_turns, 1), len(turn_starts))
+        trigger = "turns" if keep_turns < len(turn_starts) else None
+
+        # 2. Memory cap: drop whole turns (oldest first) until the window fits
+        sizes = [_content_size(event) for event in events]
+        while keep_turns > 1 and sum(sizes[turn_starts[-keep_turns]:]) > self.max_bytes:
+            keep_turns -= 1
+            trigger = trigger or "bytes"
+
+        keep_from = turn_starts[-keep_turns] if trigger else 0
+        old, recent = events[:keep_from], events[keep_from:]
+
+        # 3. Strip tool payloads from turns that are no longer fresh
+        if len(turn_starts) > self.tool_payload_turns:
+            fresh_from = (turn_starts[-self.tool_payload_turns] if self.tool_payload_turns else len(events)) - keep_from
+            recent = [
+                self._strip_tool_payloads(event) if i < fresh_from else event
+                for i, event in enumerate(recent)
+            ]
+
+        # 4. Fold compacted turns into the summary
+        if old:
+            HISTORY_COMPACTIONS.labels(trigger=trigger).inc()
+            summary_text = await self.summarizer(summary_text, [e.content for e in old if e.content])
+
+        bounded = ([self._summary_event(summary_text)] if summary_text else []) + recent
+        return bounded, sum(_content_size(event) for event in bounded)
+
+    @staticmethod
+    def _strip_tool_payloads(event: Event) -> Event:
+        """Replaces function response bodies with a stub, keeping the call/response pairing intact."""
+        if not event.content or not any(part.function_response for part in event.content.parts or []):
+            return event
+        parts = []
+        for part in event.content.parts:
+            if part.function_response and part.function_response.response != {"result": "[omitted]"}:
+                part = types.Part(function_response=types.FunctionResponse(
+                    id=part.function_response.id,
+                    name=part.function_response.name,
+                    response={"result": "[omitted]"}
+                ))
+            parts.append(part)
+        return event.model_copy(update={"content": types.Content(role=event.content.role, parts=parts)})
+
+    @staticmethod
+    def _summary_event(summary_text: str) -> Event:
+        return Event(
+            invocation_id=SUMMARY_INVOCATION_ID,
+            author="user",
+            content=types.Content(role="user", parts=[types.Part.from_text(text=SUMMARY_PREFIX + summary_text)])
+        )
+
+
+class BoundedSessionService(InMemorySessionService):
+    """
+    In-memory ADK session service that applies a `HistoryPolicy` at the start of every turn.
+
+    Compaction runs when a user message is appended, i.e. before the model is
+    called, so the prompt of the new turn is already bounded. Both the stored
+    session and the session object used by the running invocation are updated.
+    """
+    def __init__(self, policy: HistoryPolicy = None):
+        super().__init__()
+        self.policy = policy or HistoryPolicy()
+        # (app_name, user_id, session_id) -> estimated history bytes
+        self._sizes = {}
+
+    async def append_event(self, session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial or event.author != "user" or event.invocation_id == SUMMARY_INVOCATION_ID:
+            return event
+
+        events, size = await self.policy.compact(list(session.events))
+        session.events[:] = events
+        stored = self.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+        if stored is not None and stored is not session:
+            stored.events[:] = events
+
+        self._sizes[(session.app_name, session.user_id, session.id)] = size
+        HISTORY_EVENTS.observe(len(events))
+        HISTORY_BYTES.observe(size)
+        HISTORY_TOTAL_BYTES.set(sum(self._sizes.values()))
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._sizes.pop((app_name, user_id, session_id), None)
+        HISTORY_TOTAL_BYTES.set(sum(self._sizes.values()))
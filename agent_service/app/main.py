@@ -1,9 +1,20 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, HTTPException
+import json
+from typing import Literal, Optional
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from .core_agent import DomiAgent
+from .metrics import ACTIVE_SESSIONS, CONTENT_TYPE_LATEST, render
+from .sessions import ANONYMOUS_USER, SessionLimitReached
+from .tracing import TRACEPARENT_HEADER, parse_traceparent
+
+# Module loggers (guardrail fallbacks, ADK failures) go to stderr next to uvicorn's own logs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 # Initialize the main FastAPI application for the Agent Service
 app = FastAPI(title="Infomedia Agent Service (Brain)")
@@ -20,8 +31,13 @@ if os.path.exists(static_dir):
 # Global variable to hold the agent instance across requests
 agent = None
 
+# Header carrying the authenticated user, set by the auth gateway in front of the service
+# (clients must not be able to set it themselves). Requests without it share the
+# "anonymous" user, so the unguessable session id alone guards the conversation.
+USER_ID_HEADER = os.getenv("USER_ID_HEADER", "X-User-Id")
+
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     """
     Application Startup Handler.
     
@@ -31,18 +47,39 @@ def startup_event():
     global agent
     try:
         agent = DomiAgent()
-        print("✅ DomiAgent initialized successfully.")
-    except Exception as e:
-        print(f"❌ Failed to initialize Agent: {e}")
+        await agent.guardrail.start()
+        ACTIVE_SESSIONS.set_function(lambda: len(agent.sessions))
+        logger.info("DomiAgent initialized")
+    except Exception:
+        logger.exception("Failed to initialize the agent")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Closes the pooled Guardrail connections."""
+    if agent:
+        await agent.guardrail.close()
 
 # --- MODELS ---
 class ChatRequest(BaseModel):
-    """Schema for incoming chat messages."""
+    """
+    Schema for incoming chat messages.
+
+    `session_id` identifies the conversation. It is issued by the server: when
+    omitted a new conversation is started and its id returned in the response so
+    the client can continue it. Unknown, expired or foreign ids are rejected with 404;
+    starting a conversation is rejected with 429 while the user's session quota
+    (or the pod's) is taken by conversations in use.
+    `response_mode` ('full' or 'lean') overrides AGENT_RESPONSE_MODE; lean
+    replies carry no PII or debug blobs.
+    """
     message: str
+    session_id: Optional[str] = None
+    response_mode: Optional[Literal["full", "lean"]] = None
 
 class ChatResponse(BaseModel):
     """Schema for agent responses, including debug metadata."""
     reply: str
+    session_id: str
     debug: dict
 
 # --- ROUTES ---
@@ -70,21 +107,114 @@ def health_check():
         return {"status": "healthy", "service": "agent-service"}
     return {"status": "unhealthy", "reason": "agent not initialized"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (sessions, history size and compactions)."""
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+async def _resolve_session(req: ChatRequest, request: Request) -> tuple:
+    """
+    Returns the (user_id, session_id) the turn runs on.
+
+    Raises:
+        HTTPException: 404 if `req.session_id` was not issued to this user or has expired;
+            429 if no new session can be started while the user's (or the pod's) sessions are in use.
+    """
+    user_id = request.headers.get(USER_ID_HEADER) or ANONYMOUS_USER
+    if req.session_id is None:
+        try:
+            return user_id, await agent.sessions.issue(user_id)
+        except SessionLimitReached as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    if not agent.sessions.owns(user_id, req.session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return user_id, req.session_id
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(req: ChatRequest):
+async def chat_endpoint(req: ChatRequest, request: Request, traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)):
     """
     Main Chat Endpoint.
     
     Receives user input, processes it through the DomiAgent pipeline 
     (Guardrail -> Vault -> LLM -> Tools), and returns the response.
+    A `traceparent` header joins the caller's trace.
     """
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
+    user_id, session_id = await _resolve_session(req, request)
+
     # Asynchronously process the chat message
-    result = await agent.chat(req.message)
+    result = await agent.chat(req.message, user_id=user_id, session_id=session_id,
+                              response_mode=req.response_mode, trace_parent=parse_traceparent(traceparent))
     
     return ChatResponse(
         reply=result["reply"],
+        session_id=session_id,
         debug=result["debug_info"]
+    )
+
+def _sse(event: str, data: dict) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _wait_for_disconnect(request: Request):
+    """Returns as soon as the client closes the connection (the body has already been read)."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest, request: Request,
+                               traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)):
+    """
+    Streaming Chat Endpoint (Server-Sent Events).
+    
+    Emits `session`, `token`, `tool_start`, `tool_end` and a final `done` event
+    as the Guardrail -> LLM -> Tools pipeline progresses. If the client
+    disconnects, the stream stops and the ADK run is cancelled.
+    """
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    user_id, session_id = await _resolve_session(req, request)
+
+    async def event_source():
+        yield _sse("session", {"session_id": session_id})
+        events = asyncio.Queue()
+
+        async def run_turn():
+            # Own task, so a disconnect can cancel it even while it is waiting on the LLM
+            try:
+                async for event in agent.chat_stream(req.message, user_id=user_id, session_id=session_id,
+                                                     response_mode=req.response_mode,
+                                                     trace_parent=parse_traceparent(traceparent)):
+                    events.put_nowait(event)
+            finally:
+                events.put_nowait(None)
+
+        turn = asyncio.create_task(run_turn())
+        disconnected = asyncio.create_task(_wait_for_disconnect(request))
+        try:
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    logger.info("Client disconnected, cancelling the run of session %s", session_id)
+                    break
+                event = next_event.result()
+                if event is None:
+                    # Re-raises if the turn failed
+                    await turn
+                    break
+                yield _sse(event["event"], event["data"])
+        finally:
+            disconnected.cancel()
+            # Cancelling the turn closes chat_stream, which cancels the underlying ADK run
+            turn.cancel()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
\ No newline at end of file
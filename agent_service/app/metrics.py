@@ -0,0 +1,39 @@
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+
+# Default latency buckets (seconds), from in-process work up to slow LLM turns
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Skip the per-series `*_created` timestamps; nothing here uses them
+disable_created_metrics()
+
+
+def render() -> bytes:
+    """Current values of every metric in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
+
+
+# --- AGENT METRICS ---
+ACTIVE_SESSIONS = Gauge(
+    "agent_active_sessions", "ADK sessions currently held by the session pool.")
+HISTORY_EVENTS = Histogram(
+    "agent_history_events", "Events kept in a session's history after compaction.",
+    buckets=(5, 10, 20, 40, 80, 160, 320))
+HISTORY_BYTES = Histogram(
+    "agent_history_bytes", "Estimated size of a session's history after compaction.",
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576))
+HISTORY_TOTAL_BYTES = Gauge(
+    "agent_history_total_bytes", "Estimated size of all session histories held in memory.")
+HISTORY_COMPACTIONS = Counter(
+    "agent_history_compactions_total", "History compactions by trigger (turns/bytes).", ("trigger",))
+BREAKER_STATE = Gauge(
+    "agent_circuit_breaker_state", "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open).", ("dependency",))
+BREAKER_TRANSITIONS = Counter(
+    "agent_circuit_breaker_transitions_total", "Circuit breaker state transitions.", ("dependency", "from_state", "to_state"))
+GUARDRAIL_CALLS = Counter(
+    "agent_guardrail_calls_total", "Guardrail masking calls by outcome (ok/slow/error/short_circuit).", ("result",))
+GUARDRAIL_LATENCY = Histogram(
+    "agent_guardrail_latency_seconds", "Latency of input masking, by path (guardrail/fallback).", ("path",), buckets=LATENCY_BUCKETS)
+CHAT_ERRORS = Counter(
+    "agent_chat_errors_total", "Chat turns that failed inside the ADK runner.", ("error",))
+TRACE_SPANS = Counter(
+    "agent_trace_spans_total", "Sampled trace spans written to the JSONL file (exported) or lost to write errors (failed).", ("result",))
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# User id of callers without an authenticated user header; they all share one quota
+ANONYMOUS_USER = "anonymous"
+
+
+class SessionNotFound(Exception):
+    """Raised for session ids that were never issued, have expired, or belong to another user."""
+
+
+class SessionLimitReached(Exception):
+    """Raised when no session can be issued without evicting a conversation that is in use."""
+
+
+def new_session_id() -> str:
+    """Generates an unguessable conversation id."""
+    return secrets.token_urlsafe(24)
+
+
+class SessionPool:
+    """
+    Issues, tracks and evicts ADK sessions.
+
+    Session ids are generated server-side by `issue` and bound to the user they
+    were issued to; `session` refuses ids that are unknown, expired or owned by
+    someone else, so a client can neither pick nor hijack a conversation.
+
+    The pool is bounded: sessions idle for longer than `idle_timeout` are
+    dropped, and when `max_sessions` is reached the least recently used idle
+    session is evicted. Each user also has a quota (`max_sessions_per_user`;
+    `max_anonymous_sessions` shared by all anonymous callers): a user at their
+    quota only ever replaces their own least recently used idle session, so
+    nobody can flush other users' conversations by opening new ones. When
+    every candidate is in use, `issue` raises `SessionLimitReached` instead of
+    going over the limit. Each session also has its own lock so turns of the
+    same conversation run one at a time while different conversations run
+    concurrently.
+    """
+    def __init__(self, session_service, app_name: str, max_sessions: int = None, idle_timeout: float = None,
+                 max_sessions_per_user: int = None, max_anonymous_sessions: int = None):
+        """
+        Args:
+            session_service: The ADK session service (e.g. `runner.session_service`).
+            app_name (str): ADK application name the sessions belong to.
+            max_sessions (int): Maximum live sessions per pod.
+            idle_timeout (float): Seconds of inactivity before a session is evicted.
+            max_sessions_per_user (int): Maximum live sessions of one user.
+            max_anonymous_sessions (int): Maximum live sessions of all anonymous callers together.
+        """
+        self.session_service = session_service
+        self.app_name = app_name
+        self.max_sessions = max_sessions or int(os.getenv("MAX_SESSIONS", "1000"))
+        self.idle_timeout = idle_timeout or float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+        self.max_sessions_per_user = max_sessions_per_user or int(os.getenv("MAX_SESSIONS_PER_USER", "10"))
+        self.max_anonymous_sessions = max_anonymous_sessions or int(os.getenv("MAX_ANONYMOUS_SESSIONS", "100"))
+
+        # session_id -> last used timestamp, least recently used first
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        # session_id -> user_id the session was issued to
+        self._owners = {}
+        self._locks = {}
+        self._in_use = {}
+        self._pool_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._last_used)
+
+    async def issue(self, user_id: str) -> str:
+        """
+        Starts a new conversation for `user_id`.
+
+        Returns:
+            str: The new, server-generated session id.
+
+        Raises:
+            SessionLimitReached: If the user's quota or the pool is full of sessions in use.
+        """
+        session_id = new_session_id()
+        quota = self.max_anonymous_sessions if user_id == ANONYMOUS_USER else self.max_sessions_per_user
+        async with self._pool_lock:
+            await self._evict(time.monotonic() - self.idle_timeout)
+            owned = sum(1 for owner in self._owners.values() if owner == user_id)
+            if owned >= quota:
+                owned -= await self._evict(float("inf"), limit=owned - quota + 1, user_id=user_id)
+                if owned >= quota:
+                    raise SessionLimitReached(f"All {quota} sessions of this user are in use")
+            if len(self._last_used) >= self.max_sessions:
+                await self._evict(float("inf"), limit=len(self._last_used) - self.max_sessions + 1)
+                if len(self._last_used) >= self.max_sessions:
+                    raise SessionLimitReached(f"All {self.max_sessions} sessions are in use")
+            await self._create(user_id, session_id)
+            self._owners[session_id] = user_id
+            self._locks[session_id] = asyncio.Lock()
+            self._last_used[session_id] = time.monotonic()
+        return session_id
+
+    def owns(self, user_id: str, session_id: str) -> bool:
+        """Whether `session_id` is live and was issued to `user_id`."""
+        if self._owners.get(session_id) != user_id:
+            return False
+        return self._last_used[session_id] >= time.monotonic() - self.idle_timeout
+
+    @asynccontextmanager
+    async def session(self, user_id: str, session_id: str):
+        """
+        Holds the session's lock for the duration of one turn.
+
+        Sessions in use are never evicted.
+
+        Raises:
+            SessionNotFound: If the session was not issued to `user_id` or has been evicted.
+        """
+        async with self._pool_lock:
+            await self._evict(time.monotonic() - self.idle_timeout)
+            if self._owners.get(session_id) != user_id:
+                raise SessionNotFound(session_id)
+            self._last_used[session_id] = time.monotonic()
+            self._last_used.move_to_end(session_id)
+            self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+            lock = self._locks[session_id]
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._in_use[session_id] -= 1
+            if not self._in_use[session_id]:
+                del self._in_use[session_id]
+            if session_id in self._last_used:
+                self._last_used[session_id] = time.monotonic()
+                self._last_used.move_to_end(session_id)
+
+    async def _create(self, user_id: str, session_id: str):
+        """Creates the session in the ADK session service."""
+        try:
+            await self.session_service.create_session(
+                app_name=self.app_name,
+                session_id=session_id,
+                user_id=user_id
+            )
+            logger.debug("Session created: %s", session_id)
+        except Exception as e:
+            error_msg = str(e)
+            if "already exists" in error_msg.lower():
+                logger.debug("Session already exists: %s", session_id)
+            else:
+                logger.warning("Session creation failed for %s: %s", session_id, error_msg)
+
+    async def _evict(self, cutoff: float, limit: int = None, user_id: str = None) -> int:
+        """
+        Evicts idle sessions last used before `cutoff`, oldest first (caller holds the pool lock).
+
+        Args:
+            cutoff (float): Monotonic timestamp; only sessions used before it are evicted.
+            limit (int): Maximum number of sessions to evict (None = no limit).
+            user_id (str): Only evict this user's sessions (None = anyone's).
+
+        Returns:
+            int: The number of sessions evicted.
+        """
+        victims = []
+        for session_id, last_used in self._last_used.items():
+            if last_used >= cutoff or (limit is not None and len(victims) >= limit):
+                break
+            if session_id not in self._in_use and user_id in (None, self._owners[session_id]):
+                victims.append(session_id)
+
+        for session_id in victims:
+            del self._last_used[session_id]
+            del self._locks[session_id]
+            owner = self._owners.pop(session_id)
+            try:
+                await self.session_service.delete_session(
+                    app_name=self.app_name,
+                    user_id=owner,
+                    session_id=session_id
+                )
+            except Exception as e:
+                logger.warning("Session deletion failed for %s: %s", session_id, e)
+        return len(victims)
@@ -0,0 +1,425 @@
+"""
+Account storage behind `WalletTools`.
+
+Two implementations share the `AccountStore` interface:
+
+- `InMemoryAccountStore`: dicts with secondary indexes, for the demo and tests.
+- `SQLiteAccountStore`: embedded SQLite with indexes and a connection pool,
+  for large synthetic datasets and benchmarking.
+
+Both support lookups by NIK, email, phone and name, and an atomic withdrawal
+(check and debit in one step), so concurrent tool calls can never overdraw an account.
+Methods are blocking; async callers run them through `asyncio.to_thread`.
+
+Seeding with synthetic users:
+    python -m app.store --backend sqlite --path accounts.db --count 1000000
+"""
+import abc
+import argparse
+import os
+import queue
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Demo accounts representing the core banking user records (always seeded).
+# Keys represent the National ID (NIK) and values contain user profile details.
+DEMO_ACCOUNTS = {
+    "1234567890123456": {
+        "nama": "Arif Athaya",
+        "email": "arif@example.com",
+        "tgl_lahir": "04-10-2005",
+        "phone": "08123456789",
+        "alamat": "Jl. Emerald Alona G 43",
+        "saldo": 2000000,
+        "pin": "123456"
+    },
+    "3201123456789001": {
+        "nama": "Budi Santoso",
+        "email": "budi@test.com",
+        "tgl_lahir": "17-08-1990",
+        "phone": "089988776655",
+        "alamat": "Jl. Sudirman No 1 Jakarta",
+        "saldo": 150000,
+        "pin": "654321"
+    }
+}
+
+FIELDS = ("nik", "nama", "email", "tgl_lahir", "phone", "alamat", "saldo", "pin")
+
+
+def normalize_phone(phone: str) -> str:
+    """Normalizes Indonesian phone numbers to the local 08... form (+62/62 prefixes, separators)."""
+    digits = re.sub(r'\D', '', phone or "")
+    if digits.startswith("62"):
+        digits = "0" + digits[2:]
+    return digits
+
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive form of a name."""
+    return " ".join((name or "").lower().split())
+
+
+class AccountStore(abc.ABC):
+    """Interface of an account store. Accounts are plain dicts with the keys in `FIELDS`."""
+
+    @abc.abstractmethod
+    def get(self, nik: str) -> Optional[dict]:
+        """Returns a copy of the account with this NIK, or None."""
+
+    @abc.abstractmethod
+    def find_by_email(self, email: str) -> Optional[dict]:
+        """Returns the account with this email (case-insensitive), or None."""
+
+    @abc.abstractmethod
+    def find_by_phone(self, phone: str) -> Optional[dict]:
+        """Returns the account with this phone number (any +62/08 form), or None."""
+
+    @abc.abstractmethod
+    def find_by_name(self, name: str, limit: int = 10) -> List[dict]:
+        """Returns up to `limit` accounts with this name (case- and whitespace-insensitive)."""
+
+    @abc.abstractmethod
+    def withdraw(self, nik: str, amount: int) -> Tuple[bool, Optional[int]]:
+        """
+        Atomically debits `amount` if the balance covers it.
+
+        Returns:
+            bool: True if the account was debited.
+            int: The balance after the operation (None if the account does not exist).
+        """
+
+    @abc.abstractmethod
+    def add_accounts(self, accounts: Iterable[dict], replace: bool = True):
+        """
+        Inserts accounts (dicts with the keys in `FIELDS`).
+
+        Args:
+            accounts (Iterable[dict]): Accounts to insert.
+            replace (bool): Overwrite existing accounts with the same NIK; when False they are kept as they are.
+        """
+
+    def get_many(self, niks: Iterable[str]) -> Dict[str, dict]:
+        """Returns {nik: account} for the NIKs that exist (used by the debug dashboard)."""
+        accounts = {}
+        for nik in niks:
+            account = self.get(nik)
+            if account is not None:
+                accounts[nik] = {key: value for key, value in account.items() if key != "nik"}
+        return accounts
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Number of accounts."""
+
+
+class InMemoryAccountStore(AccountStore):
+    """
+    Dict-backed store with secondary indexes on email, phone and name.
+
+    Balance updates are serialized by a lock, so check-and-debit is atomic.
+    """
+    def __init__(self):
+        self._accounts: Dict[str, dict] = {}
+        self._by_email: Dict[str, str] = {}
+        self._by_phone: Dict[str, str] = {}
+        self._by_name: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def get(self, nik: str) -> Optional[dict]:
+        account = self._accounts.get(nik)
+        return dict(account) if account is not None else None
+
+    def find_by_email(self, email: str) -> Optional[dict]:
+        return self.get(self._by_email.get((email or "").lower()))
+
+    def find_by_phone(self, phone: str) -> Optional[dict]:
+        return self.get(self._by_phone.get(normalize_phone(phone)))
+
+    def find_by_name(self, name: str, limit: int = 10) -> List[dict]:
+        return [self.get(nik) for nik in self._by_name.get(normalize_name(name), [])[:limit]]
+
+    def withdraw(self, nik: str, amount: int) -> Tuple[bool, Optional[int]]:
+        with self._lock:
+            account = self._accounts.get(nik)
+            if account is None:
+                return False, None
+            if account["saldo"] < amount:
+                return False, account["saldo"]
+            account["saldo"] -= amount
+            return True, account["saldo"]
+
+    def add_accounts(self, accounts: Iterable[dict], replace: bool = True):
+        with self._lock:
+            for account in accounts:
+                nik = account["nik"]
+                if nik in self._accounts:
+                    if not replace:
+                        continue
+                    self._unindex(self._accounts[nik])
+                self._accounts[nik] = {key: account[key] for key in FIELDS}
+                self._by_email[account["email"].lower()] = nik
+                self._by_phone[normalize_phone(account["phone"])] = nik
+                self._by_name.setdefault(normalize_name(account["nama"]), []).append(nik)
+
+    def _unindex(self, account: dict):
+        self._by_email.pop(account["email"].lower(), None)
+        self._by_phone.pop(normalize_phone(account["phone"]), None)
+        niks = self._by_name.get(normalize_name(account["nama"]), [])
+        if account["nik"] in niks:
+            niks.remove(account["nik"])
+
+
+class SQLiteAccountStore(AccountStore):
+    """
+    Embedded SQLite store with indexes on email, phone and name.
+
+    Connections are pooled (one per concurrent caller, up to `pool_size`) and
+    the database runs in WAL mode so readers never wait for a withdrawal.
+    Withdrawals are a single conditional UPDATE inside an immediate transaction.
+    """
+    def __init__(self, path: str = None, pool_size: int = None):
+        """
+        Args:
+            path (str): Database file, or ':memory:' for a private shared-cache in-memory database.
+            pool_size (int): Maximum number of pooled connections (always 1 for ':memory:').
+        """
+        self.path = path or os.getenv("ACCOUNT_DB_PATH", "accounts.db")
+        self.pool_size = pool_size or int(os.getenv("ACCOUNT_DB_POOL_SIZE", "8"))
+        if self.path == ":memory:":
+            # Pooled connections must all see the same in-memory database
+            self._uri = f"file:accounts-{id(self)}?mode=memory&cache=shared"
+            # Shared-cache table locks fail at once with SQLITE_LOCKED (busy_timeout does
+            # not apply) instead of waiting, so calls take turns on a single connection
+            self.pool_size = 1
+        else:
+            self._uri = f"file:{self.path}"
+
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        # Keeps a shared-cache in-memory database alive between calls
+        self._keepalive = self._connect()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a pooled connection, creating one if the pool is not yet full."""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._created < self.pool_size
+                self._created += create
+            connection = self._connect() if create else self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    def _create_schema(self):
+        with self._connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    nik TEXT PRIMARY KEY,
+                    nama TEXT NOT NULL,
+                    nama_norm TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    email_norm TEXT NOT NULL,
+                    tgl_lahir TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    phone_norm TEXT NOT NULL,
+                    alamat TEXT NOT NULL,
+                    saldo INTEGER NOT NULL CHECK (saldo >= 0),
+                    pin TEXT NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_accounts_email ON accounts (email_norm);
+                CREATE INDEX IF NOT EXISTS idx_accounts_phone ON accounts (phone_norm);
+                CREATE INDEX IF NOT EXISTS idx_accounts_nama ON accounts (nama_norm);
+            """)
+
+    def __len__(self):
+        with self._connection() as db:
+            return db.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def _one(self, column: str, value: str) -> Optional[dict]:
+        with self._connection() as db:
+            row = db.execute(
+                f"SELECT {', '.join(FIELDS)} FROM accounts WHERE {column} = ? LIMIT 1", (value,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def get(self, nik: str) -> Optional[dict]:
+        return self._one("nik", nik)
+
+    def find_by_email(self, email: str) -> Optional[dict]:
+        return self._one("email_norm", (email or "").lower())
+
+    def find_by_phone(self, phone: str) -> Optional[dict]:
+        return self._one("phone_norm", normalize_phone(phone))
+
+    def find_by_name(self, name: str, limit: int = 10) -> List[dict]:
+        with self._connection() as db:
+            rows = db.execute(
+                f"SELECT {', '.join(FIELDS)} FROM accounts WHERE nama_norm = ? LIMIT ?",
+                (normalize_name(name), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def withdraw(self, nik: str, amount: int) -> Tuple[bool, Optional[int]]:
+        with self._connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                debited = db.execute(
+                    "UPDATE accounts SET saldo = saldo - ? WHERE nik = ? AND saldo >= ?",
+                    (amount, nik, amount)
+                ).rowcount
+                row = db.execute("SELECT saldo FROM accounts WHERE nik = ?", (nik,)).fetchone()
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return bool(debited), (row["saldo"] if row is not None else None)
+
+    def backup(self, path: str):
+        """Writes a consistent copy of the database to `path`."""
+        with self._connection() as db:
+            target = sqlite3.connect(path)
+            try:
+                db.backup(target)
+            finally:
+                target.close()
+
+    def add_accounts(self, accounts: Iterable[dict], replace: bool = True, batch_size: int = 10000):
+        statement = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        rows = (
+            (a["nik"], a["nama"], normalize_name(a["nama"]), a["email"], a["email"].lower(), a["tgl_lahir"],
+             a["phone"], normalize_phone(a["phone"]), a["alamat"], a["saldo"], a["pin"])
+            for a in accounts
+        )
+        with self._connection() as db:
+            while True:
+                batch = [row for _, row in zip(range(batch_size), rows)]
+                if not batch:
+                    break
+                db.execute("BEGIN")
+                try:
+                    db.executemany(f"{statement} INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    db.execute("COMMIT")
+                except Exception:
+                    # Never hand a connection with an open transaction back to the pool
+                    db.execute("ROLLBACK")
+                    raise
+
+
+def demo_accounts() -> Iterator[dict]:
+    """The demo accounts as store records."""
+    for nik, account in DEMO_ACCOUNTS.items():
+        yield {"nik": nik, **account}
+
+
+_FIRST_NAMES = ["Agus", "Budi", "Citra", "Dewi", "Eko", "Fitri", "Gilang", "Hana", "Indra", "Joko",
+                "Kartika", "Lestari", "Made", "Nur", "Putri", "Rizky", "Sari", "Taufik", "Wulan", "Yusuf"]
+_LAST_NAMES = ["Santoso", "Wijaya", "Saputra", "Hidayat", "Lestari", "Pratama", "Kusuma", "Nugroho",
+               "Siregar", "Simanjuntak", "Putra", "Rahmawati", "Setiawan", "Wibowo", "Harahap"]
+_STREETS = ["Sudirman", "Thamrin", "Gatot Subroto", "Diponegoro", "Merdeka", "Ahmad Yani", "Pahlawan", "Melati"]
+_CITIES = ["Jakarta", "Bandung", "Surabaya", "Medan", "Semarang", "Makassar", "Yogyakarta", "Denpasar"]
+
+
+def synthetic_accounts(count: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Generates `count` deterministic synthetic accounts with unique NIK, email and phone.
+
+    NIKs start with '99' so they never collide with the demo accounts.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        yield {
+            "nik": f"99{i:014d}",
+            "nama": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}{i}@example.id",
+            "tgl_lahir": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1960, 2005)}",
+            "phone": f"0819{i:08d}",
+            "alamat": f"Jl. {rng.choice(_STREETS)} No {rng.randint(1, 200)} {rng.choice(_CITIES)}",
+            "saldo": rng.randrange(0, 10000000, 1000),
+            "pin": f"{rng.randint(0, 999999):06d}"
+        }
+
+
+def build_store(backend: str = None) -> AccountStore:
+    """
+    Creates the store selected by ACCOUNT_STORE (memory|sqlite), seeded with the demo accounts.
+
+    Demo accounts that already exist are left untouched, so restarting on a
+    persistent SQLite database keeps their balances and PINs.
+
+    SYNTHETIC_ACCOUNTS adds that many synthetic accounts to an in-memory store
+    (a SQLite database is expected to be seeded beforehand with this module's CLI).
+    """
+    backend = backend or os.getenv("ACCOUNT_STORE", "memory")
+    if backend == "memory":
+        store = InMemoryAccountStore()
+        store.add_accounts(synthetic_accounts(int(os.getenv("SYNTHETIC_ACCOUNTS", "0"))))
+    elif backend == "sqlite":
+        store = SQLiteAccountStore()
+    else:
+        raise ValueError(f"Unknown account store '{backend}', expected 'memory' or 'sqlite'")
+    store.add_accounts(demo_accounts(), replace=False)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeds an account store with synthetic users.")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--path", default=os.getenv("ACCOUNT_DB_PATH", "accounts.db"))
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookups", type=int, default=10000, help="Random NIK lookups timed after seeding")
+    args = parser.parse_args()
+
+    store = SQLiteAccountStore(args.path) if args.backend == "sqlite" else InMemoryAccountStore()
+    start = time.perf_counter()
+    store.add_accounts(synthetic_accounts(args.count, args.seed))
+    store.add_accounts(demo_accounts())
+    print(f"✅ Seeded {args.count} accounts in {time.perf_counter() - start:.1f}s ({len(store)} total)")
+
+    rng = random.Random(args.seed)
+    niks = [f"99{rng.randrange(args.count):014d}" for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for nik in niks:
+        store.get(nik)
+    print(f"⏱️ get(): {(time.perf_counter() - start) * 1e6 / len(niks):.1f} µs per lookup")
+
+    # Withdrawals are timed on a throwaway copy so the seeded balances stay intact
+    # (an in-memory store is discarded on exit anyway)
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.backend == "sqlite":
+            copy_path = os.path.join(scratch, "accounts.db")
+            store.backup(copy_path)
+            store = SQLiteAccountStore(copy_path)
+        start = time.perf_counter()
+        for nik in niks:
+            store.withdraw(nik, 1000)
+        print(f"⏱️ withdraw(): {(time.perf_counter() - start) * 1e6 / len(niks):.1f} µs per call (on a copy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,41 @@
-# Mock In-Memory Database representing the core banking user records.
-# Keys represent the National ID (NIK) and values contain user profile details.
-DATABASE_USER = {
-    "1234567890123456": {
-        "nama": "Arif Athaya",
-        "email": "arif@example.com",
-        "tgl_lahir": "04-10-2005",
-        "phone": "08123456789",
-        "alamat": "Jl. Emerald Alona G 43",
-        "saldo": 2000000,
-        "pin": "123456"
-    },
-    "3201123456789001": {
-        "nama": "Budi Santoso",
-        "email": "budi@test.com",
-        "tgl_lahir": "17-08-1990",
-        "phone": "089988776655",
-        "alamat": "Jl. Sudirman No 1 Jakarta",
-        "saldo": 150000,
-        "pin": "654321"
-    }
-}
+import asyncio
+import functools
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional
+from .store import AccountStore, build_store
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# Resolver: (vault_ref, tags) -> {tag: original value}, e.g. `GuardrailClient.resolve`
+VaultResolver = Callable[[str, List[str]], Awaitable[dict]]
+
+# Fixed withdrawal amount and minimum balance required for it
+WITHDRAW_AMOUNT = 50000
+
+# Vault of the request currently being processed.
+# A ContextVar is isolated per asyncio task, so concurrent chats never see each other's PII.
+_current_vault: ContextVar[dict] = ContextVar("current_vault", default={})
+# Reference to a server-side vault, resolved on demand when the inline vault lacks a tag
+_current_vault_ref: ContextVar[Optional[str]] = ContextVar("current_vault_ref", default=None)
+
+def _traced(tool):
+    """
+    Runs a tool inside a 'tool.<name>' span.
+
+    Only the outcome word of the result (e.g. BERHASIL/GAGAL) is recorded,
+    never arguments or messages. The signature is preserved for ADK.
+    """
+    @functools.wraps(tool)
+    async def wrapper(self, *args, **kwargs):
+        with TRACER.span(f"tool.{tool.__name__}") as span:
+            result = await tool(self, *args, **kwargs)
+            status = result.get("status") if isinstance(result, dict) else str(result).split(":", 1)[0]
+            span.set_attribute("outcome", status)
+            return result
+    return wrapper
 
 class WalletTools:
     """
@@ -27,35 +43,69 @@ class WalletTools:
     
     This class handles logic for authentication, requests, and transactions,
     utilizing a secure context (Vault) to access redacted PII data.
+    Account data comes from a pluggable `AccountStore`.
     """
-    def __init__(self):
-        # Stores the temporary decrypted PII data for the current request
-        self.current_session_context = {}
+    def __init__(self, store: AccountStore = None, resolver: VaultResolver = None):
+        """
+        Args:
+            store (AccountStore): Account storage (default selected by ACCOUNT_STORE).
+            resolver (VaultResolver): Fetches tag values of a server-side vault by reference.
+        """
+        self.store = store or build_store()
+        self.resolver = resolver
+
+    @property
+    def current_session_context(self) -> dict:
+        """The temporary decrypted PII data (Vault) for the current request."""
+        return _current_vault.get()
 
-    def set_context(self, session_data: dict):
+    @contextmanager
+    def use_context(self, session_data: dict, vault_ref: str = None):
         """
         Injects the secure 'Vault' data from the Guardrail Service
-        into the tool's execution context.
+        into the tool's execution context for the duration of one request.
+
+        Either the vault itself (`session_data`) or a reference to the vault
+        kept by the Guardrail Service (`vault_ref`) is injected; with a
+        reference, tools fetch only the tags they use, when they use them.
+        The vault is request-scoped (ContextVar), not shared instance state.
         """
-        self.current_session_context = session_data
+        token = _current_vault.set(session_data)
+        ref_token = _current_vault_ref.set(vault_ref)
+        try:
+            yield
+        finally:
+            _current_vault.reset(token)
+            _current_vault_ref.reset(ref_token)
+
+    async def _reveal(self, *tags: str) -> list:
+        """Returns the real values behind `tags` (None for unknown tags)."""
+        vault = self.current_session_context
+        missing = [tag for tag in tags if tag not in vault]
+        vault_ref = _current_vault_ref.get()
+        if missing and vault_ref and self.resolver:
+            try:
+                vault = {**vault, **await self.resolver(vault_ref, missing)}
+            except Exception as e:
+                logger.warning("Vault resolution failed: %r", e)
+        return [vault.get(tag) for tag in tags]
 
-    def ganti_password(self, nik_tag: str, email_tag: str, birthdate_tag: str):
+    @_traced
+    async def ganti_password(self, nik_tag: str, email_tag: str, birthdate_tag: str):
         """
         Initiates a password reset process by verifying user identity.
         
         Validates NIK, Email, and Date of Birth against the database.
         """
         # Retrieve real values from the secure vault using redacted tags
-        real_nik = self.current_session_context.get(nik_tag)
-        real_email = self.current_session_context.get(email_tag)
-        real_birthdate = self.current_session_context.get(birthdate_tag)
+        real_nik, real_email, real_birthdate = await self._reveal(nik_tag, email_tag, birthdate_tag)
 
         # Ensure all required PII data is present in the session
         if not all([real_nik, real_email, real_birthdate]):
             return "GAGAL: Data NIK, Email, atau Tanggal Lahir tidak lengkap/sesi invalid."
 
-        # Database lookup
-        user = DATABASE_USER.get(real_nik)
+        # Database lookup (off the event loop; the store is blocking)
+        user = await asyncio.to_thread(self.store.get, real_nik)
         if not user:
             return f"GAGAL: NIK {real_nik} tidak terdaftar."
 
@@ -65,14 +115,13 @@ class WalletTools:
         else:
             return "GAGAL: Data tidak cocok."
 
-    def request_kartu_fisik(self, nama_tag: str, alamat_tag: str, phone_tag: str):
+    @_traced
+    async def request_kartu_fisik(self, nama_tag: str, alamat_tag: str, phone_tag: str):
         """
         Processes a request for a physical debit card delivery.
         """
         # Resolve real entity values from the secure context
-        real_nama = self.current_session_context.get(nama_tag)
-        real_alamat = self.current_session_context.get(alamat_tag)
-        real_phone = self.current_session_context.get(phone_tag)
+        real_nama, real_alamat, real_phone = await self._reveal(nama_tag, alamat_tag, phone_tag)
 
         # Validation check for required shipping details
         if not all([real_nama, real_alamat, real_phone]):
@@ -83,22 +132,21 @@ class WalletTools:
             "message": f"Kartu fisik a.n '{real_nama}' akan dikirim ke '{real_alamat}'."
         }
 
-    def withdraw_ke_bank(self, nik_tag: str, bank_num_tag: str, nama_pemilik_tag: str):
+    @_traced
+    async def withdraw_ke_bank(self, nik_tag: str, bank_num_tag: str, nama_pemilik_tag: str):
         """
         Executes a fund withdrawal to an external bank account.
         
         Performs validation on account ownership and balance sufficiency.
         """
         # Retrieve transaction details from the vault
-        real_nik = self.current_session_context.get(nik_tag)
-        real_bank_num = self.current_session_context.get(bank_num_tag)
-        real_nama_pemilik = self.current_session_context.get(nama_pemilik_tag)
+        real_nik, real_bank_num, real_nama_pemilik = await self._reveal(nik_tag, bank_num_tag, nama_pemilik_tag)
 
         # Validate transaction inputs
         if not all([real_nik, real_bank_num, real_nama_pemilik]):
             return "GAGAL: Data transaksi tidak lengkap."
 
-        user = DATABASE_USER.get(real_nik)
+        user = await asyncio.to_thread(self.store.get, real_nik)
         if not user: 
             return "GAGAL: User tidak ditemukan."
 
@@ -106,14 +154,13 @@ class WalletTools:
         if real_nama_pemilik.lower() not in user['nama'].lower():
             return f"GAGAL: Nama pemilik rekening ({real_nama_pemilik}) TIDAK SESUAI akun."
 
-        # Check for minimum balance requirement
-        if user['saldo'] < 50000:
-            return f"GAGAL: Saldo {user['saldo']} kurang dari min. 50.000."
-        
-        # Deduct balance and commit transaction
-        user['saldo'] -= 50000
+        # Check the minimum balance and deduct it in one atomic step,
+        # so concurrent withdrawals can never overdraw the account
+        debited, saldo = await asyncio.to_thread(self.store.withdraw, real_nik, WITHDRAW_AMOUNT)
+        if not debited:
+            return f"GAGAL: Saldo {saldo} kurang dari min. 50.000."
         
         return {
             "status": "BERHASIL",
-            "message": f"Transfer ke {real_bank_num} berhasil. Sisa saldo: {user['saldo']}"
+            "message": f"Transfer ke {real_bank_num} berhasil. Sisa saldo: {saldo}"
         }
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""Tracer of the agent service; the implementation lives in `shared.tracing`."""
+from shared.tracing import TRACEPARENT_HEADER, Tracer, inject_traceparent, parse_traceparent, record_error
+from .metrics import TRACE_SPANS
+
+TRACER = Tracer("agent-service", TRACE_SPANS)
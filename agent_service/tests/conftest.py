@@ -0,0 +1,11 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Tests import the service as `app`, like uvicorn does from this directory;
+# benchmarks/ provides the fake LLM; shared/ is importable from the repository root
+sys.path.insert(0, os.path.join(ROOT, "agent_service"))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+# No trace files from test runs
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
@@ -0,0 +1,107 @@
+import types
+import pytest
+from app import circuit_breaker
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def _breaker(**kwargs):
+    settings = dict(failure_threshold=3, slow_call_seconds=1.0, reset_timeout=10.0, half_open_max_calls=1)
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_success(1.5)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_slow_probe_reopens(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+
+def test_lost_probe_does_not_block_recovery(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    # The probe never reports back (e.g. its task was cancelled)
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
@@ -0,0 +1,49 @@
+import json
+import os
+import pytest
+from app.fallback_masker import DEFAULT_RULES_PATH, FallbackMasker, load_rules
+
+RULES = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                     "guardrail_service", "config", "detection_rules.json")
+
+
+def test_patterns_come_from_guardrail_rules(monkeypatch):
+    monkeypatch.delenv("RULES_PATH", raising=False)
+    with open(RULES, encoding="utf-8") as f:
+        config = json.load(f)
+    masker = FallbackMasker()
+    assert os.path.samefile(masker.rules_path, RULES)
+    assert masker.rules_version == config["version"]
+    assert masker.patterns == [(rule["label"], rule["pattern"]) for rule in config["rules"]]
+
+
+def test_rules_path_from_environment(monkeypatch, tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"version": "t1", "rules": [{"label": "PIN", "pattern": r"\bPIN\d{4}\b"}]}))
+    monkeypatch.setenv("RULES_PATH", str(path))
+    masker = FallbackMasker()
+    assert masker.rules_version == "t1"
+    assert masker.clean("PIN1234 dan 3201123456789001")["cleaned_text"] == "[REDACTED_PIN] dan 3201123456789001"
+
+
+@pytest.mark.parametrize("config", [{"rules": []}, {"version": "x", "rules": [{"label": "A"}]}, []])
+def test_invalid_rules_file(tmp_path, config):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(config))
+    with pytest.raises(ValueError, match="not a detection rules file"):
+        load_rules(str(path))
+
+
+def test_pattern_that_does_not_compile(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"version": "x", "rules": [{"label": "A", "pattern": "[0-9"}]}))
+    with pytest.raises(ValueError, match="does not compile"):
+        load_rules(str(path))
+
+
+def test_clean_masks_structured_pii_only():
+    result = FallbackMasker(DEFAULT_RULES_PATH).clean("Budi, NIK 3201123456789001, hp +6281234567890, rek 1234567890")
+    assert result["cleaned_text"] == "Budi, NIK [REDACTED_NIK], hp [REDACTED_PHONE], rek [REDACTED_BANK_NUM]"
+    assert result["vault"] == {"[REDACTED_NIK]": "3201123456789001", "[REDACTED_PHONE]": "+6281234567890",
+                               "[REDACTED_BANK_NUM]": "1234567890"}
+    assert result["degraded"] is True
@@ -0,0 +1,106 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.guardrail_client import GuardrailClient
+
+
+def _client(monkeypatch, handler, **env):
+    settings = {"GUARDRAIL_MAX_RETRIES": "3", "GUARDRAIL_BACKOFF_BASE": "0", "GUARDRAIL_DEADLINE_MS": "500"}
+    settings.update(env)
+    for name, value in settings.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("GUARDRAIL_LATENCY_BUDGET_MS", raising=False)
+    client = GuardrailClient("http://guardrail/clean")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _run(client, coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+
+def test_retries_5xx_with_the_remaining_deadline(monkeypatch):
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(int(request.headers["X-Request-Timeout-Ms"]))
+        if len(timeouts) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"cleaned_text": "ok"})
+
+    client = _client(monkeypatch, handler)
+    assert _run(client, client.clean("hi"))["cleaned_text"] == "ok"
+    assert len(timeouts) == 3
+    assert 0 < timeouts[-1] <= timeouts[0] <= 500
+
+
+def test_read_timeout_is_not_retried(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = _client(monkeypatch, handler)
+    with pytest.raises(httpx.ReadTimeout):
+        _run(client, client.clean("hi"))
+    assert len(calls) == 1
+
+
+def test_connect_errors_are_retried(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"cleaned_text": "ok"})
+
+    client = _client(monkeypatch, handler)
+    assert _run(client, client.clean("hi"))["cleaned_text"] == "ok"
+    assert len(calls) == 2
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(422)
+
+    client = _client(monkeypatch, handler)
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(client, client.clean("hi"))
+    assert len(calls) == 1
+
+
+def test_backoff_stops_at_the_deadline(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429)
+
+    # Backoff ceilings of 1s, 2s, ... would overrun a 100ms deadline after the first attempt
+    client = _client(monkeypatch, handler, GUARDRAIL_BACKOFF_BASE="1", GUARDRAIL_DEADLINE_MS="100",
+                     GUARDRAIL_MAX_RETRIES="10")
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    start = time.monotonic()
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(client, client.clean("hi"))
+    assert len(calls) == 1
+    assert time.monotonic() - start < 0.1
+
+
+def test_deadline_defaults_to_twice_the_latency_budget(monkeypatch):
+    monkeypatch.delenv("GUARDRAIL_DEADLINE_MS", raising=False)
+    monkeypatch.setenv("GUARDRAIL_LATENCY_BUDGET_MS", "800")
+    assert GuardrailClient().deadline == pytest.approx(1.6)
+    monkeypatch.delenv("GUARDRAIL_LATENCY_BUDGET_MS")
+    assert GuardrailClient().deadline == 5.0
@@ -0,0 +1,132 @@
+import asyncio
+from typing import List
+from google.adk.agents import Agent
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+from pydantic import Field
+from fake_llm import FakeLlm
+from app.history import (SUMMARY_INVOCATION_ID, SUMMARY_PREFIX, BoundedSessionService, ExtractiveSummarizer,
+                         HistoryPolicy, LlmSummarizer)
+
+APP, USER = "test_app", "user-1"
+
+
+class RecordingLlm(FakeLlm):
+    """Fake LLM without latency that keeps the contents of every prompt it receives."""
+    first_token_ms: float = 0
+    token_ms: float = 0
+    prompts: List[list] = Field(default_factory=list)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.prompts.append(list(llm_request.contents))
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+def _text(content: types.Content) -> str:
+    return "".join(part.text or "" for part in content.parts or [])
+
+
+def _user(text: str) -> Event:
+    return Event(author="user", content=types.Content(role="user", parts=[types.Part.from_text(text=text)]))
+
+
+def _model(part: types.Part, role: str = "model") -> Event:
+    return Event(author="domi", content=types.Content(role=role, parts=[part]))
+
+
+async def _chat(turns: int, policy: HistoryPolicy):
+    llm = RecordingLlm()
+    service = BoundedSessionService(policy)
+    runner = Runner(agent=Agent(model=llm, name="domi", instruction="Jawab singkat."),
+                    app_name=APP, session_service=service)
+    session = await service.create_session(app_name=APP, user_id=USER)
+    for i in range(turns):
+        message = types.Content(role="user", parts=[types.Part.from_text(text=f"pesan ke-{i}")])
+        async for _ in runner.run_async(user_id=USER, session_id=session.id, new_message=message):
+            pass
+    stored = await service.get_session(app_name=APP, user_id=USER, session_id=session.id)
+    return llm, service, stored
+
+
+def test_runner_history_is_compacted_into_a_summary():
+    summarizer = LlmSummarizer(RecordingLlm())
+    llm, service, session = asyncio.run(_chat(5, HistoryPolicy(max_turns=2, summarizer=summarizer)))
+
+    events = session.events
+    assert events[0].invocation_id == SUMMARY_INVOCATION_ID
+    assert _text(events[0].content) == SUMMARY_PREFIX + "- Pengguna menghubungi customer service Domi."
+    assert [_text(e.content) for e in events[1:] if e.author == "user"] == ["pesan ke-3", "pesan ke-4"]
+    # Older turns went to the summarizer, not to the model
+    assert len(summarizer.llm.prompts) == 3
+    last_prompt = " ".join(_text(content) for content in llm.prompts[-1])
+    assert "pesan ke-2" not in last_prompt and "pesan ke-4" in last_prompt
+
+
+def test_short_history_is_kept_verbatim():
+    _, service, session = asyncio.run(_chat(2, HistoryPolicy(max_turns=6)))
+    assert [e.author for e in session.events] == ["user", "domi", "user", "domi"]
+    assert len(service._sizes) == 1
+
+
+def test_delete_session_forgets_its_size():
+    async def scenario():
+        _, service, session = await _chat(1, HistoryPolicy(max_turns=6))
+        await service.delete_session(app_name=APP, user_id=USER, session_id=session.id)
+        return service
+    assert asyncio.run(scenario())._sizes == {}
+
+
+def test_old_tool_payloads_are_stubbed():
+    call = types.FunctionCall(id="c1", name="cek_saldo", args={"nik_tag": "[REDACTED_NIK]"})
+    response = types.FunctionResponse(id="c1", name="cek_saldo", response={"result": "Saldo Rp 2.000.000"})
+    events = [
+        _user("cek saldo [REDACTED_NIK]"),
+        _model(types.Part(function_call=call)),
+        _model(types.Part(function_response=response), role="user"),
+        _model(types.Part.from_text(text="Saldo Anda Rp 2.000.000")),
+        _user("terima kasih"),
+    ]
+    bounded, _ = asyncio.run(HistoryPolicy(max_turns=6, tool_payload_turns=1).compact(events))
+    assert len(bounded) == len(events)
+    assert bounded[1].content.parts[0].function_call.name == "cek_saldo"
+    stub = bounded[2].content.parts[0].function_response
+    assert (stub.id, stub.name, stub.response) == ("c1", "cek_saldo", {"result": "[omitted]"})
+    # The stored events are not mutated
+    assert events[2].content.parts[0].function_response.response == {"result": "Saldo Rp 2.000.000"}
+
+
+def test_memory_cap_compacts_all_but_the_current_turn():
+    events = []
+    for i in range(3):
+        events += [_user(f"pesan ke-{i} " + "x" * 500), _model(types.Part.from_text(text="ok"))]
+    events.append(_user("pesan terakhir"))
+    policy = HistoryPolicy(max_turns=6, max_bytes=300, summarizer=ExtractiveSummarizer(excerpt_chars=10))
+    bounded, size = asyncio.run(policy.compact(events))
+    assert [_text(e.content) for e in bounded[1:]] == ["pesan terakhir"]
+    assert _text(bounded[0].content).startswith(SUMMARY_PREFIX + "User: pesan ke-0")
+    assert size < 1000
+
+
+def test_zero_settings_are_not_replaced_by_defaults(monkeypatch):
+    monkeypatch.setenv("HISTORY_TOOL_PAYLOAD_TURNS", "3")
+    policy = HistoryPolicy(max_turns=0, tool_payload_turns=0, max_bytes=0)
+    assert (policy.max_turns, policy.tool_payload_turns, policy.max_bytes) == (0, 0, 0)
+    assert ExtractiveSummarizer(max_chars=0).max_chars == 0
+
+
+def test_zero_turns_keeps_the_current_turn_and_no_tool_payloads():
+    call = types.FunctionCall(id="c1", name="cek_saldo", args={})
+    response = types.FunctionResponse(id="c1", name="cek_saldo", response={"result": "Saldo Rp 2.000.000"})
+    events = [
+        _user("halo"),
+        _model(types.Part.from_text(text="Halo!")),
+        _user("cek saldo"),
+        _model(types.Part(function_call=call)),
+        _model(types.Part(function_response=response), role="user"),
+    ]
+    bounded, _ = asyncio.run(HistoryPolicy(max_turns=0, tool_payload_turns=0).compact(events))
+    assert bounded[0].invocation_id == SUMMARY_INVOCATION_ID
+    assert [_text(event.content) for event in bounded[1:2]] == ["cek saldo"]
+    assert bounded[-1].content.parts[0].function_response.response == {"result": "[omitted]"}
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from google.adk.sessions import InMemorySessionService
+from app.sessions import ANONYMOUS_USER, SessionLimitReached, SessionNotFound, SessionPool
+
+
+def _pool(**kwargs):
+    settings = dict(max_sessions=4, idle_timeout=60, max_sessions_per_user=2, max_anonymous_sessions=3)
+    settings.update(kwargs)
+    return SessionPool(InMemorySessionService(), "test", **settings)
+
+
+def test_sessions_are_bound_to_their_user():
+    async def run():
+        pool = _pool()
+        session_id = await pool.issue("alice")
+        assert pool.owns("alice", session_id)
+        assert not pool.owns("bob", session_id)
+        with pytest.raises(SessionNotFound):
+            async with pool.session("bob", session_id):
+                pass
+    asyncio.run(run())
+
+
+def test_user_quota_replaces_only_their_own_idle_sessions():
+    async def run():
+        pool = _pool()
+        bob = await pool.issue("bob")
+        first = await pool.issue("alice")
+        second = await pool.issue("alice")
+        third = await pool.issue("alice")
+        assert not pool.owns("alice", first)
+        assert pool.owns("alice", second) and pool.owns("alice", third)
+        assert pool.owns("bob", bob)
+        assert len(pool) == 3
+    asyncio.run(run())
+
+
+def test_user_quota_full_of_sessions_in_use():
+    async def run():
+        pool = _pool()
+        sessions = [await pool.issue("alice") for _ in range(2)]
+        async with pool.session("alice", sessions[0]), pool.session("alice", sessions[1]):
+            with pytest.raises(SessionLimitReached):
+                await pool.issue("alice")
+            # Other users are not affected
+            await pool.issue("bob")
+        await pool.issue("alice")
+    asyncio.run(run())
+
+
+def test_pool_never_goes_over_max_sessions():
+    async def run():
+        pool = _pool(max_sessions=2)
+        alice, bob = await pool.issue("alice"), await pool.issue("bob")
+        async with pool.session("alice", alice), pool.session("bob", bob):
+            with pytest.raises(SessionLimitReached):
+                await pool.issue("carol")
+            assert len(pool) == 2
+        # Idle sessions are evicted least recently used first (bob's turn ended first)
+        await pool.issue("carol")
+        assert pool.owns("alice", alice) and not pool.owns("bob", bob)
+        assert len(pool) == 2
+    asyncio.run(run())
+
+
+def test_anonymous_callers_share_one_quota():
+    async def run():
+        pool = _pool(max_sessions=10)
+        alice = await pool.issue("alice")
+        for _ in range(20):
+            await pool.issue(ANONYMOUS_USER)
+        assert len(pool) == 4
+        assert pool.owns("alice", alice)
+    asyncio.run(run())
@@ -0,0 +1,110 @@
+import threading
+import pytest
+from app.store import (AccountStore, InMemoryAccountStore, SQLiteAccountStore, build_store, demo_accounts,
+                       synthetic_accounts)
+
+ARIF = "1234567890123456"
+BUDI = "3201123456789001"
+
+
+@pytest.fixture(params=["memory", "sqlite-memory", "sqlite-file"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemoryAccountStore()
+    elif request.param == "sqlite-memory":
+        store = SQLiteAccountStore(":memory:", pool_size=4)
+    else:
+        store = SQLiteAccountStore(str(tmp_path / "accounts.db"), pool_size=4)
+    store.add_accounts(demo_accounts())
+    store.add_accounts(synthetic_accounts(50))
+    return store
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        AccountStore()
+
+
+def test_get(store):
+    assert len(store) == 52
+    account = store.get(ARIF)
+    assert account["nama"] == "Arif Athaya" and account["saldo"] == 2000000 and account["nik"] == ARIF
+    assert store.get("0000000000000000") is None
+
+
+def test_get_returns_a_copy(store):
+    store.get(ARIF)["saldo"] = 0
+    assert store.get(ARIF)["saldo"] == 2000000
+
+
+def test_find_by_email_ignores_case(store):
+    assert store.find_by_email("BUDI@Test.com")["nik"] == BUDI
+    assert store.find_by_email("nobody@test.com") is None
+
+
+@pytest.mark.parametrize("phone", ["089988776655", "+6289988776655", "6289988776655", "0899-8877-6655"])
+def test_find_by_phone_accepts_any_form(store, phone):
+    assert store.find_by_phone(phone)["nik"] == BUDI
+
+
+def test_find_by_name_normalizes_and_limits(store):
+    assert [a["nik"] for a in store.find_by_name("  arif   ATHAYA ")] == [ARIF]
+    store.add_accounts({**account, "nik": f"88{i:014d}", "email": f"kembar{i}@test.com", "phone": f"0817{i:08d}"}
+                       for i, account in enumerate([store.get(ARIF)] * 3))
+    assert len(store.find_by_name("Arif Athaya")) == 4
+    assert len(store.find_by_name("Arif Athaya", limit=2)) == 2
+
+
+def test_withdraw(store):
+    assert store.withdraw(BUDI, 50000) == (True, 100000)
+    assert store.withdraw(BUDI, 100001) == (False, 100000)
+    assert store.withdraw(BUDI, 100000) == (True, 0)
+    assert store.withdraw("0000000000000000", 1) == (False, None)
+
+
+def test_concurrent_withdrawals_never_overdraw(store):
+    # 150000 covers exactly 15 withdrawals of 10000
+    results = []
+    def worker():
+        for _ in range(5):
+            results.append(store.withdraw(BUDI, 10000)[0])
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 15
+    assert store.get(BUDI)["saldo"] == 0
+
+
+def test_add_accounts_replace(store):
+    store.withdraw(BUDI, 50000)
+    store.add_accounts(demo_accounts(), replace=False)
+    assert store.get(BUDI)["saldo"] == 100000
+    store.add_accounts([{**store.get(BUDI), "saldo": 1, "email": "budi.baru@test.com"}])
+    assert store.get(BUDI)["saldo"] == 1
+    assert store.find_by_email("budi.baru@test.com")["nik"] == BUDI
+    assert len(store) == 52
+
+
+def test_get_many(store):
+    accounts = store.get_many([ARIF, "0000000000000000"])
+    assert list(accounts) == [ARIF]
+    assert "nik" not in accounts[ARIF]
+
+
+def test_build_store_keeps_existing_balances(monkeypatch, tmp_path):
+    monkeypatch.setenv("ACCOUNT_DB_PATH", str(tmp_path / "accounts.db"))
+    build_store("sqlite").withdraw(ARIF, 500000)
+    assert build_store("sqlite").get(ARIF)["saldo"] == 1500000
+    with pytest.raises(ValueError):
+        build_store("redis")
+
+
+def test_failed_insert_leaves_the_store_usable(tmp_path):
+    store = SQLiteAccountStore(str(tmp_path / "accounts.db"), pool_size=1)
+    store.add_accounts(demo_accounts())
+    with pytest.raises(Exception):
+        store.add_accounts([{**store.get(BUDI), "nik": "5555555555555555", "saldo": -1}])
+    assert store.get("5555555555555555") is None
+    assert store.withdraw(BUDI, 50000) == (True, 100000)
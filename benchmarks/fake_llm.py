@@ -0,0 +1,109 @@
+"""
+Deterministic stand-in for the Gemini model, used by the agent benchmark.
+
+`FakeLlm` is an ADK `BaseLlm`, so it plugs into `DomiAgent(model=FakeLlm())`
+and exercises the real Runner, tools, session and history code. Replies are a
+pure function of the prompt (no randomness), and the model's latency is
+simulated with a fixed time-to-first-token plus a per-token delay.
+"""
+import asyncio
+import re
+from typing import AsyncGenerator, Dict, List, Optional
+from google.adk.models import BaseLlm, LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+_TAG = re.compile(r'\[REDACTED_[A-Z_]+\]')
+
+# Intent keyword -> (tool name, {argument: tag label})
+_TOOLS = [
+    (re.compile(r'password|kata sandi', re.IGNORECASE),
+     "ganti_password", {"nik_tag": "NIK", "email_tag": "EMAIL", "birthdate_tag": "BIRTHDATE"}),
+    (re.compile(r'kartu', re.IGNORECASE),
+     "request_kartu_fisik", {"nama_tag": "PERSON", "alamat_tag": "ADDRESS", "phone_tag": "PHONE"}),
+    (re.compile(r'tarik|withdraw|transfer', re.IGNORECASE),
+     "withdraw_ke_bank", {"nik_tag": "NIK", "bank_num_tag": "BANK_NUM", "nama_pemilik_tag": "PERSON"}),
+]
+
+
+class FakeLlm(BaseLlm):
+    """
+    Rule-based fake of the Domi model.
+
+    - A user message with an intent keyword and all the tags the matching tool
+      needs produces a function call with those tags as arguments.
+    - A function response produces a short confirmation built from the result.
+    - Anything else produces a fixed help text asking for the required data.
+    """
+    model: str = "fake-domi"
+    first_token_ms: float = 300.0
+    token_ms: float = 15.0
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"fake-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+
+        last = llm_request.contents[-1] if llm_request.contents else None
+        call = self._function_call(last)
+        if call is not None:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+            return
+
+        words = self._reply(last).split(" ")
+        if stream:
+            text = ""
+            for i, word in enumerate(words):
+                chunk = word if i == 0 else " " + word
+                text += chunk
+                await asyncio.sleep(self.token_ms / 1000)
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part.from_text(text=chunk)]),
+                    partial=True
+                )
+        else:
+            text = " ".join(words)
+            await asyncio.sleep(self.token_ms * len(words) / 1000)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part.from_text(text=text)]),
+            turn_complete=True
+        )
+
+    @staticmethod
+    def _text(content: Optional[types.Content]) -> str:
+        if content is None:
+            return ""
+        return " ".join(part.text for part in content.parts or [] if part.text)
+
+    def _function_call(self, last: Optional[types.Content]) -> Optional[types.FunctionCall]:
+        """Returns the tool call for the user's message, or None if the model should answer in text."""
+        text = self._text(last)
+        if last is None or last.role != "user" or not text:
+            return None
+        tags: Dict[str, str] = {}
+        for tag in _TAG.findall(text):
+            tags.setdefault(tag[len("[REDACTED_"):-1], tag)
+        for pattern, name, params in _TOOLS:
+            if pattern.search(text) and all(label in tags for label in params.values()):
+                return types.FunctionCall(name=name, args={arg: tags[label] for arg, label in params.items()})
+        return None
+
+    def _reply(self, last: Optional[types.Content]) -> str:
+        """Builds the text reply (tool confirmation, summary or help text)."""
+        for part in (last.parts or []) if last else []:
+            if part.function_response:
+                result = part.function_response.response or {}
+                return f"Hasil {part.function_response.name}: {result.get('result', result)}"
+
+        text = self._text(last)
+        if text.startswith("Ringkas percakapan"):
+            return "- Pengguna menghubungi customer service Domi."
+        return (
+            "Untuk memproses permintaan, mohon kirimkan data lengkap dengan format: "
+            "NIK, email, tanggal lahir (DD-MM-YYYY), nama sesuai rekening, alamat lengkap, "
+            "nomor HP dan nomor rekening tujuan."
+        )
@@ -0,0 +1,361 @@
+"""
+End-to-end load and latency benchmark.
+
+Replays the PII corpus against one of two targets at one or more concurrency levels:
+
+  guardrail  HTTP load against a running Guardrail Service (`/clean`).
+             Stage breakdown and memory come from the service's `/metrics`.
+  agent      The full agent -> guardrail -> LLM path, run in-process with
+             `DomiAgent(model=FakeLlm())`. Needs a running Guardrail Service;
+             the LLM is the deterministic fake from `fake_llm.py`.
+             Replies masked by the regex fallback instead of the guardrail
+             ('degraded') count as errors and make the run exit non-zero.
+
+Results are written as JSON so two runs (e.g. two commits) can be compared.
+
+Usage:
+    python benchmarks/run_benchmark.py guardrail --url http://localhost:8000 --concurrency 1,8,32
+    python benchmarks/run_benchmark.py agent --guardrail-url http://localhost:8000/clean --concurrency 1,8
+    python benchmarks/run_benchmark.py compare baseline.json current.json --max-regression 0.10
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(BASE_DIR, "corpus.jsonl")
+
+_SAMPLE = re.compile(r'^(?P<name>[a-z_]+)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+
+
+def load_corpus(path: str) -> List[str]:
+    """Reads the 'text' field of every line in a JSONL corpus file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """Latency distribution in milliseconds."""
+    return {
+        "mean": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+        "p50": round(percentile(latencies_ms, 50), 2),
+        "p95": round(percentile(latencies_ms, 95), 2),
+        "p99": round(percentile(latencies_ms, 99), 2),
+        "max": round(max(latencies_ms), 2) if latencies_ms else 0.0
+    }
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Parses Prometheus text exposition into {'name{labels}': value}."""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            key = match.group("name") + ("{%s}" % match.group("labels") if match.group("labels") else "")
+            samples[key] = float(match.group("value"))
+    return samples
+
+
+def git_commit() -> str:
+    """Current commit of the repository, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_load(texts: List[str], concurrency: int, total: int, send) -> Dict:
+    """
+    Sends `total` requests with `concurrency` workers, cycling through the corpus.
+
+    Args:
+        send: Coroutine function `send(index, text) -> dict` returning per-request
+            stage timings in milliseconds. Exceptions count as errors.
+
+    Returns:
+        dict: Latencies (ms), per-request stage timings and error count.
+    """
+    counter = iter(range(total))
+    latencies, stages, errors = [], [], []
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                stage_ms = await send(i, texts[i % len(texts)])
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            stages.append(stage_ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    stage_names = sorted({name for stage_ms in stages for name in stage_ms})
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {
+            name: summarize([stage_ms[name] for stage_ms in stages if name in stage_ms])
+            for name in stage_names
+        }
+    }
+
+
+# --- GUARDRAIL TARGET ---
+async def bench_guardrail(args, texts: List[str]) -> List[Dict]:
+    base_url = args.url.rstrip("/")
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    levels = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+
+        async def send(i: int, text: str) -> Dict[str, float]:
+            if args.unique:
+                # Defeats the result cache so every request pays for detection
+                text = f"{text} (ref {args.run_id}-{i})"
+            response = await client.post("/clean", json={"text": text})
+            response.raise_for_status()
+            return {"server": response.json()["performance"]["latency_ms"]}
+
+        for _ in range(args.warmup):
+            await send(-1, texts[0])
+
+        for concurrency in args.concurrency:
+            before = parse_metrics((await client.get("/metrics")).text)
+            level = await run_load(texts, concurrency, args.requests, send)
+            after = parse_metrics((await client.get("/metrics")).text)
+
+            # Mean time per stage call over this level, from histogram sum/count deltas
+            for stage in ("regex", "ner", "masking"):
+                key = 'guardrail_stage_latency_seconds_%s{stage="' + stage + '"}'
+                count = after.get(key % "count", 0) - before.get(key % "count", 0)
+                total = after.get(key % "sum", 0) - before.get(key % "sum", 0)
+                level["stages_ms"][f"{stage}_mean"] = round(total / count * 1000, 2) if count else 0.0
+            level["memory_mb"] = {
+                "service_rss": round(after.get("process_resident_memory_bytes", 0) / 1024 / 1024, 1),
+                "cache": round(after.get("guardrail_cache_bytes", 0) / 1024 / 1024, 1)
+            }
+            levels.append(level)
+            print_level(level)
+    return levels
+
+
+# --- AGENT TARGET ---
+async def bench_agent(args, texts: List[str]) -> List[Dict]:
+    os.environ["GUARDRAIL_SERVICE_URL"] = args.guardrail_url
+    sys.path.insert(0, os.path.join(BASE_DIR, "..", "agent_service"))
+    sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+    sys.path.insert(0, BASE_DIR)
+    from app.core_agent import DomiAgent
+    from app.metrics import render
+    from fake_llm import FakeLlm
+
+    agent = DomiAgent(model=FakeLlm(first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms))
+    await agent.guardrail.start()
+
+    # Time spent in the guardrail call, per asyncio task
+    clean = agent.guardrail.clean
+    guardrail_ms = {}
+
+    async def timed_clean(text: str, **kwargs) -> dict:
+        start = time.perf_counter()
+        try:
+            return await clean(text, **kwargs)
+        finally:
+            guardrail_ms[id(asyncio.current_task())] = (time.perf_counter() - start) * 1000
+
+    agent.guardrail.clean = timed_clean
+    # Server-issued session id per simulated user
+    session_ids = {}
+    # Replies masked by the regex fallback instead of the guardrail, per level
+    degraded = []
+
+    async def send(i: int, text: str) -> Dict[str, float]:
+        # Each simulated user keeps a conversation of `turns_per_session` messages
+        user_id = f"{args.run_id}-{i // args.turns_per_session}"
+        if user_id not in session_ids:
+            session_ids[user_id] = await agent.sessions.issue(user_id)
+        start = time.perf_counter()
+        first_token, done = None, None
+        async for event in agent.chat_stream(text, user_id=user_id, session_id=session_ids[user_id], streaming=True,
+                                             response_mode=args.response_mode):
+            if event["event"] == "token" and first_token is None:
+                first_token = (time.perf_counter() - start) * 1000
+            if event["event"] == "done":
+                done = event["data"]
+        total = (time.perf_counter() - start) * 1000
+        # Checked after the stream is exhausted, so the chat generator closes in this task
+        if done["reply"].startswith("Error ADK"):
+            raise RuntimeError(done["reply"])
+        if done["debug_info"].get("degraded"):
+            # The guardrail path was not measured; must not count as a successful request
+            degraded.append(i)
+            raise RuntimeError("Degraded reply: guardrail call failed, regex fallback was used")
+        guard = guardrail_ms.pop(id(asyncio.current_task()), 0.0)
+        return {"guardrail": guard, "llm_and_tools": total - guard, "first_token": first_token or total}
+
+    try:
+        for _ in range(args.warmup):
+            await send(-args.turns_per_session, texts[0])
+
+        levels = []
+        for concurrency in args.concurrency:
+            degraded.clear()
+            level = await run_load(texts, concurrency, args.requests, send)
+            level["degraded"] = len(degraded)
+            level["memory_mb"] = {
+                # ru_maxrss is in kilobytes on Linux
+                "process_peak_rss": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "history": round(parse_metrics(render().decode()).get("agent_history_total_bytes", 0) / 1024 / 1024, 2),
+                "sessions": len(agent.sessions)
+            }
+            levels.append(level)
+            print_level(level)
+        return levels
+    finally:
+        await agent.guardrail.close()
+
+
+# --- REPORTING ---
+def print_level(level: Dict):
+    latency = level["latency_ms"]
+    print(f"📊 c={level['concurrency']:<3} {level['throughput_rps']:>8.2f} req/s  "
+          f"p50 {latency['p50']:>8.1f} ms  p95 {latency['p95']:>8.1f} ms  p99 {latency['p99']:>8.1f} ms  "
+          f"errors {level['errors']}" + (f" (degraded {level['degraded']})" if level.get("degraded") else ""))
+    for name, stats in level["stages_ms"].items():
+        if isinstance(stats, dict):
+            print(f"     {name:<14} p50 {stats['p50']:>8.1f} ms  p95 {stats['p95']:>8.1f} ms")
+        else:
+            print(f"     {name:<14} {stats:>8.2f} ms")
+    for name, value in level.get("memory_mb", {}).items():
+        print(f"     💾 {name}: {value}")
+
+
+def compare(args):
+    """Compares two result files level by level; exits non-zero on regression."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    print(f"🔍 {baseline['target']} {baseline['commit']} -> {current['commit']}")
+    base_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = 0
+    for level in current["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        rows = [
+            ("throughput_rps", base["throughput_rps"], level["throughput_rps"], False),
+            ("p50_ms", base["latency_ms"]["p50"], level["latency_ms"]["p50"], True),
+            ("p95_ms", base["latency_ms"]["p95"], level["latency_ms"]["p95"], True),
+            ("p99_ms", base["latency_ms"]["p99"], level["latency_ms"]["p99"], True),
+        ]
+        for name, old, new, lower_is_better in rows:
+            change = (new - old) / old if old else 0.0
+            worse = change > args.max_regression if lower_is_better else -change > args.max_regression
+            regressions += worse
+            print(f"{'❌' if worse else '✅'} c={level['concurrency']:<3} {name:<15} {old:>10.2f} -> {new:>10.2f} ({change:+.1%})")
+
+    if regressions:
+        print(f"❌ {regressions} metric(s) regressed by more than {args.max_regression:.0%}.")
+        sys.exit(1)
+    print("✅ No regressions.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="target", required=True)
+
+    def concurrency_list(value: str) -> List[int]:
+        return [int(v) for v in value.split(",")]
+
+    for name in ("guardrail", "agent"):
+        p = sub.add_parser(name)
+        p.add_argument("--corpus", default=CORPUS)
+        p.add_argument("--concurrency", type=concurrency_list, default=[1, 8],
+                       help="Comma-separated concurrency levels, e.g. 1,8,32")
+        p.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+        p.add_argument("--warmup", type=int, default=5, help="Untimed requests sent before the first level")
+        p.add_argument("--timeout", type=float, default=30.0)
+        p.add_argument("--output", help="Write results as JSON to this file")
+
+    sub.choices["guardrail"].add_argument("--url", default="http://localhost:8000")
+    sub.choices["guardrail"].add_argument("--unique", action="store_true",
+                                          help="Make every text unique so the result cache never hits")
+    agent_parser = sub.choices["agent"]
+    agent_parser.add_argument("--guardrail-url", default=os.getenv("GUARDRAIL_SERVICE_URL", "http://localhost:8000/clean"))
+    agent_parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    agent_parser.add_argument("--llm-token-ms", type=float, default=15.0)
+    agent_parser.add_argument("--turns-per-session", type=int, default=3)
+    agent_parser.add_argument("--response-mode", choices=("full", "lean"), default="full",
+                              help="lean: vault stays in the guardrail and tools resolve it by reference")
+
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--max-regression", type=float, default=0.10,
+                                help="Allowed relative slowdown before failing (0.10 = 10%%)")
+
+    args = parser.parse_args()
+    if args.target == "compare":
+        compare(args)
+        return
+
+    args.run_id = uuid.uuid4().hex[:8]
+    texts = load_corpus(args.corpus)
+    bench = bench_guardrail if args.target == "guardrail" else bench_agent
+    print(f"🚀 Benchmarking {args.target}: {len(texts)} corpus texts, {args.requests} requests per level")
+    levels = asyncio.run(bench(args, texts))
+
+    results = {
+        "target": args.target,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("target", "output", "run_id")
+        },
+        "levels": levels
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    degraded = sum(level.get("degraded", 0) for level in levels)
+    if degraded:
+        print(f"❌ {degraded} replies were degraded (guardrail fallback); latencies do not reflect the guardrail path.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
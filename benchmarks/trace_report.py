@@ -0,0 +1,95 @@
+"""
+Latency breakdown from exported trace spans.
+
+Reads the JSONL span files written by both services (TRACE_EXPORT_PATH),
+joins them by trace id, and reports per span name how often it occurs and
+how long it takes, plus the share of each root span (e.g. 'agent.chat') spent
+in its direct children. Use it to attribute a latency regression to a stage.
+
+Usage:
+    python benchmarks/trace_report.py traces-agent-service.jsonl traces-guardrail-service.jsonl
+    python benchmarks/trace_report.py traces-*.jsonl --root agent.chat --json report.json
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+from run_benchmark import summarize
+
+
+def load_spans(paths: List[str]) -> List[dict]:
+    """Reads every span record from the given JSONL files."""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def by_name(spans: List[dict]) -> Dict[str, dict]:
+    """Count, error count and duration distribution (ms) per span name."""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    for span in spans:
+        durations[span["name"]].append(span["durationMs"])
+        errors[span["name"]] += span["status"] == "error"
+    return {
+        name: {"count": len(values), "errors": errors[name], "ms": summarize(values)}
+        for name, values in sorted(durations.items())
+    }
+
+
+def root_breakdown(spans: List[dict], root_name: str) -> Dict[str, float]:
+    """
+    Mean share of a root span's duration spent in each of its direct children.
+
+    Children of the same name are summed per trace (e.g. all ADK events of a turn).
+    """
+    children = defaultdict(list)
+    for span in spans:
+        children[span["parentSpanId"]].append(span)
+
+    shares = defaultdict(list)
+    for root in (span for span in spans if span["name"] == root_name):
+        if root["durationMs"] <= 0:
+            continue
+        totals = defaultdict(float)
+        for child in children[root["spanId"]]:
+            totals[child["name"]] += child["durationMs"]
+        for name, total in totals.items():
+            shares[name].append(total / root["durationMs"])
+    return {name: round(sum(values) / len(values), 3) for name, values in sorted(shares.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="Span JSONL files (one per service).")
+    parser.add_argument("--root", default="agent.chat", help="Root span name for the share breakdown.")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    spans = load_spans(args.files)
+    report = {
+        "spans": len(spans),
+        "traces": len({span["traceId"] for span in spans}),
+        "by_name": by_name(spans),
+        "root": args.root,
+        "root_breakdown": root_breakdown(spans, args.root),
+    }
+
+    print(f"{report['spans']} spans in {report['traces']} traces")
+    for name, stats in report["by_name"].items():
+        ms = stats["ms"]
+        print(f"  {name:<28} n={stats['count']:<6} err={stats['errors']:<4} "
+              f"p50={ms['p50']:>9.2f}ms  p95={ms['p95']:>9.2f}ms  max={ms['max']:>9.2f}ms")
+    print(f"Share of '{args.root}' spent in direct children:")
+    for name, share in report["root_breakdown"].items():
+        print(f"  {name:<28} {share:>6.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from .metrics import ADMISSION_INFLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED, QUEUE_WAIT
+
+# Header carrying the caller's remaining time budget, in milliseconds
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# Absolute deadline (time.monotonic()) of the request being served by the current thread
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full; the request is rejected without waiting."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before its work could run."""
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until `deadline` (None means no deadline)."""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class AdmissionController:
+    """
+    Bounded admission in front of the sanitization pipeline.
+
+    At most `max_concurrent` requests run detection at once and at most
+    `max_queue` more wait for a slot. Anything beyond that is rejected
+    immediately (429) instead of piling up behind the model, and a waiting
+    request whose deadline passes is dropped (503) instead of being computed
+    for a caller that has already given up. Time spent waiting for a slot is
+    recorded separately from compute time.
+    """
+    def __init__(self, max_concurrent: int = None, max_queue: int = None, default_timeout_ms: float = None):
+        """
+        Args:
+            max_concurrent (int): Requests allowed to run the pipeline at once.
+            max_queue (int): Requests allowed to wait for a slot.
+            default_timeout_ms (float): Deadline for requests that do not send `DEADLINE_HEADER`.
+        """
+        self.max_concurrent = max_concurrent or int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+        self.default_timeout_ms = default_timeout_ms or float(os.getenv("ADMISSION_DEFAULT_TIMEOUT_MS", "10000"))
+
+        self._slots = threading.Semaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._queued = 0
+        ADMISSION_INFLIGHT.set_function(lambda: self._inflight)
+        ADMISSION_QUEUED.set_function(lambda: self._queued)
+
+    @property
+    def capacity(self) -> int:
+        """Requests that can be inside the controller at once (running + waiting)."""
+        return self.max_concurrent + self.max_queue
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def full(self) -> bool:
+        """True if a new request would be rejected right now."""
+        return self._inflight + self._queued >= self.capacity
+
+    def deadline_from_header(self, value: Optional[str]) -> float:
+        """
+        Converts a relative timeout header into an absolute monotonic deadline.
+
+        Missing or malformed values fall back to `default_timeout_ms`.
+        """
+        try:
+            timeout_ms = float(value) if value is not None else self.default_timeout_ms
+        except ValueError:
+            timeout_ms = self.default_timeout_ms
+        return time.monotonic() + max(timeout_ms, 0) / 1000
+
+    def admit(self, deadline: float, endpoint: str) -> "Admission":
+        """Returns a context manager that holds a pipeline slot for the request."""
+        return Admission(self, deadline, endpoint)
+
+    def _enter(self, deadline: float, endpoint: str):
+        with self._lock:
+            if self._inflight + self._queued >= self.capacity:
+                ADMISSION_REJECTED.labels(endpoint=endpoint, reason="queue_full").inc()
+                raise Overloaded(f"Admission queue is full ({self.capacity} requests)")
+            self._queued += 1
+
+        start = time.perf_counter()
+        try:
+            timeout = remaining(deadline)
+            acquired = timeout > 0 and self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self._queued -= 1
+        wait_seconds = time.perf_counter() - start
+        QUEUE_WAIT.labels(endpoint=endpoint).observe(wait_seconds)
+
+        if not acquired:
+            ADMISSION_REJECTED.labels(endpoint=endpoint, reason="deadline").inc()
+            raise DeadlineExceeded("Deadline passed while waiting for admission")
+        with self._lock:
+            self._inflight += 1
+        return wait_seconds
+
+    def _exit(self):
+        with self._lock:
+            self._inflight -= 1
+        self._slots.release()
+
+
+class Admission:
+    """Holds one admission slot and publishes the request deadline to the worker thread."""
+    def __init__(self, controller: AdmissionController, deadline: float, endpoint: str):
+        self.controller = controller
+        self.deadline = deadline
+        self.endpoint = endpoint
+        self.wait_seconds = 0.0
+        self._token = None
+
+    def __enter__(self):
+        self.wait_seconds = self.controller._enter(self.deadline, self.endpoint)
+        self._token = current_deadline.set(self.deadline)
+        return self
+
+    def __exit__(self, *exc):
+        current_deadline.reset(self._token)
+        self.controller._exit()
+        return False
@@ -0,0 +1,165 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import List
+from .admission import DeadlineExceeded, current_deadline, remaining
+from .metrics import NER_BATCH_SIZE, NER_EXPIRED, NER_QUEUE_WAIT
+
+
+class NERBatcher:
+    """
+    Dynamic micro-batching scheduler in front of the NER model.
+
+    Concurrent requests submit texts to a shared queue. A background thread
+    collects everything that arrives within a short window (or until the
+    batch is full), groups the texts into length buckets to minimise padding,
+    and runs each bucket as one forward pass. Every caller receives only its
+    own entity list. With `concurrency` > 1, several scheduling threads keep
+    that many batches in flight (one per inference worker).
+
+    Texts carry the deadline of the request that submitted them; texts whose
+    deadline has passed by the time they are scheduled are dropped instead of
+    being sent to the model.
+    """
+    def __init__(self, engine, max_batch_size: int = None, window_ms: float = None, bucket_chars: int = None,
+                 concurrency: int = None):
+        """
+        Args:
+            engine: Object exposing `predict_batch(texts)` (`NEREngine` or `NERWorkerPool`).
+            max_batch_size (int): Maximum texts per scheduling round.
+            window_ms (float): How long to wait for more requests after the first one arrives.
+            bucket_chars (int): Width of a length bucket, in characters.
+            concurrency (int): Number of scheduling threads, i.e. batches in flight at once.
+        """
+        self.engine = engine
+        self.max_batch_size = max_batch_size or int(os.getenv("NER_BATCH_MAX_SIZE", "16"))
+        self.window_ms = window_ms if window_ms is not None else float(os.getenv("NER_BATCH_WINDOW_MS", "5"))
+        self.bucket_chars = bucket_chars or int(os.getenv("NER_BATCH_BUCKET_CHARS", "128"))
+        self.concurrency = concurrency or 1
+
+        self._queue = queue.Queue()
+        self._threads = []
+        self._running = False
+
+    def queue_depth(self) -> int:
+        """Number of texts waiting to be scheduled."""
+        return self._queue.qsize()
+
+    def start(self):
+        """Starts the background scheduling threads (idempotent)."""
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f"ner-batcher-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops the scheduling threads after their current round completes."""
+        if not self._running:
+            return
+        self._running = False
+        # One stop marker per thread
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, text: str) -> list:
+        """
+        Queues one text for inference and blocks until its entities are ready.
+
+        Falls back to a direct model call when the scheduler is not running.
+        """
+        return self.submit_many([text])[0]
+
+    def submit_many(self, texts: List[str]) -> List[list]:
+        """
+        Queues several texts and blocks until all of their entities are ready.
+
+        The deadline of the current request (see `admission.current_deadline`)
+        travels with the texts and bounds the wait.
+
+        Returns:
+            List[list]: One entity list per input text, in input order.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes before the results are ready.
+        """
+        if not texts:
+            return []
+        if not self._running:
+            return self.engine.predict_batch(texts)
+
+        deadline = current_deadline.get()
+        enqueued_at = time.monotonic()
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future, deadline, enqueued_at))
+            futures.append(future)
+        try:
+            return [future.result(timeout=remaining(deadline)) for future in futures]
+        except FutureTimeout:
+            raise DeadlineExceeded("Deadline passed while waiting for NER results") from None
+
+    def _collect(self):
+        """Blocks for the first item, then gathers more until the window closes or the batch is full."""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.window_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the stop marker so the loop exits after this round
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Main scheduling loop."""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # Drop texts whose caller has already given up, then group the rest
+            # by length so each forward pass pads to a similar length
+            buckets = {}
+            now = time.monotonic()
+            for text, future, deadline, enqueued_at in batch:
+                if deadline is not None and deadline <= now:
+                    NER_EXPIRED.inc()
+                    future.set_exception(DeadlineExceeded("Deadline passed while queued for NER"))
+                    continue
+                NER_QUEUE_WAIT.observe(now - enqueued_at)
+                buckets.setdefault(len(text) // self.bucket_chars, []).append((text, future))
+
+            for bucket in buckets.values():
+                NER_BATCH_SIZE.observe(len(bucket))
+                try:
+                    results = self.engine.predict_batch([text for text, _ in bucket])
+                    for (_, future), entities in zip(bucket, results):
+                        future.set_result(entities)
+                except Exception as e:
+                    for _, future in bucket:
+                        future.set_exception(e)
+
+            if not self._running and self._queue.empty():
+                break
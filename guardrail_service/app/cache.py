@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from .regex_engine import Span
+from .metrics import CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_REQUESTS
+
+# Rough per-object sizes used for the memory cap (CPython, 64-bit)
+_ENTRY_OVERHEAD_BYTES = 200
+_SPAN_BYTES = 120
+
+
+class ResultCache:
+    """
+    Bounded in-process cache of detection results, keyed by content hash.
+
+    Keys are SHA-256 digests of the detection version and the input text, and
+    values are the resolved spans (offsets + labels only). Neither the raw text
+    nor the PII values are stored, so the cache never holds plaintext PII.
+    Entries expire after a TTL and are evicted least-recently-used when the
+    entry count or the estimated memory cap is exceeded. The whole cache is
+    dropped when the model or pattern version changes.
+    """
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, max_mb: float = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("CACHE_TTL_SECONDS", "600"))
+        max_mb = max_mb if max_mb is not None else float(os.getenv("CACHE_MAX_MB", "64"))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self.version = None
+        self._entries: "OrderedDict[str, Tuple[float, int, Tuple[Span, ...]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        CACHE_ENTRIES.set_function(lambda: len(self._entries))
+        CACHE_BYTES.set_function(lambda: self._bytes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def ensure_version(self, version: str):
+        """Clears the cache if the detection version (model/patterns) has changed."""
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    CACHE_EVICTIONS.labels(reason="version").inc(len(self._entries))
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.version}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[List[Span]]:
+        """Returns the cached spans for `text`, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = self._key(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._remove(key, "ttl")
+                entry = None
+            if entry is None:
+                CACHE_REQUESTS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(result="hit").inc()
+        return list(entry[2])
+
+    def put(self, text: str, spans: List[Span], version: Optional[str] = None):
+        """
+        Stores the resolved spans for `text`.
+
+        Args:
+            version (str): Detection version the spans were computed with; they are
+                dropped if the cache has moved on to another version meanwhile.
+        """
+        if not self.enabled or (version is not None and version != self.version):
+            return
+        key = self._key(text)
+        size = _ENTRY_OVERHEAD_BYTES + _SPAN_BYTES * len(spans)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, tuple(spans))
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest, "lru" if len(self._entries) > self.max_entries else "memory")
+
+    def _remove(self, key: str, reason: Optional[str]):
+        """Drops one entry (caller holds the lock)."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        if reason:
+            CACHE_EVICTIONS.labels(reason=reason).inc()
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
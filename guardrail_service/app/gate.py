@@ -0,0 +1,190 @@
+import os
+import re
+from typing import List, Tuple
+from .metrics import NER_GATE_SENTENCES, NER_GATE_TEXTS
+
+# Gate modes:
+#   off        - always run the model on the whole text
+#   safe       - skips sentences without any cheap sign of a name or address, including lowercase names
+#   aggressive - only sentences with strong (capitalization, keyword) name/address evidence reach the model
+GATE_MODES = ("off", "safe", "aggressive")
+
+# Abbreviations whose trailing dot does not end a sentence (common in Indonesian addresses and titles)
+_ABBREVIATIONS = {"jl", "jln", "gg", "no", "kel", "kec", "kab", "rt", "rw", "bpk", "pak", "ibu", "sdr", "sdri", "dr", "ir", "h", "hj", "pt", "cv", "a.n", "an", "blk"}
+
+# Sentence boundary: terminal punctuation followed by whitespace, or line breaks
+_BOUNDARY = re.compile(r'[.!?]+\s+|\n+')
+_LAST_WORD = re.compile(r'([\w.]+)[.!?]*$')
+
+_TAG = re.compile(r'\[REDACTED_[A-Z_]+\]')
+_ADDRESS_KEYWORDS = re.compile(
+    r'\b(jl|jln|jalan|gg|gang|rt|rw|kel|kelurahan|kec|kecamatan|kab|kabupaten|kota|perumahan|perum|komplek|blok|desa|dusun)\b\.?',
+    re.IGNORECASE
+)
+_CAPITALIZED = re.compile(r'\b[A-Z][a-z]+')
+
+# Lowercase cues that often precede a name or address typed without capitals
+_STRICT_CUES = re.compile(r'\b(nama|a\.n|atas nama|alamat)\b', re.IGNORECASE)
+
+# Capitalized words that commonly open a sentence without being a name
+_COMMON_OPENERS = {
+    "halo", "hai", "hi", "selamat", "pagi", "siang", "sore", "malam", "terima", "terimakasih", "makasih",
+    "saya", "aku", "kami", "tolong", "mohon", "bagaimana", "gimana", "cara", "kenapa", "mengapa", "apa",
+    "apakah", "kapan", "berapa", "bisa", "bisakah", "mau", "ingin", "ok", "oke", "ya", "tidak", "min",
+    "kak", "baik", "sudah", "belum", "tarik", "kirim", "transfer", "reset", "ganti", "lupa", "cek",
+}
+
+# Everyday words of customer-service chats. In safe mode a word outside this list
+# may be a name typed in lowercase; the list only has to cover frequent words.
+_COMMON_WORDS = _COMMON_OPENERS | {
+    # Pronouns, particles, conjunctions and prepositions
+    "anda", "kamu", "kita", "dia", "mereka", "ini", "itu", "sini", "situ", "sana", "yang", "dan", "atau",
+    "tapi", "tetapi", "karena", "karna", "jadi", "kalau", "kalo", "jika", "agar", "supaya", "sama", "dengan",
+    "untuk", "buat", "dari", "ke", "di", "pada", "dalam", "luar", "oleh", "bagi", "tentang", "sampai",
+    "hingga", "sejak", "setelah", "sebelum", "sesudah", "lalu", "kemudian", "terus", "juga", "lagi", "masih",
+    "sedang", "akan", "telah", "pernah", "harus", "perlu", "boleh", "dapat", "nggak", "gak",
+    "ga", "enggak", "bukan", "jangan", "dong", "deh", "sih", "nih", "kok", "kan", "lah", "pun", "aja", "saja",
+    "hanya", "cuma", "udah", "sdh", "blm", "tdk", "yg", "dgn", "utk", "krn", "tp", "sy", "gmn",
+    "bgmn", "mana", "siapa", "dimana", "kemana", "padahal", "walaupun", "meskipun", "semua",
+    "setiap", "tiap", "beberapa", "banyak", "sedikit", "lebih", "kurang", "paling", "sangat", "sekali",
+    "segera", "cepat", "lama", "baru", "lain", "sendiri", "adalah", "ialah", "ada", "tanpa", "per",
+    "atas", "bawah", "kasih", "ulang", "banget", "silakan", "maaf",
+    # Verbs and adjectives of support requests
+    "bantu", "dibantu", "bantuan", "bantuannya", "tanya", "bertanya", "minta", "meminta", "request", "kirimkan",
+    "dikirim", "mengirim", "pindah", "dipindahkan", "pindahkan", "tutup", "menutup", "buka", "membuka", "masuk",
+    "keluar", "login", "logout", "daftar", "mendaftar", "verifikasi", "konfirmasi", "ubah", "mengubah", "diganti",
+    "hilang", "rusak", "gagal", "berhasil", "sukses", "selesai", "error", "terkunci", "terblokir", "blokir",
+    "diblokir", "terpotong", "potong", "dicek", "mengecek", "kembali", "dikembalikan", "kembalikan",
+    "bayar", "membayar", "pembayaran", "top", "up", "topup", "isi", "tinggal", "datang",
+    "menerima", "diterima", "proses", "diproses", "memproses", "tunggu", "menunggu", "pakai", "memakai",
+    "gunakan", "menggunakan", "tahu", "tau", "lihat", "melihat", "coba", "mencoba",
+    "harap", "salah", "benar", "betul", "valid", "aktif", "nonaktif", "mudah",
+    "susah", "sulit", "penting", "darurat", "urgent",
+    # Banking and account vocabulary
+    "akun", "aplikasi", "app", "password", "sandi", "kata", "pin", "otp", "kode", "saldo", "dana", "uang",
+    "rekening", "rek", "norek", "bank", "kartu", "debit", "kredit", "fisik", "virtual", "transaksi", "limit",
+    "harian", "biaya", "admin", "tarif", "ribu", "juta", "rupiah", "rp", "nominal", "jumlah", "sisa", "tagihan",
+    "withdraw", "penarikan", "setor", "setoran", "mutasi", "riwayat", "status", "data", "nik", "ktp",
+    "email", "surel", "hp", "telp", "telepon", "nomor", "no", "nomer", "tanggal", "tgl", "lahir", "alamat",
+    "nama", "lengkap", "sesuai", "milik", "pemilik", "penerima", "pengirim", "tujuan", "asal", "user",
+    "pengguna", "nasabah", "customer", "service", "cs", "layanan", "keluhan", "komplain", "masalah",
+    "korespondensi", "dokumen", "foto", "identitas", "keamanan", "akses", "fitur", "menu",
+    "notifikasi", "sms", "pesan", "chat", "wa", "whatsapp", "promo", "cashback", "poin", "voucher",
+    # Time and quantities
+    "hari", "minggu", "bulan", "tahun", "jam", "menit", "detik", "kemarin", "besok", "tadi", "sekarang",
+    "nanti", "waktu", "satu", "dua", "tiga", "empat", "lima", "pertama",
+    "terakhir", "sekolah", "anak", "keluarga", "orang", "rumah", "kantor",
+}
+
+# Words that often precede a name typed in lowercase ("pak budi", "transfer ke rudi", "saya dewi")
+_PERSON_CUES = {
+    "pak", "bapak", "bu", "ibu", "mas", "mbak", "mba", "kak", "bang", "sdr", "sdri", "saudara", "saudari",
+    "ke", "kepada", "untuk", "dari", "dengan", "oleh", "milik", "pemilik", "penerima", "saya", "aku",
+}
+
+_WORD = re.compile(r'[^\W\d_]+')
+_SUFFIXES = ("nya", "lah", "kah", "pun")
+
+
+def _is_common(word: str) -> bool:
+    """True if `word` (lowercased), optionally with a clitic suffix, is an everyday chat word."""
+    if len(word) < 2 or word in _COMMON_WORDS:
+        return True
+    return any(word.endswith(suffix) and word[:-len(suffix)] in _COMMON_WORDS for suffix in _SUFFIXES)
+
+
+class NERGate:
+    """
+    Cheap pre-classifier that decides, per sentence, whether the NER model needs to run.
+
+    Works on regex-masked text. In "aggressive" mode a sentence must show strong evidence
+    of a name or address: capitalized tokens, address keywords such as "Jl.", or name cues
+    like "atas nama". "safe" mode also accepts any capitalized word that is not an everyday
+    word, and the signs of a name typed in lowercase: two consecutive words outside the
+    everyday vocabulary ("rudi hartono"), or one right after a cue such as "pak" or "ke".
+    It still skips greetings, questions and requests made only of everyday words; a lone
+    lowercase name without any cue ("rudi sudah transfer") is missed in both modes.
+    Consecutive candidate sentences are merged so the model keeps their shared context.
+    """
+    def __init__(self, mode: str = None, min_chars: int = None):
+        """
+        Args:
+            mode (str): One of GATE_MODES (default from NER_GATE_MODE, 'safe').
+            min_chars (int): Minimum letters left after removing tags for a sentence to be considered.
+        """
+        self.mode = mode or os.getenv("NER_GATE_MODE", "safe")
+        if self.mode not in GATE_MODES:
+            raise ValueError(f"Unknown NER gate mode '{self.mode}', expected one of {GATE_MODES}")
+        self.min_chars = min_chars if min_chars is not None else int(os.getenv("NER_GATE_MIN_CHARS", "3"))
+
+    @staticmethod
+    def sentences(text: str) -> List[Tuple[int, int]]:
+        """Splits text into (start, end) sentence ranges that tile the whole text."""
+        ranges = []
+        start = 0
+        for match in _BOUNDARY.finditer(text):
+            # "Jl. Sudirman" or "a.n. Budi" does not end a sentence
+            last = _LAST_WORD.search(text, start, match.start() + 1)
+            if match.group().startswith(".") and last and last.group(1).lower().rstrip(".") in _ABBREVIATIONS:
+                continue
+            ranges.append((start, match.end()))
+            start = match.end()
+        if start < len(text):
+            ranges.append((start, len(text)))
+        return ranges
+
+    def is_candidate(self, sentence: str) -> bool:
+        """Decides whether a single (masked) sentence may contain a name or address."""
+        residual = _TAG.sub(" ", sentence)
+        if sum(ch.isalpha() for ch in residual) < self.min_chars:
+            return False
+        if _ADDRESS_KEYWORDS.search(residual) or _STRICT_CUES.search(residual):
+            return True
+        if self.mode == "safe" and self._has_name_signal(residual):
+            return True
+
+        words = _CAPITALIZED.findall(residual)
+        if not words:
+            return False
+        first = residual.lstrip(" \t\"'([").split(" ", 1)[0].strip(",.!?:;")
+        if words[0] == first and words[0].lower() in _COMMON_OPENERS:
+            words = words[1:]
+        # Require at least two capitalized words, or one that does not open the sentence
+        return len(words) >= 2 or (len(words) == 1 and words[0] != first)
+
+    @staticmethod
+    def _has_name_signal(residual: str) -> bool:
+        """Safe-mode evidence: a capitalized uncommon word, or the shape of a lowercase name."""
+        words = _WORD.findall(residual)
+        previous_unknown, previous = False, ""
+        for word in words:
+            lower = word.lower()
+            unknown = not _is_common(lower)
+            if unknown and (word[0].isupper() or previous_unknown or previous in _PERSON_CUES):
+                return True
+            previous_unknown, previous = unknown, lower
+        return False
+
+    def select(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Returns the ranges of `text` the model should see.
+
+        Returns:
+            List[Tuple[int, int]]: Merged candidate ranges; empty if the model can be skipped.
+        """
+        if self.mode == "off":
+            return [(0, len(text))] if text else []
+
+        segments: List[Tuple[int, int]] = []
+        for start, end in self.sentences(text):
+            if self.is_candidate(text[start:end]):
+                NER_GATE_SENTENCES.labels(decision="run").inc()
+                if segments and segments[-1][1] == start:
+                    segments[-1] = (segments[-1][0], end)
+                else:
+                    segments.append((start, end))
+            else:
+                NER_GATE_SENTENCES.labels(decision="skip").inc()
+
+        NER_GATE_TEXTS.labels(decision="run" if segments else "skip").inc()
+        return segments
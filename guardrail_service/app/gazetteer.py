@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from .regex_engine import Span
+
+logger = logging.getLogger(__name__)
+
+# Customer record field -> entity label
+CUSTOMER_FIELDS = {
+    "nama": "PERSON",
+    "alamat": "ADDRESS",
+    "email": "EMAIL",
+    "phone": "PHONE",
+}
+
+# Terms shorter than this (after normalization) are ignored to avoid matching common words
+MIN_TERM_CHARS = 4
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """
+    Lower-cases text and collapses every whitespace run to a single space.
+
+    Returns:
+        str: The normalized text.
+        List[int]: For each normalized character, the index of its source character.
+    """
+    chars: List[str] = []
+    index: List[int] = []
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            if chars and chars[-1] != " ":
+                chars.append(" ")
+                index.append(i)
+            continue
+        for lowered in ch.lower():
+            chars.append(lowered)
+            index.append(i)
+    return "".join(chars), index
+
+
+class _Automaton:
+    """Immutable Aho-Corasick automaton (goto/fail/output tables) compiled from a trie."""
+
+    def __init__(self, goto: List[Dict[str, int]], outputs: List[List[Tuple[int, str]]]):
+        self.goto = goto
+        self.fail = [0] * len(goto)
+        self.outputs = [list(out) for out in outputs]
+
+        # Breadth-first: a node's failure link points to the longest proper suffix in the trie
+        pending = deque(goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in goto[node].items():
+                pending.append(child)
+                if node:
+                    state = self.fail[node]
+                    while state and ch not in goto[state]:
+                        state = self.fail[state]
+                    self.fail[child] = goto[state].get(ch, 0)
+                # Terms ending at the suffix also end here
+                self.outputs[child].extend(self.outputs[self.fail[child]])
+
+    def matches(self, text: str):
+        """Yields (end_exclusive, length, label) for every term occurrence, in one pass over `text`."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, label in outputs[state]:
+                yield i + 1, length, label
+
+
+class GazetteerEngine:
+    """
+    Exact-match detector for known customer PII (names, addresses, emails, phones).
+
+    Terms are compiled into an Aho-Corasick automaton, so all of them are found
+    in a single linear pass regardless of how many customers are loaded.
+    Matching is case-insensitive and tolerant to whitespace differences, and
+    only whole-word occurrences are reported. Customers can be added at any
+    time: new terms go into the trie immediately and the automaton is
+    recompiled on the next scan.
+    """
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str): Optional JSONL file of customer records to load
+                (default GAZETTEER_PATH; fields as in `CUSTOMER_FIELDS`).
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[Tuple[int, str]]] = [[]]
+        self._automaton: Optional[_Automaton] = None
+        self._lock = threading.Lock()
+        self._digest = hashlib.sha256()
+        self.terms = 0
+        self.version = "empty"
+
+        path = path or os.getenv("GAZETTEER_PATH")
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.add_customers(json.loads(line) for line in f if line.strip())
+            logger.info("Gazetteer loaded: %d terms from %s", self.terms, path)
+
+    def add_customers(self, customers: Iterable[dict]) -> int:
+        """
+        Adds the PII fields of customer records (see `CUSTOMER_FIELDS`).
+
+        Returns:
+            int: Number of new terms added.
+        """
+        return self.add_terms(
+            (label, customer[field])
+            for customer in customers
+            for field, label in CUSTOMER_FIELDS.items()
+            if customer.get(field)
+        )
+
+    def add_terms(self, terms: Iterable[Tuple[str, str]]) -> int:
+        """
+        Inserts (label, term) pairs into the trie.
+
+        Returns:
+            int: Number of new terms added (duplicates are ignored).
+        """
+        added = 0
+        with self._lock:
+            for label, term in terms:
+                key, _ = normalize(term.strip())
+                if len(key) < MIN_TERM_CHARS:
+                    continue
+                node = 0
+                for ch in key:
+                    child = self._goto[node].get(ch)
+                    if child is None:
+                        child = len(self._goto)
+                        self._goto.append({})
+                        self._outputs.append([])
+                        self._goto[node][ch] = child
+                    node = child
+                if (len(key), label) in self._outputs[node]:
+                    continue
+                self._outputs[node].append((len(key), label))
+                self._digest.update(f"{label}\0{key}\0".encode("utf-8"))
+                added += 1
+            if added:
+                self.terms += added
+                self.version = self._digest.hexdigest()[:12]
+                self._automaton = None
+        return added
+
+    def _compiled(self) -> _Automaton:
+        """Returns the current automaton, recompiling it after additions."""
+        automaton = self._automaton
+        if automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    # Copy the trie so later additions never mutate a live automaton
+                    self._automaton = _Automaton([dict(node) for node in self._goto], self._outputs)
+                automaton = self._automaton
+        return automaton
+
+    def scan(self, text: str) -> List[Span]:
+        """
+        Finds every whole-word occurrence of a known term.
+
+        Returns:
+            List[Span]: Spans in original-text coordinates with source 'GAZETTEER'
+            (may overlap; overlaps are resolved by the masking stage).
+        """
+        if not self.terms or not text:
+            return []
+        normalized, index = normalize(text)
+        spans = []
+        for end, length, label in self._compiled().matches(normalized):
+            start = end - length
+            # Whole words only: "Budi" must not match inside "Budiman"
+            if start > 0 and normalized[start - 1].isalnum() and normalized[start].isalnum():
+                continue
+            if end < len(normalized) and normalized[end].isalnum() and normalized[end - 1].isalnum():
+                continue
+            spans.append(Span(index[start], index[end - 1] + 1, label, "GAZETTEER"))
+        return spans
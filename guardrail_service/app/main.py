@@ -1,12 +1,33 @@
-import re
+import logging
 import time
 import os
-import psutil
-from fastapi import FastAPI
+import threading
+from contextlib import contextmanager
+import anyio.to_thread
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from .ner_engine import NEREngine
 from .regex_engine import RegexEngine
+from .batcher import NERBatcher
+from .workers import NERWorkerPool
+from .pipeline import GuardrailPipeline
+from .cache import ResultCache
+from .gate import NERGate
+from .vault_store import build_vault_store
+from .gazetteer import GazetteerEngine
+from .reloader import DetectionReloader, ReloadInProgress
+from .regex_engine import RuleConfigError
+from .admission import DEADLINE_HEADER, AdmissionController, DeadlineExceeded, Overloaded
+from .tiers import TierSelector, lowest
+from .tracing import TRACEPARENT_HEADER, TRACER, parse_traceparent
+from .metrics import (CONTENT_TYPE_LATEST, COMPUTE_LATENCY, NER_QUEUE_DEPTH, READY, REQUEST_LATENCY, STARTUP_SECONDS,
+                      ResourceSampler, render)
+
+# Module loggers (pipeline failures etc.) go to stderr next to uvicorn's own logs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 # Initialize the Guardrail Service application
 app = FastAPI(title="Infomedia Guardrail Service (Security)")
@@ -15,136 +36,445 @@ app = FastAPI(title="Infomedia Guardrail Service (Security)")
 ner_engine = NEREngine()
 regex_engine = RegexEngine()
 
+# Optional multi-process serving: forked workers share the parent's weights copy-on-write
+ner_workers = NERWorkerPool(ner_engine)
+# Concurrent requests share the model through a micro-batching scheduler
+# (one batch in flight per worker when the pool is enabled)
+ner_batcher = NERBatcher(
+    ner_workers if ner_workers.enabled else ner_engine,
+    concurrency=ner_workers.num_workers or 1
+)
+# Skips the model for sentences that cannot contain names or addresses
+ner_gate = NERGate()
+
+# Exact matcher for known customer PII (loaded from GAZETTEER_PATH, extended via /gazetteer/customers)
+gazetteer = GazetteerEngine()
+
+def _ner_version() -> str:
+    """NER part of the detection version; changes when a reloaded model is swapped in."""
+    return f"{ner_engine.model_name}:{ner_engine.backend}:r{ner_engine.revision}:gate-{ner_gate.mode}"
+
+# Repeated texts are served from a content-addressed cache of detected spans
+result_cache = ResultCache()
+pipeline = GuardrailPipeline(
+    regex_engine,
+    ner_batcher.submit_many,
+    ner_version=_ner_version(),
+    cache=result_cache,
+    gate=ner_gate,
+    gazetteer=gazetteer
+)
+
+# Versioned rules file (RULES_PATH) and model hot reload; an invalid rules file fails startup
+reloader = DetectionReloader(pipeline, ner_engine, ner_workers, ner_batcher, _ner_version)
+reloader.load_rules()
+
+# Bounded admission: sheds load (429/503) instead of queueing without limit behind the model
+admission = AdmissionController()
+# Extra threadpool threads beyond admission capacity, so overflow requests are
+# rejected right away and /health and /metrics stay responsive under load
+ADMISSION_SPARE_THREADS = int(os.getenv("ADMISSION_SPARE_THREADS", "16"))
+# Downgrades budgeted requests to cheaper detection tiers when the model tier would not fit
+tier_selector = TierSelector(admission)
+
+# Vaults handed out by reference (vault_ref) instead of inline PII
+vault_store = build_vault_store()
+
+# Resource usage is sampled in the background, never inside a request
+resource_sampler = ResourceSampler()
+NER_QUEUE_DEPTH.set_function(ner_batcher.queue_depth)
+READY.set_function(lambda: int(ner_engine.ready))
+
+# Size limits for /clean/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "64"))
+BATCH_MAX_ITEM_CHARS = int(os.getenv("BATCH_MAX_ITEM_CHARS", "20000"))
+BATCH_MAX_TOTAL_CHARS = int(os.getenv("BATCH_MAX_TOTAL_CHARS", "200000"))
+
+# Upper bound for the forked workers' warmup; a worker that never reports ready fails the warm start
+NER_WORKER_READY_TIMEOUT = float(os.getenv("NER_WORKER_READY_TIMEOUT", "300"))
+# Set when the warm start failed; reported on /health
+warm_start_error = None
+
+def _warm_start(start_time: float):
+    """
+    Loads the NER model from the local artifact directory and warms it up.
+
+    Runs on a background thread so the server can answer `/health` (not ready)
+    while the model is loading. With the worker pool enabled, the model is
+    already loaded and each worker runs its own warmup; this waits for them.
+    Per-phase cold-start timings are published on `/health` and `/metrics`.
+    """
+    global warm_start_error
+    try:
+        if ner_workers.enabled:
+            if not ner_workers.wait_ready(NER_WORKER_READY_TIMEOUT):
+                raise RuntimeError(f"NER workers not ready after {NER_WORKER_READY_TIMEOUT}s")
+        else:
+            ner_engine.load_model()
+            ner_engine.warmup()
+    except Exception as e:
+        warm_start_error = str(e)
+        logger.exception("Warm start failed")
+        return
+    ner_engine.startup_timings["total"] = round(time.perf_counter() - start_time, 3)
+    for phase, seconds in ner_engine.startup_timings.items():
+        STARTUP_SECONDS.labels(phase=phase).set(seconds)
+    logger.info("Guardrail ready in %ss", ner_engine.startup_timings["total"])
+
 @app.on_event("startup")
 def startup_event():
     """
     Service Startup Handler.
     
-    Pre-loads the NER model into memory to ensure low latency 
-    for the first incoming request.
+    Starts the inference scheduler and loads + warms up the NER model in the
+    background, so the first incoming request does not pay for it. Until
+    warmup completes, model-tier requests are rejected with 503 (or downgraded
+    when they carry a latency budget); regex and fast tiers are served.
+
+    When NER_WORKERS > 0 the model is loaded here and the workers are forked
+    before any background thread is started.
+    """
+    start_time = time.perf_counter()
+    ner_workers.start()
+    ner_batcher.start()
+    resource_sampler.start()
+    reloader.start()
+    threading.Thread(target=_warm_start, args=(start_time,), name="ner-warm-start", daemon=True).start()
+
+@app.on_event("startup")
+async def size_threadpool():
+    """
+    Sizes the threadpool that runs the sync endpoints to the admission capacity.
+
+    With the default 40 threads, requests beyond that would wait for a thread
+    before admission control ever sees them.
     """
-    ner_engine.load_model()
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = admission.capacity + ADMISSION_SPARE_THREADS
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stops the inference scheduler, the inference workers, the resource sampler and the rules watcher."""
+    ner_batcher.stop()
+    # The pool serving now (a model reload replaces the startup one)
+    reloader.ner_workers.stop()
+    resource_sampler.stop()
+    reloader.stop()
 
 class GuardrailRequest(BaseModel):
-    """Schema for incoming text to be sanitized."""
+    """
+    Schema for incoming text to be sanitized.
+
+    `response_mode`:
+        - full: cleaned text, inline vault, entities and the original text (debugging).
+        - lean: cleaned text and a `vault_ref` only; the vault stays on the server
+          and is resolved tag by tag through `/vault/resolve`.
+
+    `tier` (default full) and `latency_budget_ms`:
+        - regex: structured PII only. fast: regex + gazetteer. full: + NER model.
+        - With a budget, the service runs the most thorough tier up to `tier`
+          whose expected latency (queue wait included) fits; the tier that ran
+          is reported in the response.
+    """
     text: str
+    include_performance: bool = True
+    response_mode: Literal["full", "lean"] = "full"
+    tier: Optional[Literal["regex", "fast", "full"]] = None
+    latency_budget_ms: Optional[float] = None
 
 class GuardrailResponse(BaseModel):
     """
     Schema for the sanitized response.
     
-    Includes the cleaned text, the 'vault' (mapping of tags to real data),
-    detected entities for debugging, and performance metrics.
+    Includes the cleaned text, the 'vault' (mapping of tags to real data) or a
+    reference to it, detected entities for debugging, and performance metrics.
+    Fields that do not apply to the response mode are omitted.
     """
-    original_text: str
+    original_text: Optional[str] = None
     cleaned_text: str
-    vault: dict
-    entities: List[Dict[str, Any]] = []
-    performance: Dict[str, Any] = {}
+    vault: Optional[dict] = None
+    vault_ref: Optional[str] = None
+    entities: Optional[List[Dict[str, Any]]] = None
+    tier: Optional[str] = None
+    performance: Optional[Dict[str, Any]] = None
+
+class GuardrailBatchRequest(BaseModel):
+    """Schema for a batch of texts to be sanitized (tier/budget as in `GuardrailRequest`)."""
+    texts: List[str]
+    include_performance: bool = True
+    response_mode: Literal["full", "lean"] = "full"
+    tier: Optional[Literal["regex", "fast", "full"]] = None
+    latency_budget_ms: Optional[float] = None
+
+class GuardrailBatchResponse(BaseModel):
+    """Schema for batch results, one `GuardrailResponse` per input text in order."""
+    results: List[GuardrailResponse]
+    performance: Optional[Dict[str, Any]] = None
+
+class GazetteerCustomersRequest(BaseModel):
+    """Customer records whose `nama`, `alamat`, `email` and `phone` become gazetteer terms."""
+    customers: List[Dict[str, str]]
+
+class ModelReloadRequest(BaseModel):
+    """Model to load in the background and swap in (local directory or Hub name)."""
+    model_name: str
+    backend: Optional[Literal["torch", "int8", "onnx"]] = None
+
+class VaultResolveRequest(BaseModel):
+    """Schema for resolving tags of a stored vault."""
+    vault_ref: str
+    tags: List[str]
+
+class VaultResolveResponse(BaseModel):
+    """Original values of the requested tags that exist in the vault."""
+    values: Dict[str, str]
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint for Kubernetes readiness probes."""
-    return {"status": "healthy"}
+    """
+    Health check endpoint for Kubernetes readiness probes.
+
+    Returns 503 until the NER model is loaded and warmed up, with status
+    "failed" and the error if the warm start gave up, and with status
+    "degraded" while no NER worker is alive (they are being respawned).
+    Reports the active rules/model/gazetteer versions and the state of the last reloads.
+    """
+    details = {"startup": ner_engine.startup_timings, "versions": reloader.versions(), "reload": reloader.status}
+    if warm_start_error:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": warm_start_error, **details})
+    if not ner_engine.ready:
+        return JSONResponse(status_code=503, content={"status": "starting", **details})
+    workers = reloader.ner_workers
+    if workers.enabled and not workers.alive_workers:
+        return JSONResponse(status_code=503, content={"status": "degraded", "error": "No NER worker is alive", **details})
+    return {"status": "healthy", **details}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (stage latencies, batch sizes, queue depth, entities, RSS)."""
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+def _require_ready():
+    """Rejects requests that arrive before the model is warmed up."""
+    if not ner_engine.ready:
+        raise HTTPException(status_code=503, detail="Model is warming up", headers={"Retry-After": "1"})
+
+@contextmanager
+def _admitted(timeout_ms: Optional[str], endpoint: str):
+    """
+    Runs the body inside an admission slot bounded by the request deadline.
+
+    Maps a full queue to 429 and a missed deadline (while waiting for a slot
+    or for NER results) to 503, both with Retry-After.
+    """
+    deadline = admission.deadline_from_header(timeout_ms)
+    try:
+        with admission.admit(deadline, endpoint) as slot:
+            TRACER.current_span.set_attribute("queue_wait_ms", round(slot.wait_seconds * 1000, 3))
+            with COMPUTE_LATENCY.labels(endpoint=endpoint).time():
+                yield slot
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+class _NoAdmission:
+    """Stand-in slot for tiers that never touch the model and skip admission control."""
+    wait_seconds = 0.0
 
-@app.post("/clean", response_model=GuardrailResponse)
-def clean_text(req: GuardrailRequest):
+@contextmanager
+def _tiered(tier: str, timeout_ms: Optional[str], endpoint: str):
+    """
+    Runs the body at a detection tier.
+
+    Only the model tier queues for admission; regex and fast tiers cost
+    microseconds to milliseconds of CPU and run straight away.
+    """
+    TRACER.current_span.set_attribute("tier", tier)
+    if tier == "full":
+        with _admitted(timeout_ms, endpoint) as slot:
+            yield slot
+    else:
+        with COMPUTE_LATENCY.labels(endpoint=endpoint).time():
+            yield _NoAdmission()
+
+def _choose_tier(tier: Optional[str], budget_ms: Optional[float]) -> str:
+    """
+    Picks the tier for a request (see `TierSelector.choose`).
+
+    While the model warms up, regex and fast requests are served; a model-tier
+    request with a latency budget is downgraded to fast, one without is rejected.
+    """
+    tier = tier_selector.choose(tier, budget_ms)
+    if tier == "full" and not ner_engine.ready:
+        if budget_ms is None:
+            _require_ready()
+        tier = "fast"
+    return tier
+
+def _observe_tier(requested: Optional[str], tier: str, results: List[dict], compute_seconds: float):
+    """
+    Feeds the tier selector with the per-text compute time of `tier`.
+
+    Only texts the tier really computed count: cache hits cost next to nothing
+    and NER failures fell back midway, so neither measures the tier.
+    """
+    if not results:
+        return
+    computed = [result for result in results if not result["cached"]]
+    measured = computed and all(result["tier"] == tier for result in computed)
+    tier_selector.observe(requested or "full", lowest([tier] + [result["tier"] for result in results]),
+                          compute_seconds / len(computed) if measured else None)
+
+def _build_response(text: str, result: dict, response_mode: str) -> GuardrailResponse:
+    """Shapes one pipeline result for the requested response mode."""
+    if response_mode == "lean":
+        return GuardrailResponse(
+            cleaned_text=result["cleaned_text"],
+            vault_ref=vault_store.put(result["vault"]) if result["vault"] else None,
+            tier=result["tier"]
+        )
+    return GuardrailResponse(original_text=text, **result)
+
+def _performance_stats(start_time: float, endpoint: str, queue_wait: float = 0.0) -> Dict[str, Any]:
+    """
+    Records request latency and returns the inline performance block.
+
+    Resource figures come from the background sampler, so this never blocks.
+    """
+    elapsed = time.perf_counter() - start_time
+    REQUEST_LATENCY.labels(endpoint=endpoint).observe(elapsed)
+    return {
+        "latency_ms": round(elapsed * 1000, 2),
+        "queue_wait_ms": round(queue_wait * 1000, 2),
+        "memory_mb": resource_sampler.memory_mb,
+        "cpu_percent": resource_sampler.cpu_percent
+    }
+
+@app.post("/clean", response_model=GuardrailResponse, response_model_exclude_none=True)
+def clean_text(req: GuardrailRequest, timeout_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
+               traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)):
     """
     Main PII Sanitization Endpoint.
     
     Orchestrates a multi-stage masking process:
     1. **Regex Phase:** Detects structured patterns (NIK, Phone, Email).
     2. **NER Phase:** Detects unstructured entities (Names, Addresses) via BERT model.
-    3. **Performance Monitoring:** Tracks latency and resource usage.
-    """
-    start_time = time.time()
-    text = req.text
-    vault = {}
-    detected_entities = []
-
-    # --- PHASE 1: REGEX MASKING ---
-    # Apply pattern matching first for high-confidence structured data
-    patterns = regex_engine.patterns
-    for pattern, tag_label in patterns.items():
-        matches = list(re.finditer(pattern, text))
-        # Iterate in reverse to avoid index shifting issues during string replacement
-        for match in reversed(matches):
-            original = match.group(0)
-            
-            # Logic: Distinguish between Bank Numbers and Phone Numbers based on prefix
-            if tag_label == '[REDACTED_BANK_NUM]' and (original.startswith("08") or original.startswith("62")):
-                continue
-
-            # Securely store original PII in the Vault
-            vault[tag_label] = original
-            detected_entities.append({
-                "text": original,
-                "label": tag_label.replace("[REDACTED_", "").replace("]", ""),
-                "source": "REGEX"
-            })
-            
-            # Perform masking (Replacement)
-            start, end = match.span()
-            text = text[:start] + tag_label + text[end:]
-
-    # --- PHASE 2: NER MASKING ---
-    # Apply Deep Learning model for context-aware entity detection
+    3. **Masking Phase:** Resolves overlapping spans and writes the output once.
+    4. **Performance Monitoring:** Records latency; resource usage comes from the background sampler.
+
+    Runs under admission control: 429 when the queue is full, 503 when the
+    deadline from the `X-Request-Timeout-Ms` header passes first.
+    With a `latency_budget_ms`, a cheaper tier runs instead when the model
+    tier would not fit; regex and fast tiers bypass admission control.
+    A `traceparent` header joins the caller's trace.
+    """
+    start_time = time.perf_counter()
+    tier = _choose_tier(req.tier, req.latency_budget_ms)
+    with TRACER.span("guardrail.clean", parent=parse_traceparent(traceparent), kind="server",
+                     attributes={"text.chars": len(req.text), "response_mode": req.response_mode}), \
+            _tiered(tier, timeout_ms, "/clean") as slot:
+        compute_start = time.perf_counter()
+        result = pipeline.clean(req.text, tier)
+    _observe_tier(req.tier, tier, [result], time.perf_counter() - compute_start)
+    response = _build_response(req.text, result, req.response_mode)
+    perf_stats = _performance_stats(start_time, "/clean", slot.wait_seconds)
+
+    if req.include_performance:
+        response.performance = perf_stats
+    return response
+
+@app.post("/clean/batch", response_model=GuardrailBatchResponse, response_model_exclude_none=True)
+def clean_batch(req: GuardrailBatchRequest, timeout_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
+                traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)):
+    """
+    Batch PII Sanitization Endpoint.
+    
+    Sanitizes many texts in one call. Regex runs over every item and NER
+    inference is batched across all of them. Results are returned in input order.
+    Admission control and tier selection apply as for `/clean`, to the batch as a whole.
+    """
+    if len(req.texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    for i, text in enumerate(req.texts):
+        if len(text) > BATCH_MAX_ITEM_CHARS:
+            raise HTTPException(status_code=413, detail=f"Item {i} exceeds {BATCH_MAX_ITEM_CHARS} characters")
+    if sum(len(text) for text in req.texts) > BATCH_MAX_TOTAL_CHARS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_TOTAL_CHARS} characters in total")
+
+    start_time = time.perf_counter()
+    tier = _choose_tier(req.tier, req.latency_budget_ms)
+    with TRACER.span("guardrail.clean_batch", parent=parse_traceparent(traceparent), kind="server",
+                     attributes={"texts": len(req.texts), "response_mode": req.response_mode}), \
+            _tiered(tier, timeout_ms, "/clean/batch") as slot:
+        compute_start = time.perf_counter()
+        results = pipeline.clean_many(req.texts, tier)
+    # Estimates are per text, so batches and single requests share one average
+    _observe_tier(req.tier, tier, results, time.perf_counter() - compute_start)
+    responses = [
+        _build_response(text, result, req.response_mode)
+        for text, result in zip(req.texts, results)
+    ]
+    perf_stats = _performance_stats(start_time, "/clean/batch", slot.wait_seconds)
+
+    return GuardrailBatchResponse(
+        results=responses,
+        performance=perf_stats if req.include_performance else None
+    )
+
+@app.post("/gazetteer/customers")
+def add_gazetteer_customers(req: GazetteerCustomersRequest):
+    """
+    Gazetteer Update Endpoint.
+
+    Adds customers to the exact-match gazetteer. New terms are matched from the
+    next request on; the result cache is invalidated through the detection version.
+    """
+    added = gazetteer.add_customers(req.customers)
+    return {"added": added, "terms": gazetteer.terms, "version": gazetteer.version}
+
+@app.post("/reload/rules")
+def reload_rules():
+    """
+    Rules Reload Endpoint.
+
+    Validates and swaps in the rules file (RULES_PATH) right away instead of
+    waiting for the next poll. Responds 422 with the problems found if the
+    file is invalid; the active rules stay in place.
+    """
     try:
-        ner_results = ner_engine.predict(text)
-        
-        # Identify already masked zones to prevent double masking
-        forbidden_zones = []
-        for match in re.finditer(r'\[REDACTED_[A-Z]+\]', text):
-            forbidden_zones.append((match.start(), match.end()))
-
-        # Sort entities reverse-order for safe string slicing
-        ner_results.sort(key=lambda x: x['start'], reverse=True)
-        valid_labels = ['PERSON', 'ADDRESS', 'LOCATION', 'ORGANIZATION', 'NIK', 'EMAIL', 'PHONE', 'BIRTHDATE', 'BANK_NUM']
-        
-        for ent in ner_results:
-            label = ent['entity_group']
-            start, end = ent['start'], ent['end']
-            
-            # Conflict Check: Skip if entity overlaps with an existing Regex tag
-            is_conflict = False
-            for f_start, f_end in forbidden_zones:
-                if (start < f_end and end > f_start):
-                    is_conflict = True; break
-            
-            if is_conflict: continue
-
-            if label in valid_labels:
-                real_word = text[start:end]
-                tag = f"[REDACTED_{label}]"
-                
-                # Add to Vault and Entity List
-                vault[tag] = real_word
-                detected_entities.append({
-                    "text": real_word,
-                    "label": label,
-                    "source": "NER Model"
-                })
-                
-                # Perform NER masking
-                text = text[:start] + tag + text[end:]
-                
-    except Exception as e:
-        print(f"NER Error: {e}")
-
-    # --- CALCULATE PERFORMANCE ---
-    # Measure execution time and resource footprint
-    end_time = time.time()
-    process = psutil.Process(os.getpid())
-    perf_stats = {
-        "latency_ms": round((end_time - start_time) * 1000, 2),
-        "memory_mb": round(process.memory_info().rss / 1024 / 1024, 2),
-        "cpu_percent": process.cpu_percent(interval=0.2)
-    }
+        return reloader.reload_rules()
+    except RuleConfigError as e:
+        raise HTTPException(status_code=422, detail=e.problems)
 
-    return GuardrailResponse(
-        original_text=req.text,
-        cleaned_text=text,
-        vault=vault,
-        entities=detected_entities,
-        performance=perf_stats
-    )
\ No newline at end of file
+@app.post("/reload/model", status_code=202)
+def reload_model(req: ModelReloadRequest):
+    """
+    Model Reload Endpoint.
+
+    Loads and warms up `model_name` in the background while the active model
+    keeps serving (with NER_WORKERS > 0, in a newly forked worker pool), then
+    swaps it in; progress is reported on `/health`.
+    Responds 409 if a reload is already running.
+    """
+    _require_ready()
+    try:
+        reloader.reload_model(req.model_name, req.backend)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "loading", "model_name": req.model_name}
+
+@app.post("/vault/resolve", response_model=VaultResolveResponse)
+def resolve_vault(req: VaultResolveRequest, traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)):
+    """
+    Vault Resolution Endpoint.
+
+    Returns the original values of only the requested tags of a vault issued
+    by a lean `/clean` call. Responds 404 if the reference is unknown or expired.
+    """
+    with TRACER.span("guardrail.vault_resolve", parent=parse_traceparent(traceparent), kind="server",
+                     attributes={"tags": len(req.tags)}):
+        values = vault_store.resolve(req.vault_ref, req.tags)
+    if values is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired vault_ref")
+    return VaultResolveResponse(values=values)
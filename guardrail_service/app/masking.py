@@ -0,0 +1,142 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from .regex_engine import Span
+
+# Lower rank wins when two spans overlap.
+# Regex matches are high-confidence structured data, and exact gazetteer hits
+# are known customer PII, so both beat model output.
+SOURCE_PRIORITY = {
+    "REGEX": 0,
+    "GAZETTEER": 1,
+    "NER Model": 2,
+}
+
+
+def _rank(span: Span):
+    """Sort key used to decide which of two overlapping spans is kept."""
+    return (SOURCE_PRIORITY.get(span.source, len(SOURCE_PRIORITY)), span.start, span.start - span.end)
+
+
+def resolve_overlaps(spans: Iterable[Span]) -> List[Span]:
+    """
+    Selects a non-overlapping subset of spans.
+
+    Spans are visited in priority order (source rank, then leftmost, then longest)
+    and accepted only if they do not intersect an already accepted span.
+    Accepted spans are kept in a start-sorted interval list, so each check is
+    a binary search against its two neighbours.
+
+    Args:
+        spans (Iterable[Span]): Candidate spans from any detection stage.
+
+    Returns:
+        List[Span]: Accepted spans, ordered by start offset.
+    """
+    starts: List[int] = []
+    accepted: List[Span] = []
+
+    for span in sorted(spans, key=_rank):
+        if span.end <= span.start:
+            continue
+        i = bisect_right(starts, span.start)
+        # Previous interval must end before this one starts
+        if i > 0 and accepted[i - 1].end > span.start:
+            continue
+        # Next interval must start after this one ends
+        if i < len(accepted) and accepted[i].start < span.end:
+            continue
+        starts.insert(i, span.start)
+        accepted.insert(i, span)
+
+    return accepted
+
+
+def apply_spans(text: str, spans: List[Span]):
+    """
+    Masks all spans in a single pass and builds the output string once.
+
+    Args:
+        text (str): The original input text.
+        spans (List[Span]): Non-overlapping spans ordered by start offset
+            (as returned by `resolve_overlaps`).
+
+    Returns:
+        str: The sanitized text.
+        dict: The vault mapping each tag to the first value masked with it.
+        list: The detected entities in text order.
+    """
+    parts = []
+    vault: Dict[str, str] = {}
+    entities = []
+    cursor = 0
+
+    for span in spans:
+        original = text[span.start:span.end]
+        parts.append(text[cursor:span.start])
+        parts.append(span.tag)
+        cursor = span.end
+
+        # Securely store original PII in the Vault
+        vault.setdefault(span.tag, original)
+        entities.append({
+            "text": original,
+            "label": span.label,
+            "source": span.source
+        })
+
+    parts.append(text[cursor:])
+    return "".join(parts), vault, entities
+
+
+class MaskedView:
+    """
+    A rendering of the original text with a set of spans already replaced by tags.
+
+    Used to feed the NER model text where structured PII is already hidden,
+    while still reporting model output in original-text coordinates. This
+    replaces re-scanning the masked text for tags ("forbidden zones").
+    """
+    def __init__(self, text: str, spans: List[Span]):
+        """
+        Args:
+            text (str): The original input text.
+            spans (List[Span]): Non-overlapping spans ordered by start offset.
+        """
+        parts = []
+        self._tag_starts: List[int] = []
+        self._tag_ends: List[int] = []
+        # Offset to add to a masked position located after tag i to get its original position
+        self._shifts: List[int] = []
+
+        cursor = 0
+        length = 0
+        for span in spans:
+            gap = text[cursor:span.start]
+            parts.append(gap)
+            parts.append(span.tag)
+            length += len(gap)
+            self._tag_starts.append(length)
+            length += len(span.tag)
+            self._tag_ends.append(length)
+            self._shifts.append(span.end - length)
+            cursor = span.end
+        parts.append(text[cursor:])
+
+        self.text = "".join(parts)
+
+    def to_original(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """
+        Maps a [start, end) range of the masked text back to the original text.
+
+        Returns:
+            Optional[Tuple[int, int]]: The original range, or None if the range
+            touches one of the inserted tags.
+        """
+        i = bisect_right(self._tag_starts, start) - 1
+        if i >= 0 and start < self._tag_ends[i]:
+            return None
+        j = bisect_left(self._tag_starts, end)
+        if j != i + 1:
+            return None
+        shift = self._shifts[i] if i >= 0 else 0
+        return start + shift, end + shift
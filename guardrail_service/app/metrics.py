@@ -0,0 +1,131 @@
+import os
+import threading
+import psutil
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+
+# Default latency buckets (seconds), from sub-millisecond regex work up to slow NER batches
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Skip the per-series `*_created` timestamps; nothing here uses them
+disable_created_metrics()
+
+
+def render() -> bytes:
+    """Current values of every metric in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
+
+
+class ResourceSampler:
+    """
+    Samples process CPU and memory usage on a background thread.
+
+    Requests read the latest sample instead of measuring inline, so reporting
+    resource usage costs nothing on the request path. (`/metrics` gets process
+    RSS and CPU time from the client library's own process collector.)
+    """
+    def __init__(self, interval: float = None):
+        self.interval = interval or float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "5"))
+        self.process = psutil.Process(os.getpid())
+        self.cpu_percent = 0.0
+        self.memory_mb = round(self.process.memory_info().rss / 1024 / 1024, 2)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the sampling thread (idempotent)."""
+        if self._thread is not None:
+            return
+        # Prime cpu_percent so the first sample reflects the first interval
+        self.process.cpu_percent(interval=None)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the sampling thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Takes one non-blocking sample."""
+        self.cpu_percent = self.process.cpu_percent(interval=None)
+        self.memory_mb = round(self.process.memory_info().rss / 1024 / 1024, 2)
+
+
+# --- GUARDRAIL METRICS ---
+REQUEST_LATENCY = Histogram(
+    "guardrail_request_latency_seconds", "End-to-end request latency.", ("endpoint",), buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram(
+    "guardrail_stage_latency_seconds", "Latency of each pipeline stage (regex, gazetteer, ner, masking).", ("stage",), buckets=LATENCY_BUCKETS)
+NER_BATCH_SIZE = Histogram(
+    "guardrail_ner_batch_size", "Number of texts per NER forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+NER_QUEUE_DEPTH = Gauge(
+    "guardrail_ner_queue_depth", "Texts waiting for the NER scheduler.")
+NER_QUEUE_WAIT = Histogram(
+    "guardrail_ner_queue_wait_seconds", "Time a text waited in the NER scheduler queue before its forward pass.", buckets=LATENCY_BUCKETS)
+NER_EXPIRED = Counter(
+    "guardrail_ner_expired_total", "Texts dropped from the NER queue because their request deadline had passed.")
+QUEUE_WAIT = Histogram(
+    "guardrail_admission_wait_seconds", "Time a request waited for an admission slot (excluded from compute).", ("endpoint",), buckets=LATENCY_BUCKETS)
+COMPUTE_LATENCY = Histogram(
+    "guardrail_compute_latency_seconds", "Time a request spent in the pipeline after admission.", ("endpoint",), buckets=LATENCY_BUCKETS)
+ADMISSION_REJECTED = Counter(
+    "guardrail_admission_rejected_total", "Requests shed by admission control (queue_full/deadline).", ("endpoint", "reason"))
+ADMISSION_INFLIGHT = Gauge(
+    "guardrail_admission_inflight", "Requests currently running the pipeline.")
+ADMISSION_QUEUED = Gauge(
+    "guardrail_admission_queued", "Requests waiting for an admission slot.")
+TIER_REQUESTS = Counter(
+    "guardrail_tier_requests_total", "Requests by requested and served detection tier (regex/fast/full).", ("requested", "served"))
+TIER_COMPUTE_LATENCY = Histogram(
+    "guardrail_tier_compute_latency_seconds", "Pipeline compute time by detection tier that ran.", ("tier",), buckets=LATENCY_BUCKETS)
+NER_FAILURES = Counter(
+    "guardrail_ner_failures_total", "NER inference calls that failed; those texts were served without model detections.", ("error",))
+ENTITIES = Counter(
+    "guardrail_entities_total", "Detected entities by label and source.", ("label", "source"))
+NER_GATE_SENTENCES = Counter(
+    "guardrail_ner_gate_sentences_total", "Sentences the NER gate sent to the model (run) or skipped.", ("decision",))
+NER_GATE_TEXTS = Counter(
+    "guardrail_ner_gate_texts_total", "Texts with at least one candidate sentence (run) or none (skip).", ("decision",))
+CACHE_REQUESTS = Counter(
+    "guardrail_cache_requests_total", "Result cache lookups by outcome (hit/miss).", ("result",))
+CACHE_EVICTIONS = Counter(
+    "guardrail_cache_evictions_total", "Result cache evictions by reason (lru/ttl/memory/version).", ("reason",))
+CACHE_ENTRIES = Gauge(
+    "guardrail_cache_entries", "Entries currently held in the result cache.")
+CACHE_BYTES = Gauge(
+    "guardrail_cache_bytes", "Estimated memory held by the result cache.")
+NER_WORKER_BATCHES = Counter(
+    "guardrail_ner_worker_batches_total", "Batches completed by each inference worker.", ("worker",))
+NER_WORKER_BUSY_SECONDS = Counter(
+    "guardrail_ner_worker_busy_seconds_total", "Time each inference worker spent running batches.", ("worker",))
+NER_WORKER_INFLIGHT = Gauge(
+    "guardrail_ner_worker_inflight", "Batches dispatched to each inference worker and not yet returned.", ("worker",))
+NER_WORKER_UTILIZATION = Gauge(
+    "guardrail_ner_worker_utilization", "Fraction of the last sample interval each inference worker was busy.", ("worker",))
+NER_WORKER_RESPAWNS = Counter(
+    "guardrail_ner_worker_respawns_total", "Inference workers forked again after exiting.", ("worker",))
+NER_WORKER_USS = Gauge(
+    "guardrail_ner_worker_unique_memory_bytes", "Private (non-shared) memory of each inference worker.", ("worker",))
+VAULT_ENTRIES = Gauge(
+    "guardrail_vault_entries", "Vaults currently held by the vault store.")
+VAULT_OPERATIONS = Counter(
+    "guardrail_vault_operations_total", "Vault store operations by type and outcome.", ("op", "result"))
+STARTUP_SECONDS = Gauge(
+    "guardrail_startup_seconds", "Cold-start duration by phase (tokenizer, model, pipeline, fork, warmup, total).", ("phase",))
+READY = Gauge(
+    "guardrail_ready", "1 once the model is loaded and warmed up, 0 while starting.")
+RELOADS = Counter(
+    "guardrail_reloads_total", "Hot reloads by component (rules/model) and result (ok/invalid/failed).", ("component", "result"))
+RELOAD_SECONDS = Gauge(
+    "guardrail_last_reload_seconds", "Duration of the last successful hot reload by component.", ("component",))
+TRACE_SPANS = Counter(
+    "guardrail_trace_spans_total", "Sampled trace spans written to the JSONL file (exported) or lost to write errors (failed).", ("result",))
@@ -1,12 +1,111 @@
+import importlib.util
+import logging
 import os
-from transformers import pipeline
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from transformers import AutoModelForTokenClassification, AutoTokenizer, pipeline
+
+# Supported inference backends (selected with the NER_BACKEND env var)
+BACKENDS = ("torch", "int8", "onnx")
+
+HUB_MODEL_NAME = "treamyracle/indobert-ner-pii-guardrail"
+
+logger = logging.getLogger(__name__)
+
+# Local artifact directory written by download_model.py; preferred over the Hub when present
+LOCAL_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_cache")
+
+# Representative text used to build warmup inputs (names, address, structured PII)
+_WARMUP_SENTENCE = (
+    "Halo, saya Budi Santoso, tinggal di Jl. Sudirman No 1 Jakarta. "
+    "NIK 3201123456789001, email budi@test.com, HP 089988776655. "
+)
+
+
+@contextmanager
+def _timed(timings: Optional[Dict[str, float]], phase: str):
+    """Records the duration of a startup phase in seconds into `timings` (if given)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = round(time.perf_counter() - start, 3)
+
+
+def build_pipeline(model_name: str, backend: str = "torch", timings: Optional[Dict[str, float]] = None):
+    """
+    Builds a HuggingFace NER pipeline for the given model and inference backend.
+
+    Backends:
+        - torch: float32 PyTorch model (reference implementation).
+        - int8:  PyTorch model with Linear layers dynamically quantized to int8.
+        - onnx:  ONNX graph executed by ONNX Runtime (requires `optimum[onnxruntime]`).
+                 A pre-exported `model.onnx` in the model directory is used when present,
+                 otherwise the model is exported on load.
+
+    All backends produce the same `entity_group/start/end` output format.
+
+    When `model_name` is a local directory (e.g. the `model_cache` written by
+    `download_model.py`), everything is loaded from disk without contacting the
+    Hub, and `model.safetensors` weights are memory-mapped instead of copied.
+
+    Args:
+        timings (dict): Optional dict that receives the duration in seconds of
+            each load phase ('tokenizer', 'model', 'pipeline').
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown NER backend '{backend}', expected one of {BACKENDS}")
+
+    local = os.path.isdir(model_name)
+    load_kwargs = {"local_files_only": True} if local else {}
+
+    with _timed(timings, "tokenizer"):
+        tokenizer = AutoTokenizer.from_pretrained(model_name, **load_kwargs)
+
+    with _timed(timings, "model"):
+        if backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForTokenClassification
+            except ImportError as e:
+                raise RuntimeError("NER_BACKEND=onnx requires the 'optimum[onnxruntime]' package") from e
+            exported = os.path.isfile(os.path.join(model_name, "model.onnx"))
+            model = ORTModelForTokenClassification.from_pretrained(model_name, export=not exported, **load_kwargs)
+        else:
+            if local and os.path.isfile(os.path.join(model_name, "model.safetensors")):
+                load_kwargs["use_safetensors"] = True
+                # Loads weights straight from the mmap'ed file instead of random-init + copy
+                # (needs `accelerate`)
+                load_kwargs["low_cpu_mem_usage"] = importlib.util.find_spec("accelerate") is not None
+            model = AutoModelForTokenClassification.from_pretrained(model_name, **load_kwargs)
+            if backend == "int8":
+                import torch
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    # device=-1 for CPU, change to 0 for GPU support
+    with _timed(timings, "pipeline"):
+        return pipeline(
+            "ner",
+            model=model,
+            tokenizer=tokenizer,
+            aggregation_strategy="simple", # Merges sub-tokens into words
+            device=-1
+        )
 
 class NEREngine:
     """
     Singleton wrapper for the Named Entity Recognition (NER) model.
-    
+
     This class ensures the heavy BERT model is loaded only once in memory
     (Singleton Pattern) and provides a simplified interface for inference.
+    Texts longer than the model's maximum sequence length are processed in
+    overlapping windows (Long-Document Mode).
+
+    A different model can be loaded and warmed up next to the active one
+    (`prepare`) and then swapped in with a single reference assignment
+    (`activate`); each inference call uses the model that was active when it started.
     """
     _instance = None
 
@@ -16,39 +115,215 @@ class NEREngine:
         """
         if cls._instance is None:
             cls._instance = super(NEREngine, cls).__new__(cls)
-            # Fetch model path from env or default to the fine-tuned IndoBERT
-            cls._instance.model_name = os.getenv("MODEL_NAME", "treamyracle/indobert-ner-pii-guardrail")
+            # Fetch model path from env, else the local artifact directory, else the Hub
+            cls._instance.model_name = os.getenv("MODEL_NAME") or (
+                LOCAL_MODEL_DIR if os.path.isdir(LOCAL_MODEL_DIR) else HUB_MODEL_NAME
+            )
+            cls._instance.backend = os.getenv("NER_BACKEND", "torch")
             cls._instance.nlp = None
+            # Incremented on every model swap; part of the detection version
+            cls._instance.revision = 0
+            cls._instance.loaded_at = None
+            # Long-Document Mode: window size in tokens (0 = model maximum) and overlap between windows
+            cls._instance.window_tokens = int(os.getenv("NER_WINDOW_TOKENS", "0"))
+            cls._instance.window_stride = int(os.getenv("NER_WINDOW_STRIDE", "64"))
+            # Threads used to run window batches in parallel (1 = sequential)
+            cls._instance.window_workers = int(os.getenv("NER_WINDOW_WORKERS", "1"))
+            # Warmup: text lengths (chars) run once at startup, `warmup_batch` texts per length
+            cls._instance.warmup_lengths = [
+                int(n) for n in os.getenv("NER_WARMUP_LENGTHS", "64,256,1024,4096").split(",") if n.strip()
+            ]
+            cls._instance.warmup_batch = int(os.getenv("NER_WARMUP_BATCH", "4"))
+            # Cold-start duration of each phase in seconds (load, warmup)
+            cls._instance.startup_timings = {}
+            cls._instance.ready = False
         return cls._instance
 
     def load_model(self):
         """
         Loads the HuggingFace NER pipeline into memory.
-        
-        Configured to run on CPU (device=-1) by default.
+
+        Configured to run on CPU with the backend selected by NER_BACKEND.
         """
         if self.nlp is None:
-            print(f"📦 Loading NER Model: {self.model_name}...")
+            logger.info("Loading NER model %s (backend: %s)", self.model_name, self.backend)
             try:
-                # device=-1 for CPU, change to 0 for GPU support
-                self.nlp = pipeline(
-                    "ner", 
-                    model=self.model_name, 
-                    tokenizer=self.model_name, 
-                    aggregation_strategy="simple", # Merges sub-tokens into words
-                    device=-1 
-                )
-                print("✅ NER Model loaded successfully.")
-            except Exception as e:
-                print(f"❌ Failed to load NER Model: {e}")
-                raise e
+                self.nlp = build_pipeline(self.model_name, self.backend, timings=self.startup_timings)
+                self.loaded_at = time.time()
+                logger.info("NER model loaded")
+            except Exception:
+                logger.exception("Failed to load NER model %s", self.model_name)
+                raise
+
+    def warmup(self):
+        """
+        Runs a few untimed inference batches so the first real request does not
+        pay for lazy initialization (tokenizer caches, kernel selection, allocator growth).
+
+        One batch of `warmup_batch` texts is run per length in `warmup_lengths`;
+        lengths above the model limit also warm up the Long-Document Mode path.
+        Sets `ready` when done.
+        """
+        if not self.nlp:
+            self.load_model()
+        with _timed(self.startup_timings, "warmup"):
+            self._warm(self.nlp)
+        self.ready = True
+        logger.info("NER warmup done (%s chars x %d): %s", self.warmup_lengths, self.warmup_batch, self.startup_timings)
+
+    def _warm(self, nlp):
+        """Runs the warmup batches on `nlp`."""
+        for length in self.warmup_lengths:
+            text = (_WARMUP_SENTENCE * (length // len(_WARMUP_SENTENCE) + 1))[:length]
+            self._predict(nlp, [text] * self.warmup_batch)
+
+    def prepare(self, model_name: str, backend: str = None, warm: bool = True):
+        """
+        Loads (and by default warms up) another model next to the active one.
+
+        Nothing changes until the returned pipeline is passed to `activate`;
+        until then both models are in memory.
+
+        Args:
+            warm (bool): Run the warmup batches here. Forked workers warm up
+                their own copy, so the pool skips it in the parent.
+
+        Returns:
+            The new HuggingFace pipeline.
+            dict: Duration in seconds of each phase ('tokenizer', 'model', 'pipeline', 'warmup').
+        """
+        timings = {}
+        logger.info("Loading NER model %s in the background (backend: %s)", model_name, backend or self.backend)
+        nlp = build_pipeline(model_name, backend or self.backend, timings=timings)
+        if warm:
+            with _timed(timings, "warmup"):
+                self._warm(nlp)
+        return nlp, timings
+
+    def activate(self, nlp, model_name: str, backend: str = None):
+        """
+        Makes a pipeline from `prepare` the active model.
+
+        New calls pick up the new pipeline; calls in progress keep their reference.
+        """
+        self.nlp = nlp
+        self.model_name, self.backend = model_name, backend or self.backend
+        self.revision += 1
+        self.loaded_at = time.time()
+        logger.info("NER model swapped to %s (revision %d)", model_name, self.revision)
 
     def predict(self, text: str):
         """
         Performs NER inference on the provided text.
-        
+
         Ensures the model is loaded (Lazy Loading) before predicting.
         """
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: List[str]):
+        """
+        Performs NER inference on several texts in one forward pass.
+
+        Texts are padded to the longest item, so callers should group
+        texts of similar length together (see `NERBatcher`). Texts longer than
+        the model's maximum sequence length are split into overlapping windows
+        which are batched together with the other inputs.
+
+        Returns:
+            list: One entity list per input text, in input order.
+        """
         if not self.nlp:
             self.load_model()
-        return self.nlp(text)
\ No newline at end of file
+        return self._predict(self.nlp, texts)
+
+    def _predict(self, nlp, texts: List[str]):
+        """`predict_batch` on a given pipeline, so one call never mixes two models."""
+        if not texts:
+            return []
+        window_tokens = self.window_tokens
+        if window_tokens <= 0:
+            # Model maximum, leaving room for the [CLS] and [SEP] special tokens
+            window_tokens = min(nlp.tokenizer.model_max_length, 512) - 2
+
+        # 1. Split every text into model-sized pieces: (text_index, char_offset, piece_text)
+        pieces = []
+        cores = []
+        for i, text in enumerate(texts):
+            windows = self._windows(nlp, text, window_tokens)
+            cores.append(self._core_ranges(windows, len(text)))
+            for start, end in windows:
+                pieces.append((i, start, text[start:end]))
+
+        # 2. Run all pieces as a batch
+        piece_results = self._run_pieces(nlp, [piece for _, _, piece in pieces])
+
+        # 3. Merge windows back into one entity list per text
+        results = [[] for _ in texts]
+        window_index = [0] * len(texts)
+        for (i, offset, _), entities in zip(pieces, piece_results):
+            core_start, core_end = cores[i][window_index[i]]
+            window_index[i] += 1
+            for ent in entities:
+                start, end = ent['start'] + offset, ent['end'] + offset
+                # Each entity is owned by the window whose core contains its centre,
+                # so entities seen in two overlapping windows are reported once.
+                if not core_start <= (start + end) // 2 < core_end:
+                    continue
+                results[i].append({**ent, 'start': start, 'end': end})
+        return results
+
+    def _windows(self, nlp, text: str, window_tokens: int):
+        """
+        Computes overlapping character windows that each fit in the model.
+
+        The text is tokenized once; windows are cut on token boundaries.
+
+        Returns:
+            list: (start, end) character ranges covering the whole text.
+        """
+        # A token spans at least one character, so short texts never need windowing
+        if len(text) <= window_tokens:
+            return [(0, len(text))]
+
+        offsets = nlp.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+        if len(offsets) <= window_tokens:
+            return [(0, len(text))]
+
+        step = max(window_tokens - self.window_stride, 1)
+        windows = []
+        for first in range(0, len(offsets), step):
+            last = min(first + window_tokens, len(offsets)) - 1
+            windows.append((offsets[first][0], offsets[last][1]))
+            if last == len(offsets) - 1:
+                break
+        # Keep any leading/trailing whitespace inside the first and last window
+        windows[0] = (0, windows[0][1])
+        windows[-1] = (windows[-1][0], len(text))
+        return windows
+
+    @staticmethod
+    def _core_ranges(windows, length: int):
+        """
+        Splits each overlap between consecutive windows at its midpoint.
+
+        Returns:
+            list: One (core_start, core_end) range per window; the cores tile [0, length).
+        """
+        boundaries = [0]
+        for (_, prev_end), (next_start, _) in zip(windows, windows[1:]):
+            boundaries.append((next_start + prev_end) // 2)
+        boundaries.append(max(length, 1))
+        return list(zip(boundaries, boundaries[1:]))
+
+    def _run_pieces(self, nlp, pieces: List[str]):
+        """Runs the pipeline over all pieces, optionally split across worker threads."""
+        if self.window_workers <= 1 or len(pieces) <= 1:
+            return nlp(pieces, batch_size=len(pieces))
+
+        size = -(-len(pieces) // self.window_workers)
+        chunks = [pieces[i:i + size] for i in range(0, len(pieces), size)]
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            outputs = pool.map(lambda chunk: nlp(chunk, batch_size=len(chunk)), chunks)
+        return [entities for output in outputs for entities in output]
@@ -0,0 +1,212 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from .regex_engine import RegexEngine, Span
+from .masking import MaskedView, apply_spans, resolve_overlaps
+from .metrics import ENTITIES, NER_FAILURES, STAGE_LATENCY
+from .cache import ResultCache
+from .gate import NERGate
+from .gazetteer import GazetteerEngine
+from .admission import DeadlineExceeded
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# Entity groups produced by the NER model that are eligible for masking
+VALID_NER_LABELS = {'PERSON', 'ADDRESS', 'LOCATION', 'ORGANIZATION', 'NIK', 'EMAIL', 'PHONE', 'BIRTHDATE', 'BANK_NUM'}
+
+
+class GuardrailPipeline:
+    """
+    The framework-independent sanitization pipeline (Regex -> Gazetteer -> NER -> Masking).
+
+    Kept separate from the FastAPI layer so the same logic serves `/clean`,
+    `/clean/batch` and offline tooling. When a `ResultCache` is attached,
+    texts seen before skip both detection phases. When an `NERGate` is attached,
+    only sentences that may contain names or addresses are sent to the model.
+    When a `GazetteerEngine` is attached, known customer PII is matched exactly
+    and hidden from the model like regex matches.
+
+    Each call runs at a detection tier (see `tiers.TIERS`): 'regex' stops after
+    the regex phase, 'fast' adds the gazetteer, 'full' adds the NER model.
+    """
+    def __init__(self, regex_engine: RegexEngine, predict_batch: Callable[[List[str]], List[list]],
+                 ner_version: str = "", cache: Optional[ResultCache] = None, gate: Optional[NERGate] = None,
+                 gazetteer: Optional[GazetteerEngine] = None):
+        """
+        Args:
+            regex_engine (RegexEngine): Engine used for structured PII.
+            predict_batch (Callable): Runs NER over a list of texts and returns
+                one entity list per text (e.g. `NERBatcher.submit_many`).
+            ner_version (str): Identifier of the NER model/backend, part of the cache key.
+            cache (ResultCache): Optional cache of resolved spans.
+            gate (NERGate): Optional pre-classifier deciding which sentences need the model.
+            gazetteer (GazetteerEngine): Optional exact matcher for known customer PII.
+        """
+        self.regex_engine = regex_engine
+        self.predict_batch = predict_batch
+        self.ner_version = ner_version
+        self.cache = cache
+        self.gate = gate
+        self.gazetteer = gazetteer
+        # Odd while a model swap is in progress; see `swapping_ner`
+        self._ner_swaps = 0
+        self._swap_lock = threading.Lock()
+
+    @contextmanager
+    def swapping_ner(self):
+        """
+        Brackets a change of the NER model and `ner_version`.
+
+        A request cannot tell which model its NER call reached while the two
+        change, so results of requests that overlap a swap are not cached.
+        """
+        with self._swap_lock:
+            self._ner_swaps += 1
+            try:
+                yield
+            finally:
+                self._ner_swaps += 1
+
+    @property
+    def version(self) -> str:
+        """Combined detection version (pattern set + gazetteer + model)."""
+        return self._version(self.regex_engine)
+
+    def _version(self, regex_engine: RegexEngine) -> str:
+        gazetteer_version = self.gazetteer.version if self.gazetteer else "none"
+        return f"{regex_engine.version}:{gazetteer_version}:{self.ner_version}"
+
+    def clean(self, text: str, tier: str = "full") -> dict:
+        """Sanitizes a single text. See `clean_many`."""
+        return self.clean_many([text], tier)[0]
+
+    def clean_many(self, texts: List[str], tier: str = "full") -> List[dict]:
+        """
+        Sanitizes several texts, running NER inference for all of them as one batch.
+
+        Cached results always come from the full tier and are used at any tier;
+        only full-tier results are written to the cache.
+
+        Returns:
+            List[dict]: One result per text with 'cleaned_text', 'vault', 'entities',
+            'tier' (the tier that produced it: 'full' for cache hits, the next
+            lower tier if NER inference failed) and 'cached' (served from the cache).
+        """
+        # Engines are read once, so a rules/model swap mid-request does not mix versions
+        regex_engine = self.regex_engine
+        swaps = self._ner_swaps
+        version = self._version(regex_engine)
+
+        # --- PHASE 0: CACHE LOOKUP ---
+        if self.cache is not None:
+            self.cache.ensure_version(version)
+            resolved = [self.cache.get(text) for text in texts]
+        else:
+            resolved = [None] * len(texts)
+        pending = [i for i, spans in enumerate(resolved) if spans is None]
+        TRACER.current_span.set_attribute("cache_hits", len(texts) - len(pending))
+
+        # --- PHASE 1 & 2: DETECTION (cache misses only) ---
+        candidates, ner_ok = self._detect([texts[i] for i in pending], tier, regex_engine)
+        served = tier if ner_ok else "fast"
+        tiers = ["full"] * len(texts)
+        for i in pending:
+            tiers[i] = served
+
+        # --- PHASE 3: MASKING ---
+        with STAGE_LATENCY.labels(stage="masking").time(), TRACER.span("guardrail.masking", attributes={"texts": len(texts)}):
+            for i, spans in zip(pending, candidates):
+                resolved[i] = resolve_overlaps(spans)
+                # Lower tiers and regex-only fallbacks (NER failed) are not cached
+                if tier == "full" and ner_ok and self.cache is not None and self._unswapped(swaps):
+                    self.cache.put(texts[i], resolved[i], version)
+            computed = set(pending)
+            return [self._render(text, spans, served, i not in computed)
+                    for i, (text, spans, served) in enumerate(zip(texts, resolved, tiers))]
+
+    def _unswapped(self, swaps: int) -> bool:
+        """True if no model swap overlapped the request that read `swaps` when it started."""
+        return swaps % 2 == 0 and self._ner_swaps == swaps
+
+    def _detect(self, texts: List[str], tier: str = "full", regex_engine: Optional[RegexEngine] = None):
+        """
+        Runs the detection phases enabled by `tier`.
+
+        Returns:
+            List[List[Span]]: Candidate (possibly overlapping) spans per text.
+            bool: False if NER inference failed and only regex spans are present.
+        """
+        if not texts:
+            return [], True
+
+        # --- PHASE 1: REGEX DETECTION ---
+        # Apply pattern matching first for high-confidence structured data.
+        with STAGE_LATENCY.labels(stage="regex").time(), TRACER.span("guardrail.regex") as span:
+            all_spans = [(regex_engine or self.regex_engine).scan(text) for text in texts]
+            span.set_attribute("matches", sum(len(spans) for spans in all_spans))
+
+        # --- PHASE 1b: GAZETTEER DETECTION ---
+        # Exact matches of known customer names/addresses, in one pass per text.
+        if tier != "regex" and self.gazetteer is not None and self.gazetteer.terms:
+            with STAGE_LATENCY.labels(stage="gazetteer").time(), TRACER.span("guardrail.gazetteer"):
+                all_spans = [
+                    resolve_overlaps(spans + self.gazetteer.scan(text))
+                    for text, spans in zip(texts, all_spans)
+                ]
+
+        if tier != "full":
+            return [list(spans) for spans in all_spans], True
+
+        # --- PHASE 2: NER DETECTION ---
+        # The model sees the text with regex and gazetteer hits masked; its offsets are mapped back to the original.
+        views = [MaskedView(text, spans) for text, spans in zip(texts, all_spans)]
+
+        # Only candidate segments reach the model: (text_index, offset_in_view, segment_text)
+        pieces = []
+        for i, view in enumerate(views):
+            segments = self.gate.select(view.text) if self.gate else [(0, len(view.text))]
+            pieces.extend((i, start, view.text[start:end]) for start, end in segments)
+
+        candidates = [list(spans) for spans in all_spans]
+        if not pieces:
+            return candidates, True
+        try:
+            with STAGE_LATENCY.labels(stage="ner").time(), TRACER.span("guardrail.ner", attributes={"segments": len(pieces)}):
+                ner_results = self.predict_batch([segment for _, _, segment in pieces])
+        except DeadlineExceeded:
+            # The caller has given up; a regex-only answer would go unread
+            raise
+        except Exception as e:
+            NER_FAILURES.labels(error=type(e).__name__).inc()
+            logger.error("NER inference failed for %d segments, serving regex/gazetteer spans only",
+                         len(pieces), exc_info=True)
+            return candidates, False
+
+        for (i, offset, _), entities in zip(pieces, ner_results):
+            for ent in entities:
+                label = ent['entity_group']
+                if label not in VALID_NER_LABELS:
+                    continue
+
+                # Conflict Check: Skip if entity overlaps with an existing Regex/Gazetteer tag
+                original_range = views[i].to_original(ent['start'] + offset, ent['end'] + offset)
+                if original_range is None:
+                    continue
+                candidates[i].append(Span(original_range[0], original_range[1], label, "NER Model"))
+        return candidates, True
+
+    @staticmethod
+    def _render(text: str, spans: List[Span], tier: str, cached: bool = False) -> dict:
+        """Masks the original text with resolved spans and builds the response fields."""
+        cleaned_text, vault, detected_entities = apply_spans(text, spans)
+        for ent in detected_entities:
+            ENTITIES.labels(label=ent["label"], source=ent["source"]).inc()
+        return {
+            "cleaned_text": cleaned_text,
+            "vault": vault,
+            "entities": detected_entities,
+            "tier": tier,
+            "cached": cached
+        }
@@ -1,31 +1,192 @@
+import hashlib
+import json
 import re
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    """
+    A detected PII region expressed against the original input text.
+
+    Spans only carry offsets and a label, never the matched value itself,
+    so they can be stored or logged without leaking PII.
+    """
+    start: int
+    end: int
+    label: str
+    source: str = "REGEX"
+
+    @property
+    def tag(self) -> str:
+        """The redaction tag used to mask this span (e.g. [REDACTED_NIK])."""
+        return f"[REDACTED_{self.label}]"
+
+
+# Built-in pattern set, used when no rules file (RULES_PATH) is configured.
+# Maps each pattern to its redaction tag; declaration order is match priority.
+DEFAULT_PATTERNS = {
+    # NIK: Exactly 16 digits
+    r'\b\d{16}\b': '[REDACTED_NIK]',
+
+    # Email: Standard email format validation
+    # (the lookbehind anchors the match at the start of a token so the scanner
+    # does not retry the local-part from every character inside long words)
+    r'(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}': '[REDACTED_EMAIL]',
+
+    # Phone: Indonesian prefixes (+62, 62, 08) followed by 8-12 digits
+    r'(?:\+62|62|0)8[1-9][0-9]{6,11}': '[REDACTED_PHONE]',
+
+    # Date of Birth: Format DD-MM-YYYY
+    r'\b\d{2}-\d{2}-\d{4}\b': '[REDACTED_BIRTHDATE]',
+
+    # Bank Account Number: 10 to 12 digits
+    # Numbers starting with '08' or '62' are phone numbers, not bank accounts
+    r'\b(?!08|62)\d{10,12}\b': '[REDACTED_BANK_NUM]'
+}
+
+_LABEL_RE = re.compile(r'[A-Z][A-Z0-9_]*')
+
+
+class RuleConfigError(ValueError):
+    """Raised when a rules file is malformed; carries every problem found."""
+    def __init__(self, path: str, problems: List[str]):
+        self.problems = problems
+        super().__init__(f"Invalid rules file {path}: " + "; ".join(problems))
+
 
 class RegexEngine:
     """
     Handles PII detection and masking using Regular Expressions.
-    
+
     This class defines specific patterns for structured data (like IDs, Emails, Phones)
-    and provides a mechanism to replace them with redacted tags while preserving
-    the original data in a secure vault.
+    and compiles them into a single scanner that finds every match in one
+    left-to-right pass over the text. Patterns come from `DEFAULT_PATTERNS`
+    or from a versioned rules file (see `from_file`). An engine is immutable
+    once built, so a new pattern set is rolled out by swapping in a new engine.
+
+    Priority Rules:
+        1. The leftmost match always wins.
+        2. When several patterns match at the same position, the one declared
+           first in `self.patterns` wins (NIK > EMAIL > PHONE > BIRTHDATE > BANK_NUM).
     """
-    def __init__(self):
-        """Initializes the engine with predefined regex patterns for Indonesian PII."""
-        self.patterns = {
-            # NIK: Exactly 16 digits
-            r'\b\d{16}\b': '[REDACTED_NIK]',
-            
-            # Email: Standard email format validation
-            r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}': '[REDACTED_EMAIL]',
-            
-            # Phone: Indonesian prefixes (+62, 62, 08) followed by 8-12 digits
-            r'(\+62|62|0)8[1-9][0-9]{6,11}': '[REDACTED_PHONE]',
-            
-            # Date of Birth: Format DD-MM-YYYY
-            r'\b\d{2}-\d{2}-\d{4}\b': '[REDACTED_BIRTHDATE]',
-            
-            # Bank Account Number: 10 to 12 digits
-            r'\b\d{10,12}\b': '[REDACTED_BANK_NUM]' 
-        }
+    def __init__(self, patterns: Optional[Dict[str, str]] = None, rules_version: str = "builtin"):
+        """
+        Initializes the engine with predefined regex patterns for Indonesian PII.
+
+        Args:
+            patterns (dict): Pattern -> redaction tag, in priority order (default `DEFAULT_PATTERNS`).
+            rules_version (str): Version declared by the rules file the patterns came from.
+        """
+        self.patterns = dict(patterns or DEFAULT_PATTERNS)
+        self.rules_version = rules_version
+        self.scanner = self._compile(self.patterns)
+        # Fingerprint of the active pattern set, used to invalidate cached results
+        self.version = hashlib.sha256(repr(list(self.patterns.items())).encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def from_file(cls, path: str) -> "RegexEngine":
+        """
+        Loads, validates and compiles a rules file.
+
+        The file is JSON: {"version": "...", "rules": [{"label": "NIK",
+        "pattern": "...", "examples": [...], "counter_examples": [...]}, ...]}.
+        Rules are in priority order. Every pattern must compile, contain no
+        named groups and never match the empty string; each example must be
+        matched whole under its rule's label, and no counter example may be
+        matched under it.
+
+        Raises:
+            RuleConfigError: Listing every problem found; nothing is loaded.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RuleConfigError(path, [str(e)])
+
+        problems = []
+        version = config.get("version") if isinstance(config, dict) else None
+        rules = config.get("rules") if isinstance(config, dict) else None
+        if not isinstance(version, str) or not version.strip():
+            problems.append("'version' must be a non-empty string")
+        if not isinstance(rules, list) or not rules:
+            raise RuleConfigError(path, problems + ["'rules' must be a non-empty list"])
+
+        patterns = {}
+        labels = set()
+        for i, rule in enumerate(rules):
+            if not isinstance(rule, dict):
+                problems.append(f"rule {i}: must be an object")
+                continue
+            label, pattern = rule.get("label"), rule.get("pattern")
+            where = f"rule {i} ({label})"
+            if not isinstance(label, str) or not _LABEL_RE.fullmatch(label):
+                problems.append(f"{where}: label must be UPPER_SNAKE_CASE")
+                continue
+            if label in labels:
+                problems.append(f"{where}: duplicate label")
+                continue
+            labels.add(label)
+            try:
+                compiled = re.compile(pattern)
+            except (TypeError, re.error) as e:
+                problems.append(f"{where}: pattern does not compile ({e})")
+                continue
+            if compiled.groupindex:
+                problems.append(f"{where}: named groups are not allowed")
+                continue
+            if compiled.search("") is not None:
+                problems.append(f"{where}: pattern matches the empty string")
+                continue
+            if pattern in patterns:
+                problems.append(f"{where}: same pattern as rule '{patterns[pattern]}'")
+                continue
+            patterns[pattern] = f"[REDACTED_{label}]"
+        if problems:
+            raise RuleConfigError(path, problems)
+
+        engine = cls(patterns, rules_version=version)
+        # Examples run against the combined scanner, so they also check priority between rules
+        for rule in rules:
+            for example in rule.get("examples", []):
+                spans = engine.scan(example)
+                if spans != [Span(0, len(example), rule["label"])]:
+                    problems.append(f"rule {rule['label']}: example not matched whole")
+            for example in rule.get("counter_examples", []):
+                if any(span.label == rule["label"] for span in engine.scan(example)):
+                    problems.append(f"rule {rule['label']}: counter example matched")
+        if problems:
+            raise RuleConfigError(path, problems)
+        return engine
+
+    @staticmethod
+    def _compile(patterns: dict):
+        """
+        Combines all patterns into one alternation of named groups.
+
+        Each group is named after the label of its tag, so the label of a match
+        is available directly through `match.lastgroup`.
+        """
+        alternatives = []
+        for pattern, tag in patterns.items():
+            label = tag.replace("[REDACTED_", "").replace("]", "")
+            alternatives.append(f"(?P<{label}>{pattern})")
+        return re.compile("|".join(alternatives))
+
+    def scan(self, text: str) -> List[Span]:
+        """
+        Finds all structured PII in a single pass.
+
+        Args:
+            text (str): The raw input text.
+
+        Returns:
+            List[Span]: Non-overlapping spans, ordered by start offset.
+        """
+        return [
+            Span(match.start(), match.end(), match.lastgroup)
+            for match in self.scanner.finditer(text)
+        ]
 
     def mask(self, text: str):
         """
@@ -36,28 +197,12 @@ class RegexEngine:
 
         Returns:
             str: The sanitized text with tags (e.g., [REDACTED_NIK]).
-            dict: The vault dictionary containing {tag: original_value} mappings.
-        """
-        vault = {}
-        masked_text = text
-
-        # Iterate through each PII pattern defined in the engine
-        for pattern, tag in self.patterns.items():
-            for match in re.finditer(pattern, masked_text):
-                original_word = match.group(0)
-                
-                # Logic: Conflict Resolution for Bank Numbers vs Phone Numbers
-                # If a detected Bank Number starts with '08' or '62', treat it as a Phone Number (skip)
-                if tag == '[REDACTED_BANK_NUM]' and (original_word.startswith("08") or original_word.startswith("62")):
-                    continue
-
-                # Store the original PII in the secure vault
-                vault[tag] = original_word
-                
-                # Replace the PII in the text with its corresponding tag
-                masked_text = masked_text.replace(original_word, tag)
-        
-        # Placeholder for final vault verification
-        final_vault = {}
-        
-        return masked_text
\ No newline at end of file
+        """
+        parts = []
+        cursor = 0
+        for span in self.scan(text):
+            parts.append(text[cursor:span.start])
+            parts.append(span.tag)
+            cursor = span.end
+        parts.append(text[cursor:])
+        return "".join(parts)
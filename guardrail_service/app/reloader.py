@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from .metrics import RELOAD_SECONDS, RELOADS
+from .regex_engine import RegexEngine, RuleConfigError
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadInProgress(Exception):
+    """Raised when a model reload is requested while another one is running."""
+
+
+class DetectionReloader:
+    """
+    Rolls out new detection rules and NER models without restarting the service.
+
+    Rules: when RULES_PATH is set, the file is loaded at startup and polled
+    every `poll_seconds`; a changed file is validated and compiled into a new
+    `RegexEngine` off the request path, then swapped into the pipeline with
+    one assignment. An invalid file is reported and the active rules stay.
+
+    Model: `reload_model` loads and warms up another model on a background
+    thread while the active one keeps serving, then swaps it in (see
+    `NEREngine.prepare`). With the worker pool enabled, a second pool is forked
+    from the new model and replaces the serving one once its workers are warm.
+    The model and the detection version change together (see
+    `GuardrailPipeline.swapping_ner`), so no result of the new model is cached
+    under the old version. Requests already running finish on the model they
+    started with.
+    """
+    def __init__(self, pipeline, ner_engine, ner_workers, ner_batcher, ner_version, rules_path: str = None,
+                 poll_seconds: float = None, ready_timeout: float = None):
+        """
+        Args:
+            pipeline (GuardrailPipeline): Pipeline whose regex engine and NER version are swapped.
+            ner_engine (NEREngine): Engine that loads and swaps models.
+            ner_workers (NERWorkerPool): Serving worker pool; replaced by a respawned
+                pool on model reload when enabled (`self.ner_workers` is the current one).
+            ner_batcher (NERBatcher): Scheduler whose engine is switched to the new pool.
+            ner_version (Callable[[], str]): Builds the NER part of the detection version.
+            rules_path (str): Rules file (RULES_PATH); unset keeps the built-in patterns.
+            poll_seconds (float): Seconds between checks of the rules file for changes.
+            ready_timeout (float): Seconds a respawned pool may take to warm up.
+        """
+        self.pipeline = pipeline
+        self.ner_engine = ner_engine
+        self.ner_workers = ner_workers
+        self.ner_batcher = ner_batcher
+        self.ner_version = ner_version
+        self.rules_path = rules_path if rules_path is not None else os.getenv("RULES_PATH", "")
+        self.poll_seconds = poll_seconds or float(os.getenv("RULES_POLL_SECONDS", "10"))
+        self.ready_timeout = ready_timeout or float(os.getenv("NER_WORKER_READY_TIMEOUT", "300"))
+
+        self.status = {
+            "rules": {"state": "idle", "error": None, "at": None},
+            "model": {"state": "idle", "error": None, "at": None},
+        }
+        self._rules_stat = None
+        self._model_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def load_rules(self):
+        """
+        Loads the rules file once, before serving.
+
+        Raises:
+            RuleConfigError: If the file is invalid; the service should not start with it.
+        """
+        if self.rules_path:
+            self._rules_stat = self._stat()
+            self._swap_rules(RegexEngine.from_file(self.rules_path), None)
+
+    def start(self):
+        """Starts polling the rules file (no-op without RULES_PATH)."""
+        if self.rules_path and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="rules-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reload_rules(self) -> dict:
+        """
+        Validates and swaps in the rules file now.
+
+        Returns:
+            dict: The active versions.
+
+        Raises:
+            RuleConfigError: If the file is invalid; the active rules are kept.
+        """
+        if not self.rules_path:
+            raise RuleConfigError("(none)", ["RULES_PATH is not set"])
+        start = time.perf_counter()
+        self._rules_stat = self._stat()
+        try:
+            engine = RegexEngine.from_file(self.rules_path)
+        except RuleConfigError as e:
+            RELOADS.labels(component="rules", result="invalid").inc()
+            self.status["rules"] = {"state": "invalid", "error": str(e), "at": time.time()}
+            logger.error("Rules reload rejected, keeping %s: %s", self.pipeline.regex_engine.rules_version, e)
+            raise
+        self._swap_rules(engine, time.perf_counter() - start)
+        return self.versions()
+
+    def reload_model(self, model_name: str, backend: Optional[str] = None):
+        """
+        Starts loading `model_name` in the background and returns immediately.
+
+        Raises:
+            ReloadInProgress: If another model reload is still running.
+        """
+        if not self._model_lock.acquire(blocking=False):
+            raise ReloadInProgress("A model reload is already running")
+        self.status["model"] = {"state": "loading", "error": None, "at": time.time(), "target": model_name}
+        threading.Thread(target=self._reload_model, args=(model_name, backend),
+                         name="model-reload", daemon=True).start()
+
+    def versions(self) -> dict:
+        """Active rules, model and gazetteer versions, as reported on /health."""
+        regex_engine = self.pipeline.regex_engine
+        return {
+            "rules": {
+                "version": regex_engine.rules_version,
+                "fingerprint": regex_engine.version,
+                "source": self.rules_path or "builtin",
+            },
+            "model": {
+                "name": self.ner_engine.model_name,
+                "backend": self.ner_engine.backend,
+                "revision": self.ner_engine.revision,
+                "loaded_at": self.ner_engine.loaded_at,
+            },
+            "gazetteer": self.pipeline.gazetteer.version if self.pipeline.gazetteer else None,
+            "detection": self.pipeline.version,
+        }
+
+    def _reload_model(self, model_name: str, backend: Optional[str]):
+        start = time.perf_counter()
+        try:
+            pooled = self.ner_workers.enabled
+            # Forked workers warm up their own copy
+            nlp, timings = self.ner_engine.prepare(model_name, backend, warm=not pooled)
+            old_pool = self.ner_workers
+            new_pool = old_pool.respawn(nlp, self.ready_timeout) if pooled else None
+            with self.pipeline.swapping_ner():
+                if pooled:
+                    self.ner_batcher.engine = new_pool
+                self.ner_engine.activate(nlp, model_name, backend)
+                self.pipeline.ner_version = self.ner_version()
+            if pooled:
+                self.ner_workers = new_pool
+                old_pool.stop()
+            RELOADS.labels(component="model", result="ok").inc()
+            RELOAD_SECONDS.labels(component="model").set(round(time.perf_counter() - start, 3))
+            self.status["model"] = {"state": "ok", "error": None, "at": time.time(), "timings": timings}
+        except Exception as e:
+            RELOADS.labels(component="model", result="failed").inc()
+            self.status["model"] = {"state": "failed", "error": repr(e), "at": time.time(), "target": model_name}
+            logger.exception("Model reload failed, keeping %s", self.ner_engine.model_name)
+        finally:
+            self._model_lock.release()
+
+    def _swap_rules(self, engine: RegexEngine, elapsed: Optional[float]):
+        """Makes `engine` active; `elapsed` is None for the initial load (not a reload)."""
+        self.pipeline.regex_engine = engine
+        if elapsed is not None:
+            RELOADS.labels(component="rules", result="ok").inc()
+            RELOAD_SECONDS.labels(component="rules").set(round(elapsed, 3))
+        self.status["rules"] = {"state": "ok", "error": None, "at": time.time()}
+        logger.info("Detection rules %s active (%d patterns, %s)", engine.rules_version, len(engine.patterns), engine.version)
+
+    def _stat(self):
+        """Identity of the rules file; a ConfigMap update replaces the file, changing it."""
+        try:
+            st = os.stat(self.rules_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            stat = self._stat()
+            if stat is None or stat == self._rules_stat:
+                continue
+            try:
+                self.reload_rules()
+            except RuleConfigError:
+                pass
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from typing import Optional
+from .metrics import TIER_COMPUTE_LATENCY, TIER_REQUESTS
+
+# Detection tiers, cheapest first:
+#   regex - structured PII only (NIK, email, phone, birth date, bank account)
+#   fast  - regex + gazetteer of known customer names/addresses
+#   full  - regex + gazetteer + NER model (names/addresses in free text)
+TIERS = ("regex", "fast", "full")
+
+
+def lowest(tiers) -> str:
+    """The cheapest of the given tiers (e.g. what a request effectively ran at)."""
+    return min(tiers, key=TIERS.index)
+
+
+class TierSelector:
+    """
+    Picks the detection tier that fits a request's latency budget.
+
+    Keeps an exponentially weighted moving average of the compute time of
+    each tier, and estimates the admission wait of the model tier from the
+    live queue. A request asks for a tier (default full) and optionally a
+    latency budget; when the estimate for that tier exceeds the budget, the
+    most thorough cheaper tier that fits is used instead. Requests without a
+    budget always get the tier they asked for.
+
+    While every request is being downgraded the model tier's average is not
+    refreshed, so one budgeted request is let through as a probe every
+    `probe_seconds` to re-measure it.
+    """
+    def __init__(self, admission, alpha: float = None, probe_seconds: float = None):
+        """
+        Args:
+            admission (AdmissionController): Source of the current queue length and slot count.
+            alpha (float): EWMA weight of the newest observation.
+            probe_seconds (float): Longest time without a model-tier measurement.
+        """
+        self.admission = admission
+        self.alpha = alpha or float(os.getenv("TIER_EWMA_ALPHA", "0.2"))
+        self.probe_seconds = probe_seconds or float(os.getenv("TIER_PROBE_SECONDS", "5"))
+        self._compute = {tier: 0.0 for tier in TIERS}
+        self._last_full = time.monotonic()
+        self._lock = threading.Lock()
+
+    def estimate(self, tier: str) -> float:
+        """Expected seconds for a request of `tier` arriving now."""
+        if tier != "full":
+            return self._compute[tier]
+        # Once all slots are busy, queued requests are served `max_concurrent` at a time
+        wait = 0.0
+        if self.admission.inflight >= self.admission.max_concurrent:
+            wait = (self.admission.queued + 1) * self._compute["full"] / self.admission.max_concurrent
+        return wait + self._compute["full"]
+
+    def choose(self, tier: Optional[str], budget_ms: Optional[float]) -> str:
+        """
+        Returns the tier to run for a request.
+
+        Args:
+            tier (str): Requested tier (default 'full').
+            budget_ms (float): Latency budget in milliseconds, or None for no downgrade.
+        """
+        tier = tier or "full"
+        if budget_ms is None:
+            return tier
+        budget = budget_ms / 1000
+        candidates = TIERS[:TIERS.index(tier) + 1]
+        for candidate in reversed(candidates):
+            fits = self.estimate(candidate) <= budget
+            if candidate == "full":
+                # A full queue would reject the model tier outright
+                if self.admission.full:
+                    continue
+                fits = fits or self._probe_due()
+            if fits:
+                return candidate
+        return TIERS[0]
+
+    def _probe_due(self) -> bool:
+        """True (once) when the model tier has not been measured for `probe_seconds`."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_full < self.probe_seconds:
+                return False
+            self._last_full = now
+            return True
+
+    def observe(self, requested: str, served: str, compute_seconds: Optional[float]):
+        """
+        Counts the request and updates the compute average of the tier that ran.
+
+        Args:
+            requested (str): Tier the request asked for.
+            served (str): Tier it effectively ran at.
+            compute_seconds (float): Per-text compute time of `served`, or None when
+                it is not a measurement of that tier (cache hits, NER failures).
+        """
+        TIER_REQUESTS.labels(requested=requested, served=served).inc()
+        if compute_seconds is None:
+            return
+        with self._lock:
+            self._compute[served] += self.alpha * (compute_seconds - self._compute[served])
+            if served == "full":
+                self._last_full = time.monotonic()
+        TIER_COMPUTE_LATENCY.labels(tier=served).observe(compute_seconds)
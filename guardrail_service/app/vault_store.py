@@ -0,0 +1,162 @@
+import abc
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .metrics import VAULT_ENTRIES, VAULT_OPERATIONS
+
+
+def new_vault_ref() -> str:
+    """Unguessable reference to a stored vault (it grants access to the PII behind it)."""
+    return "vault_" + secrets.token_urlsafe(18)
+
+
+class VaultStore(abc.ABC):
+    """
+    TTL-bound server-side storage of vaults (tag -> original value).
+
+    Callers receive a compact `vault_ref` instead of the PII itself and resolve
+    only the tags they need, when they need them (e.g. inside a tool call).
+    """
+    @abc.abstractmethod
+    def put(self, vault: Dict[str, str]) -> str:
+        """Stores a vault and returns its reference."""
+
+    @abc.abstractmethod
+    def resolve(self, vault_ref: str, tags: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Returns the requested tags of a vault.
+
+        Returns:
+            dict: {tag: value} for the tags present in the vault, or None if the
+                  reference is unknown or expired.
+        """
+
+    @abc.abstractmethod
+    def delete(self, vault_ref: str):
+        """Removes a vault (no-op for unknown references)."""
+
+
+class InMemoryVaultStore(VaultStore):
+    """
+    In-process vault store with TTL expiry and a bound on the number of entries.
+
+    Entries are kept in insertion order, so expired and overflow entries are
+    always at the front and eviction is O(1) per entry.
+    """
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds or float(os.getenv("VAULT_TTL_SECONDS", "900"))
+        self.max_entries = max_entries or int(os.getenv("VAULT_MAX_ENTRIES", "100000"))
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        VAULT_ENTRIES.set_function(lambda: len(self._entries))
+
+    def put(self, vault: Dict[str, str]) -> str:
+        vault_ref = new_vault_ref()
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                VAULT_OPERATIONS.labels(op="evict", result="capacity").inc()
+            self._entries[vault_ref] = (now + self.ttl_seconds, dict(vault))
+        VAULT_OPERATIONS.labels(op="put", result="ok").inc()
+        return vault_ref
+
+    def resolve(self, vault_ref: str, tags: List[str]) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(vault_ref)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[vault_ref]
+                entry = None
+        if entry is None:
+            VAULT_OPERATIONS.labels(op="resolve", result="miss").inc()
+            return None
+        VAULT_OPERATIONS.labels(op="resolve", result="hit").inc()
+        return {tag: entry[1][tag] for tag in tags if tag in entry[1]}
+
+    def delete(self, vault_ref: str):
+        with self._lock:
+            self._entries.pop(vault_ref, None)
+
+    def _expire(self, now: float):
+        """Drops expired entries from the front (caller holds the lock)."""
+        while self._entries:
+            vault_ref, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at >= now:
+                break
+            del self._entries[vault_ref]
+            VAULT_OPERATIONS.labels(op="evict", result="ttl").inc()
+
+
+class SQLiteVaultStore(VaultStore):
+    """
+    Local stand-in for a shared vault store (e.g. Redis), backed by a SQLite file.
+
+    Every guardrail process that opens the same file sees the same vaults, so
+    a reference issued by one process can be resolved by another.
+    """
+    def __init__(self, path: str = None, ttl_seconds: float = None):
+        self.path = path or os.getenv("VAULT_DB_PATH", "vault.db")
+        self.ttl_seconds = ttl_seconds or float(os.getenv("VAULT_TTL_SECONDS", "900"))
+        self._local = threading.local()
+        self._puts = 0
+        with self._db() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS vaults (ref TEXT PRIMARY KEY, expires_at REAL NOT NULL, data TEXT NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_vaults_expiry ON vaults (expires_at)")
+        VAULT_ENTRIES.set_function(self._count)
+
+    def _db(self) -> sqlite3.Connection:
+        """One connection per thread; used as a transaction context manager."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _count(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM vaults").fetchone()[0]
+
+    def put(self, vault: Dict[str, str]) -> str:
+        vault_ref = new_vault_ref()
+        now = time.time()
+        with self._db() as db:
+            db.execute("INSERT INTO vaults VALUES (?, ?, ?)", (vault_ref, now + self.ttl_seconds, json.dumps(vault)))
+            # Expired rows are purged every 100 writes instead of on every call
+            self._puts += 1
+            if self._puts % 100 == 0:
+                purged = db.execute("DELETE FROM vaults WHERE expires_at < ?", (now,)).rowcount
+                VAULT_OPERATIONS.labels(op="evict", result="ttl").inc(purged)
+        VAULT_OPERATIONS.labels(op="put", result="ok").inc()
+        return vault_ref
+
+    def resolve(self, vault_ref: str, tags: List[str]) -> Optional[Dict[str, str]]:
+        row = self._db().execute(
+            "SELECT data FROM vaults WHERE ref = ? AND expires_at >= ?", (vault_ref, time.time())
+        ).fetchone()
+        if row is None:
+            VAULT_OPERATIONS.labels(op="resolve", result="miss").inc()
+            return None
+        VAULT_OPERATIONS.labels(op="resolve", result="hit").inc()
+        vault = json.loads(row[0])
+        return {tag: vault[tag] for tag in tags if tag in vault}
+
+    def delete(self, vault_ref: str):
+        with self._db() as db:
+            db.execute("DELETE FROM vaults WHERE ref = ?", (vault_ref,))
+
+
+def build_vault_store(backend: str = None) -> VaultStore:
+    """Creates the vault store selected by VAULT_STORE (memory|sqlite)."""
+    backend = backend or os.getenv("VAULT_STORE", "memory")
+    if backend == "memory":
+        return InMemoryVaultStore()
+    if backend == "sqlite":
+        return SQLiteVaultStore()
+    raise ValueError(f"Unknown vault store '{backend}', expected 'memory' or 'sqlite'")
@@ -0,0 +1,404 @@
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import List
+import psutil
+from .metrics import (
+    NER_WORKER_BATCHES, NER_WORKER_BUSY_SECONDS, NER_WORKER_INFLIGHT, NER_WORKER_RESPAWNS, NER_WORKER_USS,
+    NER_WORKER_UTILIZATION
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(index: int, engine, nlp, tasks, results, threads: int):
+    """
+    Entry point of a forked inference worker.
+
+    The model (`nlp`) was loaded by the parent before the fork, so its weights
+    are shared copy-on-write; the worker only pins its own torch thread count
+    and runs its own warmup before reporting ready.
+    """
+    # Shutdown is driven by the parent (stop marker), not by terminal signals
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import torch
+    torch.set_num_threads(threads)
+
+    engine.nlp = nlp
+    engine.startup_timings = {}
+    engine.warmup()
+    results.put(("ready", index, engine.startup_timings, None))
+
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+        job_id, texts = job
+        start = time.perf_counter()
+        try:
+            entities, error = engine.predict_batch(texts), None
+        except Exception as e:
+            entities, error = None, repr(e)
+        results.put((job_id, index, entities, (error, time.perf_counter() - start)))
+
+
+class NERWorkerPool:
+    """
+    Pool of forked NER inference processes sharing one copy of the model.
+
+    The parent process loads the weights once and forks `num_workers` children,
+    which inherit them copy-on-write, so adding workers adds throughput without
+    adding a model copy per worker. Each worker runs with a fixed torch thread
+    count so workers do not oversubscribe the pod's CPUs.
+
+    Exposes `predict_batch(texts)` like `NEREngine`, so it can be placed behind
+    `NERBatcher`. Each batch goes to the worker with the fewest in-flight jobs.
+
+    Once the pool is ready, a worker that exits (crash, OOM kill) has its
+    in-flight jobs failed and is forked again from the same model; it takes
+    jobs again after its warmup. A worker that keeps dying is forked at most
+    once per `respawn_interval`.
+
+    A new model is rolled out by forking a second pool from it (`respawn`)
+    while this one keeps serving; the caller swaps pools once the new workers
+    are warm and then stops the old one.
+    """
+    def __init__(self, engine, num_workers: int = None, threads_per_worker: int = None,
+                 sample_interval: float = None, job_timeout: float = None, respawn_interval: float = None):
+        """
+        Args:
+            engine (NEREngine): Engine whose model is loaded in the parent and shared.
+            num_workers (int): Number of inference processes (0 = disabled, inference stays in-process).
+            threads_per_worker (int): torch intra-op threads per worker.
+            sample_interval (float): Seconds between utilization/memory samples.
+            job_timeout (float): Seconds `predict_batch` waits for a worker before giving up.
+            respawn_interval (float): Minimum seconds between two forks of the same worker.
+        """
+        self.engine = engine
+        self.num_workers = num_workers if num_workers is not None else int(os.getenv("NER_WORKERS", "0"))
+        self.threads_per_worker = threads_per_worker or int(os.getenv("NER_WORKER_THREADS", "1"))
+        self.sample_interval = sample_interval or float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "5"))
+        self.job_timeout = job_timeout or float(os.getenv("NER_WORKER_JOB_TIMEOUT", "30"))
+        self.respawn_interval = respawn_interval or float(os.getenv("NER_WORKER_RESPAWN_SECONDS", "5"))
+        # Dead workers are detected at least this often, independent of the sample interval
+        self.liveness_interval = min(1.0, self.sample_interval)
+
+        self._processes = []
+        self._tasks = []
+        self._nlp = None
+        self._stopping = False
+        self._results = None
+        self._receiver = None
+        self._ready = threading.Event()
+        self._ready_count = 0
+        self._worker_timings = []
+
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        # job_id -> (worker index, future)
+        self._pending = {}
+        self._inflight = []
+        self._busy = []
+        # Serving jobs: False while a worker is dead or warming up after a respawn
+        self._alive = []
+        self._last_fork = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.num_workers > 0
+
+    @property
+    def alive_workers(self) -> int:
+        """Number of workers currently taking jobs."""
+        return sum(self._alive)
+
+    def start(self):
+        """
+        Loads the model in the parent and forks the workers.
+
+        Must run before the process starts other threads (batcher, sampler):
+        only the forking thread survives in the children. Returns right after
+        the fork; workers warm up concurrently, see `wait_ready`.
+        """
+        if self._processes or not self.enabled:
+            return
+        import torch
+        # The parent never runs inference; a single thread keeps the OpenMP pool
+        # uninitialized so the forked children can create their own.
+        torch.set_num_threads(1)
+        fork_start = time.perf_counter()
+        self.engine.load_model()
+        self._fork(self.engine.nlp)
+        self.engine.startup_timings["fork"] = round(time.perf_counter() - fork_start, 3)
+
+    def respawn(self, nlp, ready_timeout: float = None) -> "NERWorkerPool":
+        """
+        Forks a new pool serving `nlp` and waits until its workers are warm.
+
+        Unlike `start`, this forks from a parent that is already serving (event
+        loop, batcher and receiver threads). That is safe enough here because
+        `nlp` has never run in the parent, so no inference thread pool or lock
+        it owns can be inherited mid-use, and a child that deadlocks or dies in
+        warmup fails the respawn (dead-worker check, `ready_timeout`) instead
+        of replacing the serving pool. Until the new pool is stopped the old
+        and new weights are both resident.
+
+        Args:
+            nlp: Pipeline built (and not warmed up) in the parent by `NEREngine.prepare`.
+            ready_timeout (float): Seconds to wait for the new workers (None = no limit).
+
+        Returns:
+            NERWorkerPool: The running new pool; this pool is left untouched.
+
+        Raises:
+            RuntimeError: If a new worker exited during warmup.
+            TimeoutError: If the new workers were not ready within `ready_timeout`.
+        """
+        pool = NERWorkerPool(self.engine, self.num_workers, self.threads_per_worker,
+                             self.sample_interval, self.job_timeout, self.respawn_interval)
+        pool._fork(nlp)
+        try:
+            if not pool._wait_workers(ready_timeout):
+                raise TimeoutError(f"New NER workers were not ready within {ready_timeout}s")
+        except BaseException:
+            pool.stop()
+            raise
+        return pool
+
+    def _fork(self, nlp):
+        """Forks the workers with `nlp` and starts the result receiver."""
+        # Move everything allocated so far out of the GC's reach, so collections in
+        # the children do not touch (and un-share) the parent's object pages.
+        gc.collect()
+        gc.freeze()
+
+        self._nlp = nlp
+        self._results = multiprocessing.get_context("fork").Queue()
+        self._tasks = [None] * self.num_workers
+        self._processes = [None] * self.num_workers
+        self._last_fork = [0.0] * self.num_workers
+        for index in range(self.num_workers):
+            self._spawn(index)
+        gc.unfreeze()
+
+        self._inflight = [0] * self.num_workers
+        self._busy = [0.0] * self.num_workers
+        self._alive = [True] * self.num_workers
+
+        self._receiver = threading.Thread(target=self._receive, name="ner-worker-results", daemon=True)
+        self._receiver.start()
+        logger.info("Forked %d NER workers (%d torch threads each)", self.num_workers, self.threads_per_worker)
+
+    def _spawn(self, index: int):
+        """Forks worker `index` with a fresh task queue."""
+        context = multiprocessing.get_context("fork")
+        if self._tasks[index] is not None:
+            # Nobody reads the dead worker's queue; do not wait on its feeder at exit
+            self._tasks[index].cancel_join_thread()
+            self._tasks[index].close()
+        tasks = context.Queue()
+        process = context.Process(
+            target=_worker_main,
+            args=(index, self.engine, self._nlp, tasks, self._results, self.threads_per_worker),
+            name=f"ner-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._tasks[index] = tasks
+        self._processes[index] = process
+        self._last_fork[index] = time.monotonic()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        Blocks until every worker finished its warmup, then marks the engine ready.
+
+        The slowest worker's timings are reported as the engine's warmup timings.
+
+        Args:
+            timeout (float): Seconds to wait (None = no limit).
+
+        Returns:
+            bool: False if the workers were not ready within `timeout`.
+
+        Raises:
+            RuntimeError: If a worker exited (e.g. crashed or was OOM-killed) during warmup.
+        """
+        if not self._wait_workers(timeout):
+            return False
+        slowest = max(self._worker_timings, key=lambda timings: timings.get("warmup", 0))
+        self.engine.startup_timings.update(slowest)
+        self.engine.ready = True
+        return True
+
+    def _wait_workers(self, timeout: float = None) -> bool:
+        """Waits for every worker's ready message; see `wait_ready`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready.wait(self.liveness_interval):
+            dead = [(index, process.exitcode) for index, process in enumerate(self._processes)
+                    if not process.is_alive()]
+            if dead:
+                raise RuntimeError("NER workers exited during warmup: " +
+                                   ", ".join(f"worker {index} (exit code {code})" for index, code in dead))
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def stop(self):
+        """Sends the stop marker to every worker and waits for them to exit (killing stuck ones)."""
+        if not self._processes:
+            return
+        # No respawns from here on; the process list no longer changes
+        with self._lock:
+            self._stopping = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._results.put(None)
+        self._receiver.join()
+        self._processes, self._tasks = [], []
+
+    def predict_batch(self, texts: List[str]) -> List[list]:
+        """
+        Runs one batch on the least busy worker and blocks until it returns.
+
+        Falls back to in-process inference when the pool is not running.
+        """
+        if not self._processes:
+            return self.engine.predict_batch(texts)
+        if not texts:
+            return []
+
+        future = Future()
+        with self._lock:
+            candidates = [i for i in range(self.num_workers) if self._alive[i]]
+            if not candidates:
+                raise RuntimeError("No NER worker is alive")
+            index = min(candidates, key=lambda i: self._inflight[i])
+            job_id = next(self._job_ids)
+            self._pending[job_id] = (index, future)
+            self._inflight[index] += 1
+            NER_WORKER_INFLIGHT.labels(worker=str(index)).set(self._inflight[index])
+        self._tasks[index].put((job_id, texts))
+        try:
+            return future.result(timeout=self.job_timeout)
+        except FutureTimeout:
+            # The worker is stuck; a late result is dropped by the receiver
+            with self._lock:
+                self._pending.pop(job_id, None)
+            raise TimeoutError(f"NER worker {index} did not answer within {self.job_timeout}s") from None
+
+    def _receive(self):
+        """Resolves futures from worker results, fails jobs of dead workers and samples utilization."""
+        last_sample = time.monotonic()
+        last_busy = [0.0] * self.num_workers
+        while True:
+            try:
+                message = self._results.get(timeout=self.liveness_interval)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                self._handle(message)
+            for index, process in enumerate(self._processes):
+                self._check_alive(index, process)
+
+            now = time.monotonic()
+            if now - last_sample >= self.sample_interval:
+                elapsed, last_sample = now - last_sample, now
+                for index, process in enumerate(self._processes):
+                    NER_WORKER_UTILIZATION.labels(worker=str(index)).set(
+                        round(min((self._busy[index] - last_busy[index]) / elapsed, 1.0), 3))
+                    last_busy[index] = self._busy[index]
+                    self._sample_memory(index, process)
+
+    def _handle(self, message):
+        job_id, index, payload, info = message
+        if job_id == "ready":
+            if self._ready.is_set():
+                # A respawned worker finished its warmup
+                with self._lock:
+                    self._alive[index] = True
+                logger.info("NER worker %d is back", index)
+                return
+            self._worker_timings.append(payload)
+            self._ready_count += 1
+            if self._ready_count == self.num_workers:
+                self._ready.set()
+            return
+
+        error, busy_seconds = info
+        with self._lock:
+            # None when the caller already gave up on this job
+            _, future = self._pending.pop(job_id, (index, None))
+            if self._alive[index]:
+                # Late results of jobs failed by a respawn were never counted
+                self._inflight[index] = max(self._inflight[index] - 1, 0)
+            self._busy[index] += busy_seconds
+            NER_WORKER_INFLIGHT.labels(worker=str(index)).set(self._inflight[index])
+        NER_WORKER_BATCHES.labels(worker=str(index)).inc()
+        NER_WORKER_BUSY_SECONDS.labels(worker=str(index)).inc(busy_seconds)
+        if future is None:
+            return
+        if error is None:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(f"NER worker {index} failed: {error}"))
+
+    def _sample_memory(self, index: int, process):
+        """Publishes a worker's private memory."""
+        if not process.is_alive():
+            return
+        try:
+            # USS: memory only this worker holds; shared (copy-on-write) weights are excluded
+            NER_WORKER_USS.labels(worker=str(index)).set(psutil.Process(process.pid).memory_full_info().uss)
+        except psutil.Error:
+            pass
+
+    def _check_alive(self, index: int, process):
+        """Fails a dead worker's pending jobs as soon as it is found, then forks it again."""
+        if process.is_alive():
+            return
+        if self._alive[index]:
+            logger.error("NER worker %d exited with code %s", index, process.exitcode)
+            with self._lock:
+                self._alive[index] = False
+                failed = [job_id for job_id, (owner, _) in self._pending.items() if owner == index]
+                futures = [self._pending.pop(job_id)[1] for job_id in failed]
+                self._inflight[index] = 0
+            for future in futures:
+                future.set_exception(RuntimeError(f"NER worker {index} exited"))
+        # Deaths during the initial warmup fail `wait_ready` instead
+        if self._ready.is_set() and time.monotonic() - self._last_fork[index] >= self.respawn_interval:
+            self._respawn(index)
+
+    def _respawn(self, index: int):
+        """
+        Forks a replacement for dead worker `index` from the pool's model.
+
+        Like `respawn`, this forks from the serving parent, which is safe for
+        the same reason: the parent never runs inference on the model. The
+        replacement takes jobs once it reports ready (see `_handle`).
+        """
+        gc.collect()
+        gc.freeze()
+        try:
+            with self._lock:
+                if self._stopping:
+                    return
+                self._spawn(index)
+        finally:
+            gc.unfreeze()
+        NER_WORKER_RESPAWNS.labels(worker=str(index)).inc()
+        logger.warning("Respawned NER worker %d", index)
@@ -2,13 +2,22 @@ import os
 from transformers import AutoTokenizer, AutoModelForTokenClassification
 
 model_name = "treamyracle/indobert-ner-pii-guardrail"
-save_directory = "./model_cache"
+# Dibaca oleh NEREngine saat startup (tanpa akses ke Hub)
+save_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
 
 print(f"Sedang mendownload model: {model_name}...")
 tokenizer = AutoTokenizer.from_pretrained(model_name)
 model = AutoModelForTokenClassification.from_pretrained(model_name)
 
 tokenizer.save_pretrained(save_directory)
-model.save_pretrained(save_directory)
+# Format safetensors agar bobot dapat di-memory-map saat load
+model.save_pretrained(save_directory, safe_serialization=True)
+
+# Opsional: export ke ONNX saat build agar NER_BACKEND=onnx tidak perlu export saat startup
+if os.getenv("NER_BACKEND") == "onnx":
+    from optimum.onnxruntime import ORTModelForTokenClassification
+
+    print("Sedang export model ke ONNX...")
+    ORTModelForTokenClassification.from_pretrained(save_directory, export=True).save_pretrained(save_directory)
 
 print("✅ Model berhasil didownload dan disimpan!")
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Parity check between the float32 reference model and an alternative NER backend.
+
+Runs both pipelines over a fixture set and compares the (entity_group, start, end)
+triples they produce, along with average inference latency and resident memory.
+Agreement is the Jaccard index of the two sets of triples (matched / union).
+
+Usage:
+    python parity_check.py --backend int8
+    python parity_check.py --backend onnx --model ./model_cache --min-agreement 0.95
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import psutil
+from app.ner_engine import BACKENDS, build_pipeline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ner_parity.jsonl")
+
+
+def load_fixtures(path: str):
+    """Reads the 'text' field of every line in a JSONL fixture file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def run(nlp, texts):
+    """Runs the pipeline text by text and returns (entity sets, average latency in ms)."""
+    nlp(texts[0])  # Warm-up call, excluded from timing
+    outputs = []
+    start = time.perf_counter()
+    for text in texts:
+        outputs.append({(e["entity_group"], e["start"], e["end"]) for e in nlp(text)})
+    latency_ms = (time.perf_counter() - start) * 1000 / len(texts)
+    return outputs, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], required=True)
+    parser.add_argument("--model", default=os.getenv("MODEL_NAME", "treamyracle/indobert-ner-pii-guardrail"))
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Minimum agreement: entities both backends produce exactly, over all entities "
+                             "either produces (Jaccard), so missed and extra entities both count")
+    args = parser.parse_args()
+    # Model loading and pipeline messages come from the app loggers
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)s %(name)s: %(message)s")
+
+    texts = load_fixtures(args.fixtures)
+    process = psutil.Process(os.getpid())
+
+    rss_before = process.memory_info().rss
+    reference = build_pipeline(args.model, "torch")
+    rss_reference = process.memory_info().rss - rss_before
+    expected, reference_ms = run(reference, texts)
+    del reference
+
+    rss_before = process.memory_info().rss
+    candidate = build_pipeline(args.model, args.backend)
+    rss_candidate = process.memory_info().rss - rss_before
+    actual, candidate_ms = run(candidate, texts)
+
+    matched = total = 0
+    for text, exp, act in zip(texts, expected, actual):
+        matched += len(exp & act)
+        total += len(exp | act)
+        if exp != act:
+            print(f"⚠️ Mismatch: {text[:60]!r}")
+            print(f"   torch: {sorted(exp)}")
+            print(f"   {args.backend}: {sorted(act)}")
+
+    agreement = matched / total if total else 1.0
+    print(f"📊 Agreement: {agreement:.2%} ({matched} matched / {total} entities from either backend)")
+    print(f"⏱️ Latency: torch {reference_ms:.1f} ms, {args.backend} {candidate_ms:.1f} ms "
+          f"({reference_ms / candidate_ms:.2f}x)")
+    print(f"💾 Model RSS: torch {rss_reference / 1024 / 1024:.0f} MB, "
+          f"{args.backend} {rss_candidate / 1024 / 1024:.0f} MB")
+
+    if agreement < args.min_agreement:
+        print(f"❌ Parity check failed (< {args.min_agreement:.0%}).")
+        sys.exit(1)
+    print("✅ Parity check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Offline bulk redaction of JSONL/CSV files with the guardrail pipeline.
+
+Streams the input record by record, sends chunks of records to a pool of
+forked worker processes (which share the NER model copy-on-write), and writes
+redacted records to the output in input order. Memory stays bounded by the
+number of chunks in flight, not by the size of the input.
+
+A checkpoint file records how far the output is complete; re-running the same
+command resumes from there. Throughput (records/second) is reported as it runs.
+
+JSONL lines that are not valid JSON objects, and records the NER model failed
+on (which would otherwise be written with regex/gazetteer masking only), are
+left out of the output and listed, by input byte offset (JSONL) or row number
+(CSV) and error (never their content), in an error sidecar
+(`<output>.errors.jsonl` by default); the run continues.
+
+Usage:
+    python redact.py chats.jsonl chats.redacted.jsonl --field text --workers 4
+    python redact.py export.csv export.redacted.csv --field message --field notes --no-ner
+    python redact.py chats.jsonl out.jsonl --field text --checkpoint out.ckpt   # resumable
+    python redact.py chats.jsonl out.jsonl --field text --errors bad_lines.jsonl
+"""
+import argparse
+import csv
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Any, Iterator, List, Tuple
+
+# Stage spans are not useful offline and would start a trace per batch
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+# shared/ sits next to this script in the image and one level up in the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.gate import NERGate
+from app.gazetteer import GazetteerEngine
+from app.ner_engine import NEREngine
+from app.pipeline import GuardrailPipeline
+from app.regex_engine import RegexEngine
+
+# Pipeline used by the current process; built in the parent and inherited by forked workers
+_PIPELINE = None
+
+
+def detect_format(path: str, fmt: str = None) -> str:
+    """Returns 'jsonl' or 'csv', from `fmt` or the file extension."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"Unknown format '{fmt}', expected 'jsonl' or 'csv'")
+    return fmt
+
+
+def read_jsonl(path: str, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields (byte offset after the record, raw line) for every line from `offset` on.
+
+    Read in binary so the offset is exact and resuming can seek straight to it.
+    Lines are parsed by the workers, not here.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                yield offset, line
+
+
+def read_csv(path: str, skip: int = 0) -> Iterator[Tuple[int, dict]]:
+    """Yields (records read so far, row) for every row after the first `skip` rows."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for count, row in enumerate(csv.DictReader(f), start=1):
+            if count > skip:
+                yield count, row
+
+
+def chunked(records: Iterator[Tuple[int, Any]], size: int) -> Iterator[List[Tuple[int, Any]]]:
+    """Groups a record stream into lists of at most `size` records."""
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bucketed(predict_batch, batch_size: int):
+    """
+    Wraps `predict_batch` so a large list of texts runs as length-sorted batches
+    of `batch_size`, keeping padding per forward pass small.
+    """
+    def run(texts: List[str]) -> List[list]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            group = order[start:start + batch_size]
+            for i, entities in zip(group, predict_batch([texts[i] for i in group])):
+                results[i] = entities
+        return results
+    return run
+
+
+def build_pipeline(use_ner: bool, ner_batch_size: int) -> GuardrailPipeline:
+    """Regex (RULES_PATH) + gazetteer (GAZETTEER_PATH) + gated NER, without the request-time cache."""
+    if use_ner:
+        engine = NEREngine()
+        engine.load_model()
+        predict_batch = bucketed(engine.predict_batch, ner_batch_size)
+    else:
+        predict_batch = lambda texts: [[] for _ in texts]
+    rules_path = os.getenv("RULES_PATH")
+    return GuardrailPipeline(
+        RegexEngine.from_file(rules_path) if rules_path else RegexEngine(),
+        predict_batch,
+        gate=NERGate() if use_ner else None,
+        gazetteer=GazetteerEngine()
+    )
+
+
+def _init_worker(threads: int):
+    """Pins the torch thread count of a forked worker; Ctrl-C is handled by the parent."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def parse_jsonl(lines: List[bytes]) -> Tuple[list, List[Tuple[int, str]]]:
+    """
+    Parses raw JSONL lines, skipping the ones that are not JSON objects.
+
+    Returns:
+        list: The parsed records.
+        List[Tuple[int, str]]: (index in `lines`, error) for every skipped line.
+    """
+    records, errors = [], []
+    for index, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            # JSONDecodeError/UnicodeDecodeError messages carry positions, not content
+            errors.append((index, f"{type(e).__name__}: {e}"))
+            continue
+        if not isinstance(record, dict):
+            errors.append((index, f"expected a JSON object, got {type(record).__name__}"))
+            continue
+        records.append(record)
+    return records, errors
+
+
+def redact_chunk(records: list, fields: List[str], fmt: str) -> Tuple[list, List[Tuple[int, str]]]:
+    """
+    Redacts `fields` of a chunk of records with the process's pipeline (runs in the workers).
+
+    JSONL records arrive as raw lines and leave as serialized lines, so parsing
+    and encoding are spread over the workers too. CSV rows are dicts both ways.
+    All texts of the chunk go through the pipeline together, so NER runs batched.
+
+    Returns:
+        list: The redacted records.
+        List[Tuple[int, str]]: (index in the chunk, error) for the records left out:
+            malformed JSONL lines, and records whose NER inference failed.
+    """
+    errors = []
+    if fmt == "jsonl":
+        records, errors = parse_jsonl(records)
+        malformed = {index for index, _ in errors}
+        indices = [index for index in range(len(records) + len(errors)) if index not in malformed]
+    else:
+        indices = list(range(len(records)))
+
+    slots = [(i, field) for i, record in enumerate(records) for field in fields if record.get(field) is not None]
+    results = _PIPELINE.clean_many([str(records[i][field]) for i, field in slots])
+    # The pipeline falls back to regex/gazetteer spans when NER fails; names would go out unmasked
+    unredacted = set()
+    for (i, field), result in zip(slots, results):
+        if result["tier"] != "full":
+            unredacted.add(i)
+        records[i][field] = result["cleaned_text"]
+    if unredacted:
+        errors = sorted(errors + [(indices[i], "NER inference failed, record not redacted") for i in unredacted])
+        records = [record for i, record in enumerate(records) if i not in unredacted]
+
+    if fmt == "jsonl":
+        return [json.dumps(record, ensure_ascii=False) + "\n" for record in records], errors
+    return records, errors
+
+
+class Checkpoint:
+    """
+    Progress marker written next to the output.
+
+    Holds the input position (byte offset for JSONL, record count for CSV),
+    the number of records read, and the output and error sidecar sizes at that
+    point, always as of the end of a fully written chunk. A resumed run
+    truncates any partially written tail and continues.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.state = {"position": 0, "records": 0, "output_bytes": 0, "errors": 0, "error_bytes": 0}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state.update(json.load(f))
+
+    def save(self, position: int, records: int, output_bytes: int, errors: int = 0, error_bytes: int = 0):
+        if not self.path:
+            return
+        self.state = {"position": position, "records": records, "output_bytes": output_bytes,
+                      "errors": errors, "error_bytes": error_bytes}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def main():
+    global _PIPELINE
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--field", action="append", required=True, help="Field/column to redact (repeatable)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input/output format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 = in-process)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch threads per worker")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per task sent to a worker")
+    parser.add_argument("--ner-batch-size", type=int, default=32, help="Texts per NER forward pass")
+    parser.add_argument("--no-ner", action="store_true", help="Regex and gazetteer only (names/addresses not found by NER)")
+    parser.add_argument("--checkpoint", help="Checkpoint file; resumes from it if it exists")
+    parser.add_argument("--errors", help="Sidecar for skipped records (default: <output>.errors.jsonl)")
+    parser.add_argument("--checkpoint-every", type=int, default=20, help="Chunks between checkpoint writes")
+    parser.add_argument("--progress-seconds", type=float, default=10, help="Seconds between progress lines")
+    args = parser.parse_args()
+    # Model loading and pipeline messages come from the app loggers
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)s %(name)s: %(message)s")
+
+    fmt = detect_format(args.input, args.format)
+    checkpoint = Checkpoint(args.checkpoint)
+    resumed = checkpoint.state["records"]
+
+    # The model is loaded once here; forked workers share its weights copy-on-write
+    _PIPELINE = build_pipeline(not args.no_ner, args.ner_batch_size)
+
+    if fmt == "jsonl":
+        records = read_jsonl(args.input, checkpoint.state["position"])
+    else:
+        records = read_csv(args.input, checkpoint.state["position"])
+    chunks = chunked(records, args.chunk_size)
+
+    # Drop output written after the last checkpoint, then append
+    mode = "r+" if resumed and os.path.exists(args.output) else "w"
+    out = open(args.output, mode, newline="", encoding="utf-8")
+    out.seek(checkpoint.state["output_bytes"] if mode == "r+" else 0)
+    out.truncate()
+    writer = None
+    if resumed:
+        print(f"⏩ Resuming after {resumed} records")
+
+    # Created on the first skipped record; on resume, entries after the checkpoint are dropped
+    errors_path = args.errors or args.output + ".errors.jsonl"
+    errors_out = None
+    if resumed and os.path.exists(errors_path):
+        errors_out = open(errors_path, "r+", encoding="utf-8")
+        errors_out.seek(checkpoint.state["error_bytes"])
+        errors_out.truncate()
+
+    pool = None
+    if args.workers > 0:
+        # Keep the GC in the children from touching (and un-sharing) the parent's pages
+        gc.collect()
+        gc.freeze()
+        pool = multiprocessing.get_context("fork").Pool(
+            args.workers, initializer=_init_worker, initargs=(args.threads_per_worker,))
+
+    def submit(chunk):
+        task = ([record for _, record in chunk], args.field, fmt)
+        # Locates skipped records in the input: byte offset where a JSONL line starts, CSV row number
+        if fmt == "jsonl":
+            locations = [{"offset": position - len(record)} for position, record in chunk]
+        else:
+            locations = [{"row": count} for count, _ in chunk]
+        if pool is None:
+            return chunk[-1][0], len(chunk), locations, redact_chunk(*task)
+        return chunk[-1][0], len(chunk), locations, pool.apply_async(redact_chunk, task)
+
+    # Chunks in flight, oldest first: results are written strictly in input order
+    window = deque()
+    max_in_flight = max(args.workers, 1) * 2
+    # Records read from the input (written to the output or skipped)
+    read = resumed
+    resumed_errors = errors = checkpoint.state["errors"]
+    position = checkpoint.state["position"]
+    start = last_report = time.perf_counter()
+    chunks_done = 0
+    # Checkpoint state as of the last fully written chunk. An interruption can leave
+    # part of the next chunk in the files; resuming truncates it and redoes that chunk.
+    boundary = (position, read, checkpoint.state["output_bytes"], errors, checkpoint.state["error_bytes"])
+
+    def save_checkpoint():
+        for f in (out, errors_out):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+        checkpoint.save(*boundary)
+
+    def drain(limit: int):
+        nonlocal read, errors, errors_out, position, chunks_done, last_report, writer, boundary
+        while len(window) > limit:
+            chunk_position, count, locations, result = window.popleft()
+            redacted, chunk_errors = result if pool is None else result.get()
+            if chunk_errors:
+                if errors_out is None:
+                    errors_out = open(errors_path, "w", encoding="utf-8")
+                errors_out.write("".join(json.dumps({**locations[index], "error": error}) + "\n"
+                                         for index, error in chunk_errors))
+                errors += len(chunk_errors)
+            if fmt == "jsonl":
+                out.write("".join(redacted))
+            elif redacted:
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(redacted[0].keys()))
+                    # Not on resume, unless every record so far was skipped
+                    if out.tell() == 0:
+                        writer.writeheader()
+                writer.writerows(redacted)
+            position = chunk_position
+            read += count
+            chunks_done += 1
+            boundary = (position, read, out.tell(), errors, errors_out.tell() if errors_out else 0)
+
+            if chunks_done % args.checkpoint_every == 0:
+                save_checkpoint()
+            now = time.perf_counter()
+            if now - last_report >= args.progress_seconds:
+                last_report = now
+                rate = (read - resumed) / (now - start)
+                print(f"📈 {read} records, {rate:,.0f} records/s")
+
+    try:
+        for chunk in chunks:
+            window.append(submit(chunk))
+            drain(max_in_flight)
+        drain(0)
+        if pool is not None:
+            pool.close()
+    finally:
+        # On interruption, chunks in flight are discarded; they are redone on resume
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        save_checkpoint()
+        out.close()
+        if errors_out is not None:
+            errors_out.close()
+
+    elapsed = time.perf_counter() - start
+    # Skipped records are read but not written
+    processed = (read - resumed) - (errors - resumed_errors)
+    print(f"✅ Redacted {processed} records in {elapsed:.1f}s "
+          f"({(read - resumed) / elapsed if elapsed else 0:,.0f} records/s), {read - errors} total in {args.output}")
+    if errors:
+        print(f"⚠️ {errors} records skipped (malformed, or NER failed), listed in {errors_path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
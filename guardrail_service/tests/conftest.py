@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Tests import the service as `app`, like uvicorn does from this directory;
+# shared/ is importable from the repository root, as from /app in the image
+sys.path.insert(0, os.path.join(ROOT, "guardrail_service"))
+sys.path.insert(0, ROOT)
+# No trace files from test runs
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
@@ -0,0 +1,106 @@
+import threading
+import time
+import pytest
+from app.admission import AdmissionController, DeadlineExceeded, Overloaded, current_deadline
+
+
+def later(seconds=5.0):
+    return time.monotonic() + seconds
+
+
+def hold(controller, count):
+    """Occupies `count` slots from background threads until the returned event is set."""
+    entered, release = threading.Barrier(count + 1), threading.Event()
+
+    def run():
+        with controller.admit(later(), "/test"):
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    entered.wait(timeout=5)
+    return release, threads
+
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_counts_inflight_and_sets_deadline():
+    controller = AdmissionController(max_concurrent=2, max_queue=1)
+    deadline = later()
+    assert current_deadline.get() is None
+    with controller.admit(deadline, "/test") as admission:
+        assert controller.inflight == 1 and controller.queued == 0
+        assert current_deadline.get() == deadline
+        assert admission.wait_seconds >= 0
+    assert controller.inflight == 0
+    assert current_deadline.get() is None
+
+
+def test_rejects_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    release, threads = hold(controller, 1)
+
+    def queue_one():
+        with controller.admit(later(), "/test"):
+            pass
+
+    waiter = threading.Thread(target=queue_one)
+    waiter.start()
+    wait_for(lambda: controller.queued == 1)
+    assert controller.full
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded):
+        with controller.admit(later(), "/test"):
+            pass
+    # Rejected immediately rather than after waiting for a slot
+    assert time.monotonic() - started < 1
+
+    release.set()
+    for thread in threads + [waiter]:
+        thread.join(timeout=5)
+    assert controller.inflight == 0 and controller.queued == 0
+    assert not controller.full
+
+
+def test_deadline_passes_while_waiting():
+    controller = AdmissionController(max_concurrent=1, max_queue=4)
+    release, threads = hold(controller, 1)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(later(0.05), "/test"):
+            pass
+    assert 0.04 <= time.monotonic() - started < 1
+    assert controller.queued == 0 and controller.inflight == 1
+
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    # The slot is usable again once released
+    with controller.admit(later(), "/test"):
+        assert controller.inflight == 1
+
+
+def test_expired_deadline_is_rejected_without_waiting():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit(time.monotonic() - 1, "/test"):
+            pass
+    assert controller.inflight == 0 and controller.queued == 0
+
+
+def test_deadline_from_header():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, default_timeout_ms=2000)
+    now = time.monotonic()
+    assert controller.deadline_from_header("500") - now == pytest.approx(0.5, abs=0.05)
+    assert controller.deadline_from_header(None) - now == pytest.approx(2.0, abs=0.05)
+    assert controller.deadline_from_header("soon") - now == pytest.approx(2.0, abs=0.05)
+    assert controller.deadline_from_header("-100") - now == pytest.approx(0.0, abs=0.05)
@@ -0,0 +1,113 @@
+import threading
+import time
+import pytest
+from app.admission import DeadlineExceeded, current_deadline
+from app.batcher import NERBatcher
+
+
+class RecordingEngine:
+    """Echoes every text back as its only entity and records the batches it ran."""
+    def __init__(self, error: Exception = None):
+        self.batches = []
+        self.error = error
+
+    def predict_batch(self, texts):
+        self.batches.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        return [[text] for text in texts]
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(engine, **kwargs):
+        settings = dict(max_batch_size=16, window_ms=200, bucket_chars=128)
+        settings.update(kwargs)
+        batcher = NERBatcher(engine, **settings)
+        batcher.start()
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.stop()
+
+
+def _submit_concurrently(batcher, texts):
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def submit(i):
+        barrier.wait()
+        results[i] = batcher.submit(texts[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_share_one_batch(make_batcher):
+    engine = RecordingEngine()
+    batcher = make_batcher(engine)
+    texts = [f"teks {i}" for i in range(6)]
+    assert _submit_concurrently(batcher, texts) == [[text] for text in texts]
+    assert len(engine.batches) == 1
+    assert sorted(engine.batches[0]) == sorted(texts)
+
+
+def test_window_flushes_a_lone_request(make_batcher):
+    engine = RecordingEngine()
+    batcher = make_batcher(engine, window_ms=50)
+    start = time.monotonic()
+    assert batcher.submit("sendiri") == ["sendiri"]
+    elapsed = time.monotonic() - start
+    assert 0.05 <= elapsed < 1
+    assert engine.batches == [["sendiri"]]
+
+
+def test_full_batch_does_not_wait_for_the_window(make_batcher):
+    engine = RecordingEngine()
+    batcher = make_batcher(engine, max_batch_size=2, window_ms=5000)
+    start = time.monotonic()
+    assert batcher.submit_many(["a", "b", "c", "d"]) == [["a"], ["b"], ["c"], ["d"]]
+    # Full batches go at once instead of waiting out the window
+    assert engine.batches == [["a", "b"], ["c", "d"]]
+    assert time.monotonic() - start < 1
+
+
+def test_texts_are_bucketed_by_length(make_batcher):
+    engine = RecordingEngine()
+    batcher = make_batcher(engine, bucket_chars=10)
+    short, long = "pendek", "teks yang jauh lebih panjang"
+    assert batcher.submit_many([short, long, short + "!"]) == [[short], [long], [short + "!"]]
+    assert sorted(engine.batches) == sorted([[short, short + "!"], [long]])
+
+
+def test_engine_errors_reach_every_caller_of_the_batch(make_batcher):
+    batcher = make_batcher(RecordingEngine(error=RuntimeError("model down")), window_ms=20)
+    with pytest.raises(RuntimeError, match="model down"):
+        batcher.submit_many(["a", "b"])
+
+
+def test_expired_texts_never_reach_the_model(make_batcher):
+    engine = RecordingEngine()
+    batcher = make_batcher(engine, window_ms=20)
+    token = current_deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            batcher.submit("terlambat")
+    finally:
+        current_deadline.reset(token)
+    batcher.stop()
+    assert engine.batches == []
+
+
+def test_direct_call_when_not_running():
+    engine = RecordingEngine()
+    assert NERBatcher(engine, window_ms=0).submit_many(["a", "b"]) == [["a"], ["b"]]
+    assert engine.batches == [["a", "b"]]
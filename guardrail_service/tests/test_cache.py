@@ -0,0 +1,121 @@
+from app.cache import ResultCache
+from app.pipeline import GuardrailPipeline
+from app.regex_engine import RegexEngine, Span
+
+SPANS = [Span(0, 4, "PERSON", "NER Model")]
+
+
+def test_put_and_get_by_content():
+    cache = ResultCache(max_entries=10, ttl_seconds=60, max_mb=1)
+    cache.ensure_version("v1")
+    assert cache.get("Budi") is None
+    cache.put("Budi", SPANS, "v1")
+    assert cache.get("Budi") == SPANS
+    assert cache.get("Budi ") is None
+
+
+def test_version_change_drops_entries():
+    cache = ResultCache(max_entries=10, ttl_seconds=60, max_mb=1)
+    cache.ensure_version("v1")
+    cache.put("Budi", SPANS, "v1")
+    cache.ensure_version("v2")
+    assert cache.get("Budi") is None
+    # Going back does not resurrect entries of an old version
+    cache.ensure_version("v1")
+    assert cache.get("Budi") is None
+
+
+def test_put_with_stale_version_is_dropped():
+    cache = ResultCache(max_entries=10, ttl_seconds=60, max_mb=1)
+    cache.ensure_version("v2")
+    cache.put("Budi", SPANS, "v1")
+    assert cache.get("Budi") is None
+
+
+def test_lru_and_ttl_eviction():
+    cache = ResultCache(max_entries=2, ttl_seconds=60, max_mb=1)
+    cache.ensure_version("v1")
+    cache.put("a", SPANS, "v1")
+    cache.put("b", SPANS, "v1")
+    cache.get("a")
+    cache.put("c", SPANS, "v1")
+    assert cache.get("b") is None
+    assert cache.get("a") == SPANS
+
+    expired = ResultCache(max_entries=2, ttl_seconds=-1, max_mb=1)
+    expired.ensure_version("v1")
+    expired.put("a", SPANS, "v1")
+    assert expired.get("a") is None
+
+
+class CountingNER:
+    """Stands in for the model: tags every 'Budi' as a person and counts its calls."""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        results = []
+        for text in texts:
+            start = text.find("Budi")
+            results.append([{"entity_group": "PERSON", "start": start, "end": start + 4}] if start >= 0 else [])
+        return results
+
+
+def _pipeline(ner):
+    return GuardrailPipeline(RegexEngine(), ner, ner_version="model:r0",
+                             cache=ResultCache(max_entries=10, ttl_seconds=60, max_mb=1))
+
+
+def test_pipeline_serves_repeats_from_cache():
+    ner = CountingNER()
+    pipeline = _pipeline(ner)
+    first = pipeline.clean_many(["Saya Budi, NIK 3201123456789001"])[0]
+    second = pipeline.clean_many(["Saya Budi, NIK 3201123456789001"])[0]
+    assert ner.calls == 1
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["cleaned_text"] == first["cleaned_text"] == "Saya [REDACTED_PERSON], NIK [REDACTED_NIK]"
+
+
+def test_pipeline_recomputes_after_model_or_rules_change():
+    ner = CountingNER()
+    pipeline = _pipeline(ner)
+    pipeline.clean_many(["Saya Budi"])
+    pipeline.ner_version = "model:r1"
+    assert pipeline.clean_many(["Saya Budi"])[0]["cached"] is False
+    pipeline.regex_engine = RegexEngine({r'\bBudi\b': '[REDACTED_NAME]'}, rules_version="test")
+    assert pipeline.clean_many(["Saya Budi"])[0]["cached"] is False
+    assert ner.calls == 3
+
+
+def test_pipeline_does_not_cache_lower_tiers():
+    ner = CountingNER()
+    pipeline = _pipeline(ner)
+    pipeline.clean_many(["Saya Budi"], tier="fast")
+    assert pipeline.clean_many(["Saya Budi"])[0]["cached"] is False
+
+
+def test_results_overlapping_a_model_swap_are_not_cached():
+    ner = CountingNER()
+    pipeline = _pipeline(ner)
+
+    def swap_during_inference(texts):
+        # A reload activates the next model while this request waits on the old one
+        with pipeline.swapping_ner():
+            pipeline.ner_version = "model:r1"
+        return ner(texts)
+
+    pipeline.predict_batch = swap_during_inference
+    pipeline.clean_many(["Saya Budi"])
+    assert pipeline.cache.get("Saya Budi") is None
+
+
+def test_results_of_requests_started_during_a_swap_are_not_cached():
+    pipeline = _pipeline(CountingNER())
+    with pipeline.swapping_ner():
+        # New model active, version not bumped yet
+        pipeline.clean_many(["Saya Budi"])
+        assert pipeline.cache.get("Saya Budi") is None
+        pipeline.ner_version = "model:r1"
+    pipeline.clean_many(["Saya Budi"])
+    assert pipeline.clean_many(["Saya Budi"])[0]["cached"] is True
@@ -0,0 +1,93 @@
+import json
+import os
+import pytest
+from app.gate import NERGate
+from app.regex_engine import RegexEngine
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                      "benchmarks", "corpus.jsonl")
+NAMES = ["Arif Athaya", "Budi Santoso", "Siti Aminah", "Rudi Hartono", "Dewi Lestari", "Ratna Sari", "Joko Widodo"]
+
+
+def _masked_corpus():
+    engine = RegexEngine()
+    with open(CORPUS, encoding="utf-8") as f:
+        return [engine.mask(json.loads(line)["text"]) for line in f if line.strip()]
+
+
+def test_sentences_tile_the_text_and_keep_abbreviations():
+    text = "Kirim ke Jl. Sudirman No. 1 a.n. Budi. Terima kasih!\nHalo"
+    ranges = NERGate("safe").sentences(text)
+    assert "".join(text[start:end] for start, end in ranges) == text
+    assert [text[start:end] for start, end in ranges] == [
+        "Kirim ke Jl. Sudirman No. 1 a.n. Budi. ", "Terima kasih!\n", "Halo"]
+
+
+@pytest.mark.parametrize("mode", ["safe", "aggressive"])
+@pytest.mark.parametrize("sentence", [
+    "Kirim kartu atas nama Budi Santoso.",
+    "alamat jl melati no 7",
+    "Halo, saya Dewi.",
+    "Tarik saldo ke rekening [REDACTED_BANK_NUM] milik Joko Widodo.",
+])
+def test_candidates_in_both_modes(mode, sentence):
+    assert NERGate(mode).is_candidate(sentence)
+
+
+@pytest.mark.parametrize("mode", ["safe", "aggressive"])
+@pytest.mark.parametrize("sentence", [
+    "halo",
+    "Terima kasih atas bantuannya.",
+    "Reset password dong, nik [REDACTED_NIK] email [REDACTED_EMAIL]",
+    "Bagaimana cara tarik saldo ke rekening bank?",
+    "[REDACTED_NIK] [REDACTED_PHONE]",
+    "Passwordnya lupa, tolong dibantu ya kak",
+])
+def test_everyday_sentences_are_skipped(mode, sentence):
+    assert not NERGate(mode).is_candidate(sentence)
+
+
+@pytest.mark.parametrize("sentence", [
+    "tolong bantu rudi hartono",
+    "transfer ke rudi ya",
+    "pak budi sudah kirim",
+    "saya dewi, akun saya terkunci",
+])
+def test_safe_mode_catches_lowercase_names(sentence):
+    assert NERGate("safe").is_candidate(sentence)
+    assert not NERGate("aggressive").is_candidate(sentence)
+
+
+def test_select_merges_adjacent_candidates():
+    text = "Halo min. Saya Budi Santoso. Alamat Jl. Sudirman No 1. Terima kasih."
+    gate = NERGate("safe")
+    segments = gate.select(text)
+    assert [text[start:end] for start, end in segments] == ["Saya Budi Santoso. Alamat Jl. Sudirman No 1. "]
+    assert gate.select("Terima kasih. Cara reset password gimana?") == []
+
+
+def test_select_off_mode_sends_the_whole_text():
+    assert NERGate("off").select("halo") == [(0, 4)]
+    assert NERGate("off").select("") == []
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        NERGate("lenient")
+
+
+@pytest.mark.parametrize("mode", ["safe", "aggressive"])
+def test_corpus_names_always_reach_the_model(mode):
+    gate = NERGate(mode)
+    sentences = candidates = 0
+    for text in _masked_corpus():
+        segments = gate.select(text)
+        covered = "".join(text[start:end] for start, end in segments)
+        for name in NAMES:
+            if name in text:
+                assert name in covered, (mode, text)
+        ranges = gate.sentences(text)
+        sentences += len(ranges)
+        candidates += sum(gate.is_candidate(text[start:end]) for start, end in ranges)
+    # The gate must actually keep most sentences away from the model on this corpus
+    assert candidates < sentences / 2
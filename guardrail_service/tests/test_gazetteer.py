@@ -0,0 +1,83 @@
+import json
+import random
+from app.gazetteer import GazetteerEngine, _Automaton
+from app.regex_engine import Span
+
+
+def _found(engine, text):
+    return sorted((text[span.start:span.end], span.label) for span in engine.scan(text))
+
+
+def test_nested_and_overlapping_terms_are_all_reported():
+    engine = GazetteerEngine()
+    engine.add_terms([("PERSON", "Budi Santoso"), ("PERSON", "Budi"), ("PERSON", "Santoso"),
+                      ("PERSON", "Sari Dewi"), ("PERSON", "Dewi Lestari")])
+    assert _found(engine, "Pak Budi Santoso") == [("Budi", "PERSON"), ("Budi Santoso", "PERSON"),
+                                                  ("Santoso", "PERSON")]
+    # Overlapping without nesting: only reachable through the failure links
+    assert _found(engine, "ibu Sari Dewi Lestari") == [("Dewi Lestari", "PERSON"), ("Sari Dewi", "PERSON")]
+
+
+def test_case_and_whitespace_insensitive_in_original_coordinates():
+    engine = GazetteerEngine()
+    engine.add_terms([("ADDRESS", "Jl. Merdeka No. 10")])
+    text = "alamat JL.   merdeka\nno. 10, Bandung"
+    assert engine.scan(text) == [Span(7, 27, "ADDRESS", "GAZETTEER")]
+
+
+def test_whole_words_only():
+    engine = GazetteerEngine()
+    engine.add_terms([("PERSON", "Budi")])
+    assert engine.scan("Budiman dan Abudi") == []
+    assert _found(engine, "(Budi), budi.") == [("Budi", "PERSON"), ("budi", "PERSON")]
+
+
+def test_short_and_duplicate_terms_are_skipped():
+    engine = GazetteerEngine()
+    assert engine.add_terms([("PERSON", "Ani"), ("PERSON", "Rina"), ("PERSON", " rina ")]) == 1
+    assert engine.terms == 1
+    assert engine.scan("Ani") == []
+
+
+def test_terms_added_after_a_scan_are_found():
+    engine = GazetteerEngine()
+    engine.add_terms([("PERSON", "Budi")])
+    version = engine.version
+    assert _found(engine, "Budi dan Wati") == [("Budi", "PERSON")]
+    engine.add_customers([{"nama": "Wati", "email": "w.hartono@test.com"}])
+    assert engine.version != version
+    assert _found(engine, "Budi dan Wati (w.hartono@test.com)") == [
+        ("Budi", "PERSON"), ("Wati", "PERSON"), ("w.hartono@test.com", "EMAIL")]
+
+
+def test_customers_file(tmp_path):
+    path = tmp_path / "customers.jsonl"
+    path.write_text("\n".join(json.dumps(c) for c in [
+        {"nama": "Arif Athaya", "phone": "081234567890", "alamat": "Jl. Mawar 5"},
+        {"nama": "Sinta Dewi", "email": "sinta@example.com"},
+    ]) + "\n")
+    engine = GazetteerEngine(str(path))
+    assert engine.terms == 5
+    assert _found(engine, "Arif Athaya, 081234567890") == [("081234567890", "PHONE"), ("Arif Athaya", "PERSON")]
+
+
+def test_automaton_matches_naive_search():
+    rng = random.Random(7)
+    terms = sorted({"".join(rng.choice("ab") for _ in range(rng.randint(1, 5))) for _ in range(40)})
+    goto, outputs = [{}], [[]]
+    for term in terms:
+        node = 0
+        for ch in term:
+            if ch not in goto[node]:
+                goto[node][ch] = len(goto)
+                goto.append({})
+                outputs.append([])
+            node = goto[node][ch]
+        outputs[node].append((len(term), term))
+    automaton = _Automaton(goto, outputs)
+
+    for _ in range(50):
+        text = "".join(rng.choice("abc") for _ in range(30))
+        expected = sorted((i + len(term), len(term), term) for term in terms
+                          for i in range(len(text)) if text.startswith(term, i))
+        assert sorted(automaton.matches(text)) == expected
@@ -0,0 +1,66 @@
+import pytest
+from app.masking import MaskedView, apply_spans, resolve_overlaps
+from app.regex_engine import Span
+
+
+def test_resolve_overlaps_prefers_regex_over_gazetteer_over_model():
+    spans = [
+        Span(0, 20, "PERSON", "NER Model"),
+        Span(5, 15, "PERSON", "GAZETTEER"),
+        Span(10, 26, "NIK", "REGEX"),
+    ]
+    assert resolve_overlaps(spans) == [Span(10, 26, "NIK", "REGEX")]
+
+
+def test_resolve_overlaps_same_source_prefers_leftmost_then_longest():
+    spans = [Span(4, 10, "ADDRESS", "NER Model"), Span(0, 5, "PERSON", "NER Model"),
+             Span(0, 3, "PERSON", "NER Model")]
+    assert resolve_overlaps(spans) == [Span(0, 5, "PERSON", "NER Model")]
+
+
+def test_resolve_overlaps_keeps_adjacent_spans_sorted():
+    spans = [Span(10, 12, "B", "NER Model"), Span(5, 10, "A", "REGEX"), Span(0, 5, "C", "GAZETTEER")]
+    assert [span.label for span in resolve_overlaps(spans)] == ["C", "A", "B"]
+
+
+def test_resolve_overlaps_drops_empty_spans():
+    assert resolve_overlaps([Span(3, 3, "PERSON", "NER Model"), Span(5, 4, "NIK")]) == []
+
+
+def test_apply_spans_builds_text_vault_and_entities():
+    text = "Budi 3201123456789001 dan Budi"
+    spans = [Span(0, 4, "PERSON", "NER Model"), Span(5, 21, "NIK"), Span(26, 30, "PERSON", "NER Model")]
+    cleaned, vault, entities = apply_spans(text, spans)
+    assert cleaned == "[REDACTED_PERSON] [REDACTED_NIK] dan [REDACTED_PERSON]"
+    assert vault == {"[REDACTED_PERSON]": "Budi", "[REDACTED_NIK]": "3201123456789001"}
+    assert [(e["text"], e["label"], e["source"]) for e in entities] == [
+        ("Budi", "PERSON", "NER Model"), ("3201123456789001", "NIK", "REGEX"), ("Budi", "PERSON", "NER Model")]
+
+
+TEXT = "NIK 3201123456789001 atas nama Budi, email budi@test.com di Bandung"
+SPANS = [Span(4, 20, "NIK"), Span(43, 56, "EMAIL")]
+
+
+def test_masked_view_text():
+    assert MaskedView(TEXT, SPANS).text == "NIK [REDACTED_NIK] atas nama Budi, email [REDACTED_EMAIL] di Bandung"
+
+
+@pytest.mark.parametrize("word", ["NIK", "atas nama Budi", "Bandung", "di Bandung"])
+def test_masked_view_maps_untouched_ranges_back(word):
+    view = MaskedView(TEXT, SPANS)
+    start = view.text.index(word)
+    original = view.to_original(start, start + len(word))
+    assert original == (TEXT.index(word), TEXT.index(word) + len(word))
+
+
+@pytest.mark.parametrize("fragment", ["[REDACTED_NIK]", "REDACTED", "NIK [RED", "_EMAIL] di", "Budi, email [REDACTED_EMAIL]"])
+def test_masked_view_rejects_ranges_touching_tags(fragment):
+    view = MaskedView(TEXT, SPANS)
+    start = view.text.index(fragment)
+    assert view.to_original(start, start + len(fragment)) is None
+
+
+def test_masked_view_without_spans_is_identity():
+    view = MaskedView("Budi di Bandung", [])
+    assert view.text == "Budi di Bandung"
+    assert view.to_original(8, 15) == (8, 15)
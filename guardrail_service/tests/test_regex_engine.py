@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import pytest
+from app.regex_engine import DEFAULT_PATTERNS, RegexEngine, RuleConfigError, Span
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus.jsonl")
+RULES = os.path.join(ROOT, "guardrail_service", "config", "detection_rules.json")
+
+# Patterns and masking loop of the original engine (one `re.finditer` + `str.replace` per pattern)
+BASELINE_PATTERNS = {
+    r'\b\d{16}\b': '[REDACTED_NIK]',
+    r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}': '[REDACTED_EMAIL]',
+    r'(\+62|62|0)8[1-9][0-9]{6,11}': '[REDACTED_PHONE]',
+    r'\b\d{2}-\d{2}-\d{4}\b': '[REDACTED_BIRTHDATE]',
+    r'\b\d{10,12}\b': '[REDACTED_BANK_NUM]'
+}
+
+
+def baseline_mask(text: str) -> str:
+    masked_text = text
+    for pattern, tag in BASELINE_PATTERNS.items():
+        for match in re.finditer(pattern, masked_text):
+            original_word = match.group(0)
+            if tag == '[REDACTED_BANK_NUM]' and (original_word.startswith("08") or original_word.startswith("62")):
+                continue
+            masked_text = masked_text.replace(original_word, tag)
+    return masked_text
+
+
+def corpus_texts():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+CASES = [
+    "Tidak ada data pribadi di sini.",
+    "NIK saya 3201123456789001",
+    "email arif.rahman+cs@mail.co.id ya",
+    "hubungi +6281234567890 atau 089988776655",
+    "nomor 6281234567890 dan 0812345678901",
+    "lahir 17-08-1990, rekening 1234567890",
+    "rekening 123456789012 bukan 0812345678",
+    "NIK:3201123456789001,email:budi@test.com,hp:081234567890",
+    "angka 123456789 terlalu pendek, 1234567890123 terlalu panjang",
+]
+
+
+@pytest.mark.parametrize("text", CASES + corpus_texts())
+def test_mask_matches_baseline(text):
+    assert RegexEngine().mask(text) == baseline_mask(text)
+
+
+def test_scan_priority_and_order():
+    text = "budi@test.com 3201123456789001 081234567890 1234567890"
+    assert [span.label for span in RegexEngine().scan(text)] == ["EMAIL", "NIK", "PHONE", "BANK_NUM"]
+    # Numbers starting with 62/08 are phones, never bank accounts
+    assert [span.label for span in RegexEngine().scan("6281234567 0812345678")] == ["PHONE", "PHONE"]
+
+
+def test_spans_carry_no_value():
+    spans = RegexEngine().scan("NIK 3201123456789001")
+    assert spans == [Span(4, 20, "NIK")]
+    assert spans[0].tag == "[REDACTED_NIK]"
+
+
+def test_rules_file_matches_builtin_patterns():
+    engine = RegexEngine.from_file(RULES)
+    assert engine.patterns == DEFAULT_PATTERNS
+    assert engine.version == RegexEngine().version
+    assert engine.rules_version != "builtin"
+
+
+def _write_rules(tmp_path, rules, version="test"):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"version": version, "rules": rules}), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("rule, problem", [
+    ({"label": "nik", "pattern": r"\d{16}"}, "UPPER_SNAKE_CASE"),
+    ({"label": "NIK", "pattern": r"[0-9"}, "does not compile"),
+    ({"label": "NIK", "pattern": r"\d*"}, "empty string"),
+    ({"label": "NIK", "pattern": r"(?P<x>\d{16})"}, "named groups"),
+    ({"label": "NIK", "pattern": r"\b\d{16}\b", "examples": ["320112345678900"]}, "not matched whole"),
+    ({"label": "NIK", "pattern": r"\d{16}", "counter_examples": ["32011234567890012"]}, "counter example"),
+])
+def test_invalid_rules_are_rejected(tmp_path, rule, problem):
+    with pytest.raises(RuleConfigError) as error:
+        RegexEngine.from_file(_write_rules(tmp_path, [rule]))
+    assert any(problem in message for message in error.value.problems)
+
+
+def test_duplicate_labels_are_rejected(tmp_path):
+    rules = [{"label": "NIK", "pattern": r"\b\d{16}\b"}, {"label": "NIK", "pattern": r"\b\d{15}\b"}]
+    with pytest.raises(RuleConfigError, match="duplicate label"):
+        RegexEngine.from_file(_write_rules(tmp_path, rules))
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+import pytest
+from app.pipeline import GuardrailPipeline
+from app.regex_engine import RegexEngine, RuleConfigError
+from app.reloader import DetectionReloader, ReloadInProgress
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RULES = os.path.join(ROOT, "guardrail_service", "config", "detection_rules.json")
+
+
+class FakeNEREngine:
+    """Loads 'models' instantly; `gate` holds `prepare` until set, 'broken' fails to load."""
+    def __init__(self):
+        self.model_name, self.backend, self.nlp = "model-a", "torch", "nlp-model-a"
+        self.revision = self.loaded_at = None
+        self.gate = None
+
+    def prepare(self, model_name, backend=None, warm=True):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if model_name == "broken":
+            raise OSError("no such model")
+        return f"nlp-{model_name}", {"load": 0.0, "warmup": 0.0 if warm else None}
+
+    def activate(self, nlp, model_name, backend=None):
+        self.nlp, self.model_name, self.backend = nlp, model_name, backend or self.backend
+
+
+class FakePool:
+    def __init__(self, enabled=False, nlp=None):
+        self.enabled = enabled
+        self.nlp = nlp
+        self.stopped = False
+
+    def respawn(self, nlp, ready_timeout=None):
+        return FakePool(self.enabled, nlp)
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeBatcher:
+    def __init__(self, engine):
+        self.engine = engine
+
+
+def _write_rules(path, version, mutate=None):
+    with open(RULES, encoding="utf-8") as f:
+        config = json.load(f)
+    config["version"] = version
+    if mutate:
+        mutate(config["rules"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+def _reloader(rules_path="", pooled=False, **kwargs):
+    engine = FakeNEREngine()
+    pool = FakePool(pooled)
+    pipeline = GuardrailPipeline(RegexEngine(), lambda texts: [[] for _ in texts], ner_version=engine.model_name)
+    return DetectionReloader(pipeline, engine, pool, FakeBatcher(pool), lambda: engine.model_name,
+                             rules_path=rules_path, **kwargs)
+
+
+def _wait_model(reloader):
+    deadline = time.monotonic() + 5
+    # The status is final just before the reload releases its lock
+    while reloader.status["model"]["state"] == "loading" or reloader._model_lock.locked():
+        assert time.monotonic() < deadline, "model reload did not finish"
+        time.sleep(0.01)
+    return reloader.status["model"]
+
+
+def test_load_rules_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, "t1")
+    reloader = _reloader(str(path))
+    builtin = reloader.pipeline.regex_engine
+    reloader.load_rules()
+    assert reloader.pipeline.regex_engine is not builtin
+    assert reloader.versions()["rules"] == {"version": "t1", "fingerprint": reloader.pipeline.regex_engine.version,
+                                            "source": str(path)}
+    assert reloader.status["rules"]["state"] == "ok"
+
+
+def test_invalid_file_keeps_the_active_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, "t1")
+    reloader = _reloader(str(path))
+    reloader.load_rules()
+    active = reloader.pipeline.regex_engine
+
+    _write_rules(path, "t2", lambda rules: rules[0].update(pattern="[0-9"))
+    with pytest.raises(RuleConfigError):
+        reloader.reload_rules()
+    assert reloader.pipeline.regex_engine is active
+    assert reloader.status["rules"]["state"] == "invalid"
+    assert "does not compile" in reloader.status["rules"]["error"]
+
+
+def test_reload_rules_without_a_file():
+    with pytest.raises(RuleConfigError, match="RULES_PATH is not set"):
+        _reloader().reload_rules()
+
+
+def test_changed_file_is_picked_up_by_the_watcher(tmp_path):
+    path = tmp_path / "rules.json"
+    _write_rules(path, "t1")
+    reloader = _reloader(str(path), poll_seconds=0.02)
+    reloader.load_rules()
+    reloader.start()
+    try:
+        # A ConfigMap update replaces the file
+        _write_rules(tmp_path / "next.json", "t2", lambda rules: rules.pop())
+        os.replace(tmp_path / "next.json", path)
+        deadline = time.monotonic() + 5
+        while reloader.pipeline.regex_engine.rules_version != "t2":
+            assert time.monotonic() < deadline, "rules were not reloaded"
+            time.sleep(0.01)
+    finally:
+        reloader.stop()
+
+
+def test_model_reload_swaps_model_and_detection_version():
+    reloader = _reloader()
+    version = reloader.pipeline.version
+    reloader.reload_model("model-b")
+    assert _wait_model(reloader)["state"] == "ok"
+    assert reloader.ner_engine.nlp == "nlp-model-b"
+    assert reloader.pipeline.ner_version == "model-b"
+    assert reloader.pipeline.version != version
+    assert reloader.versions()["model"]["name"] == "model-b"
+
+
+def test_failed_model_reload_keeps_the_active_model():
+    reloader = _reloader()
+    version = reloader.pipeline.version
+    reloader.reload_model("broken")
+    status = _wait_model(reloader)
+    assert status["state"] == "failed" and "no such model" in status["error"]
+    assert reloader.ner_engine.model_name == "model-a"
+    assert reloader.pipeline.version == version
+    # The failure released the reload lock
+    reloader.reload_model("model-b")
+    assert _wait_model(reloader)["state"] == "ok"
+
+
+def test_one_model_reload_at_a_time():
+    reloader = _reloader()
+    reloader.ner_engine.gate = threading.Event()
+    reloader.reload_model("model-b")
+    with pytest.raises(ReloadInProgress):
+        reloader.reload_model("model-c")
+    reloader.ner_engine.gate.set()
+    assert _wait_model(reloader)["state"] == "ok"
+    assert reloader.ner_engine.model_name == "model-b"
+
+
+def test_pooled_model_reload_replaces_the_worker_pool():
+    reloader = _reloader(pooled=True)
+    old_pool = reloader.ner_workers
+    reloader.reload_model("model-b")
+    assert _wait_model(reloader)["state"] == "ok"
+    new_pool = reloader.ner_workers
+    assert new_pool is not old_pool and new_pool.nlp == "nlp-model-b"
+    assert reloader.ner_batcher.engine is new_pool
+    assert old_pool.stopped and not new_pool.stopped
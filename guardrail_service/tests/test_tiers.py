@@ -0,0 +1,83 @@
+import time
+from types import SimpleNamespace
+import pytest
+from app.tiers import TierSelector, lowest
+
+
+class FakeAdmission(SimpleNamespace):
+    @property
+    def full(self):
+        return self.inflight + self.queued >= self.max_concurrent + self.max_queue
+
+
+def make_selector(inflight=0, queued=0, probe_seconds=60.0, **compute):
+    admission = FakeAdmission(max_concurrent=2, max_queue=4, inflight=inflight, queued=queued)
+    selector = TierSelector(admission, alpha=1.0, probe_seconds=probe_seconds)
+    for tier, seconds in compute.items():
+        selector.observe(tier, tier, seconds)
+    return selector
+
+
+def test_without_budget_the_requested_tier_runs():
+    selector = make_selector(regex=0.001, fast=0.002, full=5.0)
+    assert selector.choose(None, None) == "full"
+    assert selector.choose("fast", None) == "fast"
+
+
+def test_downgrades_to_the_most_thorough_tier_that_fits():
+    selector = make_selector(regex=0.001, fast=0.010, full=0.200)
+    assert selector.choose("full", 301) == "full"
+    assert selector.choose("full", 50) == "fast"
+    assert selector.choose("full", 5) == "regex"
+    # Never upgraded past the requested tier
+    assert selector.choose("fast", 300) == "fast"
+    # Nothing fits: the cheapest tier still runs
+    assert selector.choose("full", 0.1) == "regex"
+
+
+def test_queue_wait_counts_towards_the_model_tier():
+    selector = make_selector(inflight=2, queued=3, regex=0.001, fast=0.010, full=0.100)
+    # (3 queued + 1) * 100 ms / 2 slots of waiting, plus 100 ms of compute
+    assert selector.estimate("full") == pytest.approx(0.300)
+    assert selector.choose("full", 250) == "fast"
+    assert selector.choose("full", 301) == "full"
+
+    selector.admission.inflight = 1
+    assert selector.estimate("full") == pytest.approx(0.100)
+
+
+def test_full_queue_never_picks_the_model_tier():
+    selector = make_selector(inflight=2, queued=4, full=0.001, probe_seconds=0.01)
+    time.sleep(0.02)
+    assert selector.choose("full", 10_000) == "fast"
+
+
+def test_estimates_follow_the_moving_average():
+    selector = make_selector()
+    selector.alpha = 0.5
+    selector.observe("full", "full", 0.100)
+    selector.observe("full", "full", 0.300)
+    assert selector.estimate("full") == pytest.approx(0.175)
+    # Unmeasured runs (cache hits, NER failures) leave the average alone
+    selector.observe("full", "full", None)
+    assert selector.estimate("full") == pytest.approx(0.175)
+
+
+def test_probe_lets_one_request_through_to_the_model_tier():
+    selector = make_selector(probe_seconds=0.05, fast=0.010, full=1.0)
+    assert selector.choose("full", 100) == "fast"
+
+    time.sleep(0.06)
+    assert selector.choose("full", 100) == "full"
+    # Only one probe per interval
+    assert selector.choose("full", 100) == "fast"
+
+    # A real measurement resets the timer and refreshes the estimate
+    time.sleep(0.06)
+    selector.observe("full", "full", 0.050)
+    assert selector.choose("full", 100) == "full"
+
+
+def test_lowest():
+    assert lowest(["full", "regex", "fast"]) == "regex"
+    assert lowest(["full", "fast"]) == "fast"
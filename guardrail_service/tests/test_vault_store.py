@@ -0,0 +1,66 @@
+import threading
+import time
+import pytest
+from app.vault_store import InMemoryVaultStore, SQLiteVaultStore, VaultStore
+
+VAULT = {"[REDACTED_NIK]": "3201123456789001", "[REDACTED_EMAIL]": "budi@test.com"}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(ttl_seconds=60):
+        if request.param == "memory":
+            return InMemoryVaultStore(ttl_seconds=ttl_seconds, max_entries=10)
+        return SQLiteVaultStore(str(tmp_path / "vault.db"), ttl_seconds=ttl_seconds)
+    return make
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        VaultStore()
+
+
+def test_resolve_returns_only_requested_tags(make_store):
+    store = make_store()
+    vault_ref = store.put(VAULT)
+    assert "3201123456789001" not in vault_ref
+    assert store.resolve(vault_ref, ["[REDACTED_NIK]", "[REDACTED_PHONE]"]) == {"[REDACTED_NIK]": "3201123456789001"}
+    assert store.resolve(vault_ref, []) == {}
+
+
+def test_unknown_deleted_and_expired_refs_miss(make_store):
+    store = make_store()
+    assert store.resolve("unknown", ["[REDACTED_NIK]"]) is None
+    vault_ref = store.put(VAULT)
+    store.delete(vault_ref)
+    store.delete(vault_ref)
+    assert store.resolve(vault_ref, ["[REDACTED_NIK]"]) is None
+
+    expiring = make_store(ttl_seconds=0.01)
+    vault_ref = expiring.put(VAULT)
+    time.sleep(0.05)
+    assert expiring.resolve(vault_ref, ["[REDACTED_NIK]"]) is None
+
+
+def test_refs_resolve_from_other_threads(make_store):
+    store = make_store()
+    vault_ref = store.put(VAULT)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(store.resolve(vault_ref, ["[REDACTED_EMAIL]"])))
+    thread.start()
+    thread.join()
+    assert results == [{"[REDACTED_EMAIL]": "budi@test.com"}]
+
+
+def test_memory_store_evicts_oldest_beyond_capacity():
+    store = InMemoryVaultStore(ttl_seconds=60, max_entries=2)
+    refs = [store.put(VAULT) for _ in range(3)]
+    assert store.resolve(refs[0], ["[REDACTED_NIK]"]) is None
+    assert store.resolve(refs[2], ["[REDACTED_NIK]"]) is not None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "vault.db")
+    vault_ref = SQLiteVaultStore(path, ttl_seconds=60).put(VAULT)
+    assert SQLiteVaultStore(path, ttl_seconds=60).resolve(vault_ref, ["[REDACTED_NIK]"]) == {
+        "[REDACTED_NIK]": "3201123456789001"}
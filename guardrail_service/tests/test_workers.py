@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import types
+import pytest
+from app.workers import NERWorkerPool
+
+
+class FakeEngine:
+    """Stands in for NEREngine: echoes texts back, and the worker exits on 'die'."""
+    def __init__(self):
+        self.nlp = None
+        self.ready = False
+        self.startup_timings = {}
+
+    def load_model(self):
+        self.nlp = "fake-model"
+
+    def warmup(self):
+        self.startup_timings["warmup"] = 0.0
+
+    def predict_batch(self, texts):
+        if "die" in texts:
+            os._exit(1)
+        return [[text] for text in texts]
+
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    # Workers pin their torch threads; the fake model needs none
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=lambda n: None))
+    pools = []
+
+    def make(**kwargs):
+        settings = dict(num_workers=2, sample_interval=0.1, job_timeout=5, respawn_interval=0.1)
+        settings.update(kwargs)
+        pool = NERWorkerPool(FakeEngine(), **settings)
+        pools.append(pool)
+        pool.start()
+        assert pool.wait_ready(10)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_batches_run_in_the_workers(make_pool):
+    pool = make_pool()
+    assert pool.engine.ready
+    assert pool.alive_workers == 2
+    assert pool.predict_batch(["a", "b"]) == [["a"], ["b"]]
+
+
+def test_dead_worker_fails_its_job_and_is_respawned(make_pool):
+    pool = make_pool()
+    pids = {process.pid for process in pool._processes}
+    with pytest.raises(RuntimeError, match="exited"):
+        pool.predict_batch(["die"])
+    _wait_for(lambda: pool.alive_workers == 2 and {process.pid for process in pool._processes} != pids)
+    # Both workers, the respawned one included, take jobs again
+    for _ in range(4):
+        assert pool.predict_batch(["a"]) == [["a"]]
+
+
+def test_no_live_worker_until_the_respawn_interval(make_pool):
+    pool = make_pool(num_workers=1, respawn_interval=60)
+    with pytest.raises(RuntimeError, match="exited"):
+        pool.predict_batch(["die"])
+    assert pool.alive_workers == 0
+    with pytest.raises(RuntimeError, match="No NER worker is alive"):
+        pool.predict_batch(["a"])
+
+
+def test_stopped_workers_are_not_respawned(make_pool):
+    pool = make_pool()
+    processes = list(pool._processes)
+    pool.stop()
+    time.sleep(0.3)
+    assert all(not process.is_alive() for process in processes)
+    assert pool._processes == []
@@ -0,0 +1,196 @@
+"""
+Tracing shared by the agent and guardrail services.
+
+Each service creates one `Tracer` with its own `service.name` and span
+counter (see its `app/tracing.py`).
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+# W3C Trace Context header (https://www.w3.org/TR/trace-context/)
+TRACEPARENT_HEADER = "traceparent"
+
+_PROPAGATOR = TraceContextTextMapPropagator()
+_KINDS = {"internal": SpanKind.INTERNAL, "server": SpanKind.SERVER, "client": SpanKind.CLIENT}
+
+# Only plain scalars are accepted as span attributes; callers must never pass PII
+_ATTRIBUTE_TYPES = (str, int, float, bool)
+
+# Control flow, not failures: a closed generator or a cancelled task (e.g. client disconnect)
+_NOT_ERRORS = (GeneratorExit, asyncio.CancelledError)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Context]:
+    """Extracts the caller's trace context from a `traceparent` header (None if missing or malformed)."""
+    if not value:
+        return None
+    context = _PROPAGATOR.extract({TRACEPARENT_HEADER: value})
+    return context if trace.get_current_span(context).get_span_context().is_valid else None
+
+
+def inject_traceparent(headers: Dict[str, str]) -> Dict[str, str]:
+    """Adds the current span's `traceparent` header to `headers` (also for unsampled traces)."""
+    _PROPAGATOR.inject(headers)
+    return headers
+
+
+def record_error(span: Span, error: BaseException):
+    """Marks the span failed. Only the exception type is kept; messages may contain PII."""
+    span.set_status(Status(StatusCode.ERROR))
+    span.set_attribute("error.type", type(error).__name__)
+
+
+def _scalars(attributes: Optional[Dict]) -> Dict:
+    return {key: value for key, value in (attributes or {}).items() if isinstance(value, _ATTRIBUTE_TYPES)}
+
+
+def _to_dict(span: ReadableSpan) -> dict:
+    """OTLP-style field names, one flat record per span."""
+    return {
+        "traceId": format(span.context.trace_id, "032x"),
+        "spanId": format(span.context.span_id, "016x"),
+        "parentSpanId": format(span.parent.span_id, "016x") if span.parent else "",
+        "name": span.name,
+        "kind": span.kind.name.lower(),
+        "startTimeUnixNano": span.start_time,
+        "endTimeUnixNano": span.end_time,
+        "durationMs": round((span.end_time - span.start_time) / 1e6, 3),
+        "status": "error" if span.status.status_code is StatusCode.ERROR else "ok",
+        "service": span.resource.attributes.get("service.name"),
+        "attributes": dict(span.attributes),
+    }
+
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a JSONL file, rotating it once it reaches `max_bytes`.
+
+    Rotation keeps `backups` older files (`<path>.1` is the most recent), so
+    the disk used by traces is bounded by roughly `max_bytes * (backups + 1)`.
+    Spans written or lost are counted on `spans_counter` (label `result`), if given.
+    """
+    def __init__(self, path: str, max_bytes: int, backups: int, spans_counter=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.spans_counter = spans_counter
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        data = "".join(json.dumps(_to_dict(span)) + "\n" for span in spans).encode("utf-8")
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.path, "ab")
+                if self.max_bytes and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                    self._rotate()
+                self._file.write(data)
+                self._file.flush()
+        except OSError:
+            self._count("failed", len(spans))
+            return SpanExportResult.FAILURE
+        self._count("exported", len(spans))
+        return SpanExportResult.SUCCESS
+
+    def _count(self, result: str, spans: int):
+        if self.spans_counter is not None:
+            self.spans_counter.labels(result=result).inc(spans)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "wb")
+
+    def shutdown(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """
+    OpenTelemetry tracer with W3C `traceparent` propagation and head-based sampling.
+
+    The sampling decision is made once at the root of a trace (TRACE_SAMPLE_RATE)
+    and inherited by every child span, including spans in other services that
+    receive the `traceparent` header. Sampled spans are batched by a background
+    processor (bounded queue, spans beyond it are dropped) into a rotating JSONL
+    file; pending spans are flushed when the process exits.
+    """
+    def __init__(self, service_name: str, spans_counter=None, sample_rate: float = None, export_path: str = None):
+        """
+        Args:
+            service_name (str): `service.name` resource of every exported span.
+            spans_counter (Counter): Prometheus counter of exported/failed spans (label `result`).
+            sample_rate (float): Fraction of new traces that are recorded (0 disables tracing).
+            export_path (str): JSONL file spans are appended to.
+        """
+        self.service_name = service_name
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        self.exporter = JsonlSpanExporter(
+            export_path or os.getenv("TRACE_EXPORT_PATH", f"traces-{service_name}.jsonl"),
+            max_bytes=int(float(os.getenv("TRACE_EXPORT_MAX_MB", "100")) * 1024 * 1024),
+            backups=int(os.getenv("TRACE_EXPORT_BACKUPS", "3")),
+            spans_counter=spans_counter
+        )
+        self.provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            sampler=ParentBased(TraceIdRatioBased(self.sample_rate))
+        )
+        self.provider.add_span_processor(BatchSpanProcessor(
+            self.exporter, max_queue_size=10000, schedule_delay_millis=1000, max_export_batch_size=512))
+        self._tracer = self.provider.get_tracer(__name__)
+
+    @property
+    def current_span(self) -> Span:
+        """The active span (a non-recording span when there is none)."""
+        return trace.get_current_span()
+
+    def start_span(self, name: str, parent: Optional[Context] = None, kind: str = "internal",
+                   attributes: Optional[Dict] = None, start_ns: int = None) -> Span:
+        """
+        Starts a span without making it current; the caller must call `end()`.
+
+        The parent defaults to the current span; without one a new trace is started.
+        `start_ns` backdates the span (e.g. to when waiting for an event began).
+        """
+        return self._tracer.start_span(name, context=parent, kind=_KINDS[kind],
+                                       attributes=_scalars(attributes), start_time=start_ns)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Context] = None, kind: str = "internal",
+             attributes: Optional[Dict] = None):
+        """
+        Context manager that starts a span, makes it current and ends it on exit.
+
+        Exceptions mark the span failed with their type only; generator closing
+        and task cancellation are not errors.
+        """
+        span = self.start_span(name, parent, kind, attributes)
+        with trace.use_span(span, end_on_exit=True, record_exception=False, set_status_on_exception=False):
+            try:
+                yield span
+            except _NOT_ERRORS:
+                raise
+            except BaseException as e:
+                record_error(span, e)
+                raise
+